@@ -0,0 +1,330 @@
+"""
+Streaming signal-rate anomaly detection.
+
+Every counted webhook updates a per-bot and a per-(bot, pair) sliding
+window: a ring of per-bucket counts with running totals, so an update is
+O(1) (amortized over elapsed buckets) and memory is fixed per key. Each
+window also keeps an EWMA of its count as the key's normal rate.
+
+A key is flooding when its window count reaches an absolute limit, exceeds
+the EWMA baseline by a factor, or when most of its signals are cancels.
+The first webhook that trips a key raises one alert email; from then on
+the key's webhooks are suppressed instead of emailed until it has stayed
+calm for a cooldown, when a single all-clear email reports how many
+notifications were held back.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("freqtrade-notifier")
+
+BUCKETS = 60
+DEFAULT_TYPES = ('entry', 'entry_fill', 'entry_cancel', 'exit', 'exit_fill', 'exit_cancel')
+CANCEL_TYPES = {'entry_cancel', 'exit_cancel'}
+
+
+class RateWindow:
+    """
+    Signal and cancel counts over the last `seconds`, in BUCKETS ring buckets,
+    with an EWMA of the window count updated once per bucket
+    """
+    __slots__ = ('bucket_seconds', 'alpha', 'counts', 'cancels', 'total', 'cancel_total', 'head', 'baseline',
+                 'age', 'frozen')
+
+    def __init__(self, seconds: float, alpha: float):
+        self.bucket_seconds = seconds / BUCKETS
+        self.alpha = alpha
+        self.counts = [0] * BUCKETS
+        self.cancels = [0] * BUCKETS
+        self.total = 0
+        self.cancel_total = 0
+        self.head = None
+        self.baseline = 0.0
+        # Buckets folded into the baseline so far
+        self.age = 0
+        # While a flood is ongoing the baseline must not learn it as normal
+        self.frozen = False
+
+    @property
+    def warm(self) -> bool:
+        return self.age >= BUCKETS
+
+    def advance(self, now: float):
+        """
+        Slide the window to `now`, folding each completed bucket into the baseline
+        """
+        bucket = int(now // self.bucket_seconds)
+        if self.head is None:
+            self.head = bucket
+            return
+        steps = bucket - self.head
+        if steps <= 0:
+            return
+        for _ in range(min(steps, BUCKETS)):
+            if not self.frozen:
+                self.baseline += self.alpha * (self.total - self.baseline)
+                self.age += 1
+            self.head += 1
+            slot = self.head % BUCKETS
+            self.total -= self.counts[slot]
+            self.cancel_total -= self.cancels[slot]
+            self.counts[slot] = self.cancels[slot] = 0
+        if steps > BUCKETS:
+            # Idle longer than the window: it is empty and the baseline decays towards zero
+            if not self.frozen:
+                self.baseline *= (1 - self.alpha) ** (steps - BUCKETS)
+                self.age += steps - BUCKETS
+            self.head = bucket
+
+    def add(self, cancel: bool):
+        slot = self.head % BUCKETS
+        self.counts[slot] += 1
+        self.total += 1
+        if cancel:
+            self.cancels[slot] += 1
+            self.cancel_total += 1
+
+
+class Incident:
+    """
+    An ongoing flood on one bot or (bot, pair) key
+    """
+    __slots__ = ('scope', 'key', 'reason', 'started', 'peak', 'cancels', 'baseline', 'suppressed', 'calm_since',
+                 'ended', 'window')
+
+    def __init__(self, scope: str, key: str, reason: str, started: float, window: RateWindow):
+        self.scope = scope
+        self.key = key
+        self.reason = reason
+        self.started = started
+        self.peak = window.total
+        self.cancels = window.cancel_total
+        self.baseline = window.baseline
+        self.suppressed = 0
+        self.calm_since = None
+        self.ended = None
+        self.window = window
+
+    def to_dict(self) -> dict:
+        return {
+            'scope': self.scope,
+            'key': self.key,
+            'reason': self.reason,
+            'started': datetime.fromtimestamp(self.started).isoformat(),
+            'peak': self.peak,
+            'suppressed': self.suppressed,
+        }
+
+
+class AnomalyDetector:
+    """
+    Per-bot and per-pair flood detection over the ingest stream. At most
+    `max_keys` idle windows are kept (least recently seen are evicted);
+    the window of a key with an ongoing incident is held by the incident
+    instead, so it is never evicted and eviction never has to skip it.
+    """
+
+    def __init__(self, window: float = 60.0, bot_max_rate: int = 60, pair_max_rate: int = 20,
+                 rate_factor: float = 5.0, min_signals: int = 10, max_cancel_ratio: float = 0.8,
+                 cooldown: float = 300.0, baseline_alpha: float = 0.02, max_keys: int = 2000,
+                 types: Iterable[str] = DEFAULT_TYPES, bot_fields: Iterable[str] = ('bot_name', 'strategy')):
+        self.window = window
+        self.limits = {'bot': bot_max_rate, 'pair': pair_max_rate}
+        self.rate_factor = rate_factor
+        self.min_signals = min_signals
+        self.max_cancel_ratio = max_cancel_ratio
+        self.cooldown = cooldown
+        self.baseline_alpha = baseline_alpha
+        self.max_keys = max_keys
+        self.types = set(types)
+        self.bot_fields = list(bot_fields)
+        self.windows = OrderedDict()
+        self.incidents = {}
+
+    def bot_key(self, webhook: dict) -> str:
+        """
+        Bot identity from the first configured field present, e.g. a
+        bot_name added to the webhook templates, else the strategy
+        """
+        for field in self.bot_fields:
+            value = webhook.get(field)
+            if value not in (None, ''):
+                return str(value)
+        return 'default'
+
+    def _window(self, key: Tuple[str, str]) -> RateWindow:
+        incident = self.incidents.get(key)
+        if incident is not None:
+            return incident.window
+        window = self.windows.get(key)
+        if window is not None:
+            self.windows.move_to_end(key)
+            return window
+        window = RateWindow(self.window, self.baseline_alpha)
+        self._keep(key, window)
+        return window
+
+    def _keep(self, key: Tuple[str, str], window: RateWindow):
+        """
+        Track an idle window as most recently seen, evicting the least recent
+        """
+        self.windows[key] = window
+        if len(self.windows) > self.max_keys:
+            self.windows.popitem(last=False)
+
+    def _reason(self, scope: str, window: RateWindow) -> Optional[str]:
+        """
+        Why a window counts as a flood, or None
+        """
+        total, limit = window.total, self.limits[scope]
+        if limit and total >= limit:
+            return f"{total} signals in {self.window:g}s (limit {limit})"
+        if total < self.min_signals:
+            return None
+        if self.rate_factor and window.warm and total > self.rate_factor * window.baseline:
+            return f"{total} signals in {self.window:g}s, {total / max(window.baseline, 1e-9):.1f}x the usual rate"
+        if self.max_cancel_ratio and window.cancel_total >= self.max_cancel_ratio * total:
+            return f"{window.cancel_total} of {total} signals in {self.window:g}s are cancels"
+        return None
+
+    def observe(self, webhook: dict, now: float) -> Tuple[List[Incident], bool]:
+        """
+        Count a webhook. Returns the incidents it starts (to alert on) and
+        whether its own notification should be suppressed.
+        """
+        webhook_type = webhook.get('type')
+        if webhook_type not in self.types:
+            return [], False
+        bot = self.bot_key(webhook)
+        keys = (('bot', bot), ('pair', f"{bot} {webhook.get('pair') or 'unknown'}"))
+        started, suppressed = [], False
+        for scope, name in keys:
+            key = (scope, name)
+            window = self._window(key)
+            window.advance(now)
+            window.add(webhook_type in CANCEL_TYPES)
+            incident = self.incidents.get(key)
+            if incident is not None:
+                incident.suppressed += 1
+                incident.peak = max(incident.peak, window.total)
+                suppressed = True
+                continue
+            # A pair of a bot that is already flooding is covered by the bot's alert
+            reason = None if suppressed else self._reason(scope, window)
+            if reason is not None:
+                incident = self.incidents[key] = Incident(scope, name, reason, now, window)
+                self.windows.pop(key, None)
+                window.frozen = True
+                started.append(incident)
+                suppressed = True
+        return started, suppressed
+
+    def check(self, now: float) -> List[Incident]:
+        """
+        End the incidents whose keys stayed calm for the cooldown. Returns
+        the ended incidents (to send the all-clear for).
+        """
+        ended = []
+        for key, incident in list(self.incidents.items()):
+            window = incident.window
+            window.advance(now)
+            if self._reason(key[0], window) is not None:
+                incident.calm_since = None
+                continue
+            if incident.calm_since is None:
+                incident.calm_since = now
+            if now - incident.calm_since >= self.cooldown:
+                incident.ended = now
+                window.frozen = False
+                del self.incidents[key]
+                self._keep(key, window)
+                ended.append(incident)
+        return ended
+
+    def status(self) -> dict:
+        return {
+            'tracked_keys': len(self.windows) + len(self.incidents),
+            'incidents': [incident.to_dict() for incident in self.incidents.values()],
+        }
+
+
+def render_alert(incident: Incident) -> Tuple[str, str, str]:
+    """
+    Render the alert (or, once ended, the all-clear) for an incident as
+    (subject, text body, html body)
+    """
+    what = f"{incident.scope} {incident.key}"
+    started = datetime.fromtimestamp(incident.started).strftime('%Y-%m-%d %H:%M:%S')
+    if incident.ended is None:
+        subject = f"[ALERT] Freqtrade signal flood from {what}"
+        headline = f"{incident.reason}. Notifications for this {incident.scope} are suppressed until it calms down."
+        color = '#d9534f'
+    else:
+        minutes = (incident.ended - incident.started) / 60
+        subject = f"[RESOLVED] Freqtrade signal flood from {what} subsided"
+        headline = (f"The flood that started at {started} lasted {minutes:.0f} minutes; "
+                    f"{incident.suppressed} notifications were suppressed.")
+        color = '#5cb85c'
+
+    details = [
+        ('Started', started),
+        ('Trigger', incident.reason),
+        ('Peak signals per window', incident.peak),
+        ('Cancels when triggered', incident.cancels),
+        ('Usual signals per window', f"{incident.baseline:.1f}"),
+        ('Suppressed notifications', incident.suppressed),
+    ]
+    body_text = f"{subject}\n\n{headline}\n\n" + "".join(f"{label}: {value}\n" for label, value in details)
+    rows = "".join(f"<tr><td>{label}</td><td>{value}</td></tr>\n" for label, value in details)
+    body_html = f"""
+    <html>
+    <body>
+      <h1 style="color: {color};">{subject}</h1>
+      <p><strong>{headline}</strong></p>
+      <table>
+{rows}      </table>
+    </body>
+    </html>
+    """
+    return subject, body_text, body_html
+
+
+async def send_alert(incident: Incident, send: Callable[[str, str, str], Awaitable[dict]],
+                     claim: Optional[Callable[[str], bool]] = None):
+    """
+    Send an incident's alert or all-clear; failures are logged, not raised.
+    With several workers each detects the flood on its own share of the
+    traffic, so `claim` (shared across workers) lets only one of them send.
+    """
+    state = 'resolved' if incident.ended is not None else 'alert'
+    # claim may wait on the shared database, so it runs in a worker thread
+    if claim is not None and not await asyncio.to_thread(claim, f"flood:{state}:{incident.scope}:{incident.key}"):
+        logger.info(f"Signal flood {state} email for {incident.scope} {incident.key} already sent by another worker")
+        return
+    try:
+        response = await send(*render_alert(incident))
+        logger.info(f"Sent signal flood {state} email for {incident.scope} {incident.key}! "
+                    f"Message ID: {response['MessageId']}")
+    except Exception as e:
+        logger.error(f"Failed to send signal flood {state} email for {incident.scope} {incident.key}: {str(e)}",
+                     exc_info=True)
+
+
+async def run_monitor(detector: AnomalyDetector, send: Callable[[str, str, str], Awaitable[dict]],
+                      interval: float = 5.0, clock: Callable[[], float] = time.time,
+                      claim: Optional[Callable[[str], bool]] = None):
+    """
+    Periodically end incidents that have calmed down, even if their bot
+    went silent, and send their all-clear emails until cancelled
+    """
+    while True:
+        await asyncio.sleep(interval)
+        for incident in detector.check(clock()):
+            logger.warning(f"Signal flood from {incident.scope} {incident.key} subsided "
+                           f"({incident.suppressed} notifications suppressed)")
+            await send_alert(incident, send, claim)
@@ -1,14 +1,34 @@
 from fastapi import FastAPI, Request, HTTPException, Depends
 from fastapi.responses import JSONResponse
 import boto3
+import asyncio
+import hmac
+import inspect
 import json
 import os
+import re
+import signal
+import threading
+import time
 import uvicorn
 import logging
 from logging.handlers import RotatingFileHandler
-from datetime import datetime
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Optional, Tuple
+from pydantic import ValidationError
+
+from models import parse_payload, validation_errors, format_value
+from summary import PnlSummary, parse_schedule, run_scheduler, run_snapshots
+from shared_state import LocalOnce, LocalSendRate, SharedState, SharedPnlSummary, SharedDeferredQueue, event_fingerprint
+from delivery import DeliveryTracker
+from deferred import DeferredQueue, coalesce_key, parse_delivery_rules, release_time, run_release_loop
+from ses_async import AsyncSESClient
+from profiling import SlowRequestProfiler, record_stage, stage, timing_middleware
+from body_limits import BodyGuard, BodyGuardMiddleware, parse_route_limits, parse_size
+from body_codecs import MalformedBody, UnsupportedMediaType, decode_body, supported_types
+from anomaly import DEFAULT_TYPES, AnomalyDetector, run_monitor, send_alert
 
 # Load environment variables from .env file
 load_dotenv()
@@ -28,23 +48,312 @@ logging.basicConfig(
 )
 logger = logging.getLogger("freqtrade-notifier")
 
-app = FastAPI(title="Freqtrade Email Notifier")
-
 # Configuration
 EMAIL_SENDER = os.environ.get('EMAIL_SENDER', 'your-sender@example.com')
 EMAIL_RECIPIENT = os.environ.get('EMAIL_RECIPIENT', 'your-recipient@example.com')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 API_KEY = os.environ.get('API_KEY', '')
+# PnL summary emails of the last completed day/week, e.g. SUMMARY_DAILY_AT="00:05" and
+# SUMMARY_WEEKLY_AT="mon 00:05" (empty disables)
+SUMMARY_DAILY_AT = os.environ.get('SUMMARY_DAILY_AT', '')
+SUMMARY_WEEKLY_AT = os.environ.get('SUMMARY_WEEKLY_AT', '')
+SUMMARY_SNAPSHOT_PATH = os.environ.get('SUMMARY_SNAPSHOT_PATH', 'pnl_summary.json')
+# Multi-worker mode: state shared between worker processes lives in a local SQLite database
+WORKERS = int(os.environ.get('WORKERS', 1))
+SHARED_STATE_PATH = os.environ.get('SHARED_STATE_PATH', 'notifier_state.db' if WORKERS > 1 else '')
+DEDUP_TTL_SECONDS = float(os.environ.get('DEDUP_TTL_SECONDS', 300))
+SES_MAX_SEND_RATE = float(os.environ.get('SES_MAX_SEND_RATE', 0))
+# Optional SES endpoint override (e.g. a local fake SES for benchmarks)
+SES_ENDPOINT_URL = os.environ.get('SES_ENDPOINT_URL', '')
+# SES backend: "boto3" (blocking, run in threads) or "async" (native asyncio client)
+SES_BACKEND = os.environ.get('SES_BACKEND', 'boto3').lower()
+SES_MAX_CONNECTIONS = int(os.environ.get('SES_MAX_CONNECTIONS', 100))
+# Graceful shutdown: readiness flips for SHUTDOWN_GRACE_SECONDS before the server stops,
+# open requests get SHUTDOWN_REQUEST_TIMEOUT seconds to finish, then in-flight emails get
+# SHUTDOWN_DRAIN_TIMEOUT seconds before being spooled to SPOOL_DIR. The phases run one after
+# another, so a full stop can take the sum of all three.
+SHUTDOWN_GRACE_SECONDS = float(os.environ.get('SHUTDOWN_GRACE_SECONDS', 0))
+SHUTDOWN_REQUEST_TIMEOUT = float(os.environ.get('SHUTDOWN_REQUEST_TIMEOUT', 5))
+SHUTDOWN_DRAIN_TIMEOUT = float(os.environ.get('SHUTDOWN_DRAIN_TIMEOUT', 10))
+SPOOL_DIR = os.environ.get('SPOOL_DIR', 'spool')
+# Slow request profiling: requests slower than PROFILE_THRESHOLD_MS are saved as cProfile files in PROFILE_DIR
+PROFILE_SLOW_REQUESTS = os.environ.get('PROFILE_SLOW_REQUESTS', 'false').lower() in ('1', 'true', 'yes')
+PROFILE_THRESHOLD_MS = float(os.environ.get('PROFILE_THRESHOLD_MS', 1000))
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 1.0))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+# Request body limits: MAX_BODY_BYTES for every route, overridden per path prefix by
+# MAX_BODY_BYTES_BY_ROUTE, e.g. "/webhook/log-only=1m,/webhook=64k"
+MAX_BODY_BYTES = parse_size(os.environ.get('MAX_BODY_BYTES', '64k'))
+MAX_BODY_BYTES_BY_ROUTE = parse_route_limits(os.environ.get('MAX_BODY_BYTES_BY_ROUTE', ''))
+# Delivery schedules per webhook type ("*" for all others), e.g.
+# DELIVERY_SCHEDULES="status,strategy_msg=quiet 23:00-07:00; entry=business mon-fri 09:00-18:00; exit=delay 5m"
+# Deferred emails wait in DEFERRED_QUEUE_PATH and are released DEFERRED_RELEASE_BATCH at a time,
+# DEFERRED_RELEASE_INTERVAL seconds apart
+DELIVERY_SCHEDULES = os.environ.get('DELIVERY_SCHEDULES', '')
+DEFERRED_QUEUE_PATH = os.environ.get('DEFERRED_QUEUE_PATH', 'deferred_queue.jsonl')
+DEFERRED_RELEASE_BATCH = int(os.environ.get('DEFERRED_RELEASE_BATCH', 10))
+DEFERRED_RELEASE_INTERVAL = float(os.environ.get('DEFERRED_RELEASE_INTERVAL', 1.0))
+DEFERRED_MAX_ATTEMPTS = int(os.environ.get('DEFERRED_MAX_ATTEMPTS', 5))
+# Latest-wins coalescing: webhooks of COALESCE_TYPES with the same COALESCE_KEY fields replace
+# a pending, not yet sent one; they wait at least COALESCE_WINDOW seconds for newer values
+COALESCE_TYPES = set(filter(None, (t.strip() for t in os.environ.get('COALESCE_TYPES', '').split(','))))
+COALESCE_KEY = [f.strip() for f in os.environ.get('COALESCE_KEY', 'type,pair').split(',') if f.strip()]
+COALESCE_WINDOW = float(os.environ.get('COALESCE_WINDOW', 5.0))
+# Signal flood detection: per-bot and per-pair counts over ANOMALY_WINDOW seconds; a flood sends one alert
+# and suppresses that bot's/pair's emails until it has been calm for ANOMALY_COOLDOWN seconds
+ANOMALY_DETECTION = os.environ.get('ANOMALY_DETECTION', 'false').lower() in ('1', 'true', 'yes')
+ANOMALY_WINDOW = float(os.environ.get('ANOMALY_WINDOW', 60))
+ANOMALY_BOT_MAX_RATE = int(os.environ.get('ANOMALY_BOT_MAX_RATE', 60))
+ANOMALY_PAIR_MAX_RATE = int(os.environ.get('ANOMALY_PAIR_MAX_RATE', 20))
+ANOMALY_RATE_FACTOR = float(os.environ.get('ANOMALY_RATE_FACTOR', 5))
+ANOMALY_MIN_SIGNALS = int(os.environ.get('ANOMALY_MIN_SIGNALS', 10))
+ANOMALY_MAX_CANCEL_RATIO = float(os.environ.get('ANOMALY_MAX_CANCEL_RATIO', 0.8))
+ANOMALY_COOLDOWN = float(os.environ.get('ANOMALY_COOLDOWN', 300))
+ANOMALY_TYPES = [t.strip() for t in os.environ.get('ANOMALY_TYPES', ','.join(DEFAULT_TYPES)).split(',') if t.strip()]
+ANOMALY_BOT_KEY = [f.strip() for f in os.environ.get('ANOMALY_BOT_KEY', 'bot_name,strategy').split(',') if f.strip()]
 
 # Log configuration on startup
 logger.info(f"Starting Freqtrade Email Notifier")
 logger.info(f"Email sender: {EMAIL_SENDER}")
 logger.info(f"Email recipient: {EMAIL_RECIPIENT}")
 logger.info(f"AWS Region: {AWS_REGION}")
+logger.info(f"SES backend: {SES_BACKEND}")
 logger.info(f"API Key configured: {bool(API_KEY)}")
+logger.info(f"Workers: {WORKERS}, shared state: {SHARED_STATE_PATH or 'disabled'}")
+
+# Shared dedup/rate limit state, only needed when several workers serve requests
+shared_state = None
+if SHARED_STATE_PATH:
+    shared_state = SharedState(SHARED_STATE_PATH, dedup_ttl=DEDUP_TTL_SECONDS, max_send_rate=SES_MAX_SEND_RATE)
+# Without shared state the SES send rate is limited in this process alone
+local_send_rate = LocalSendRate(SES_MAX_SEND_RATE)
+if SES_MAX_SEND_RATE > 0 and shared_state is None and WORKERS > 1:
+    logger.warning(f"SES_MAX_SEND_RATE applies per worker without SHARED_STATE_PATH; "
+                   f"up to {WORKERS * SES_MAX_SEND_RATE:g} emails/s may be sent in total")
+
+# Rolling PnL aggregates, restored from the last snapshot (or the shared database)
+pnl_summary = SharedPnlSummary(shared_state) if shared_state else PnlSummary(SUMMARY_SNAPSHOT_PATH)
+# Closed trades already accounted in this process, so a retried exit_fill is not counted twice
+local_once = LocalOnce(DEDUP_TTL_SECONDS)
+summary_schedule = parse_schedule(SUMMARY_DAILY_AT, SUMMARY_WEEKLY_AT)
+
+# In-flight email tracking for graceful shutdown
+delivery_tracker = DeliveryTracker(SPOOL_DIR)
+
+# Emails held back by a delivery schedule, persisted across restarts
+delivery_rules = parse_delivery_rules(DELIVERY_SCHEDULES)
+deferred_queue = SharedDeferredQueue(shared_state) if shared_state else DeferredQueue(DEFERRED_QUEUE_PATH)
+
+# Signal flood detection over the ingest stream (per worker process; with shared state
+# the workers claim each alert and all-clear so only one of them sends it)
+anomaly_detector = None
+if ANOMALY_DETECTION:
+    anomaly_detector = AnomalyDetector(
+        window=ANOMALY_WINDOW,
+        bot_max_rate=ANOMALY_BOT_MAX_RATE,
+        pair_max_rate=ANOMALY_PAIR_MAX_RATE,
+        rate_factor=ANOMALY_RATE_FACTOR,
+        min_signals=ANOMALY_MIN_SIGNALS,
+        max_cancel_ratio=ANOMALY_MAX_CANCEL_RATIO,
+        cooldown=ANOMALY_COOLDOWN,
+        types=ANOMALY_TYPES,
+        bot_fields=ANOMALY_BOT_KEY,
+    )
+# Alert emails in flight, referenced until done so they are not garbage collected
+alert_tasks = set()
+
+def install_drain_signal_handler():
+    """
+    Flip to draining as soon as SIGTERM arrives and hand the signal on to
+    uvicorn after SHUTDOWN_GRACE_SECONDS, so a load balancer polling /ready
+    stops routing here before the listener closes
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    previous = signal.getsignal(signal.SIGTERM)
+    if not callable(previous):
+        return
+    loop = asyncio.get_running_loop()
+    
+    def handle_sigterm(signum, frame):
+        delivery_tracker.begin_drain()
+        loop.call_soon_threadsafe(loop.call_later, SHUTDOWN_GRACE_SECONDS, previous, signum, frame)
+    
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+async def state_call(fn, *args, **kwargs):
+    """
+    Call fn, in a worker thread when it uses shared state: its SQLite calls can
+    wait on another worker's write lock, which must not stall this event loop.
+    Queues and summaries say so through their `blocking` attribute.
+    """
+    blocking = getattr(getattr(fn, '__self__', None), 'blocking', shared_state is not None)
+    if not blocking:
+        return fn(*args, **kwargs)
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+async def mark_replayed(message: dict, response: dict):
+    """
+    Record a replayed email as delivered in the shared dedup state
+    """
+    if shared_state is not None and message.get('event_id'):
+        await state_call(shared_state.complete, message['event_id'], response['MessageId'])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start background work on startup (summary scheduler, spool replay,
+    deferred releases) and drain in-flight emails and persist state on shutdown
+    """
+    install_drain_signal_handler()
+    replay = asyncio.create_task(delivery_tracker.replay(email_sender(), on_sent=mark_replayed))
+    scheduler = None
+    if summary_schedule:
+        logger.info(f"Summary emails scheduled: daily={SUMMARY_DAILY_AT!r} weekly={SUMMARY_WEEKLY_AT!r}")
+        claim = shared_state.claim_once if shared_state else None
+        scheduler = asyncio.create_task(run_scheduler(pnl_summary, summary_schedule, deliver_email, claim))
+    snapshots = asyncio.create_task(run_snapshots(pnl_summary))
+    if delivery_rules:
+        logger.info(f"Delivery schedules: {delivery_rules}")
+    releaser = asyncio.create_task(run_release_loop(
+        deferred_queue, release_deferred, DEFERRED_RELEASE_BATCH, DEFERRED_RELEASE_INTERVAL, DEFERRED_MAX_ATTEMPTS
+    ))
+    monitor = None
+    if anomaly_detector is not None:
+        monitor = asyncio.create_task(run_monitor(anomaly_detector, deliver_email, claim=flood_claim()))
+    yield
+    delivery_tracker.begin_drain()
+    replay.cancel()
+    releaser.cancel()
+    if monitor:
+        monitor.cancel()
+    if scheduler:
+        scheduler.cancel()
+    snapshots.cancel()
+    await delivery_tracker.drain(SHUTDOWN_DRAIN_TIMEOUT)
+    if isinstance(ses_client, AsyncSESClient):
+        await ses_client.aclose()
+    pnl_summary.save()
+    deferred_queue.close()
+
+app = FastAPI(title="Freqtrade Email Notifier", lifespan=lifespan)
+
+# /webhook/{path_key} and /webhook/log-only/{path_key}
+PATH_KEY_ROUTE = re.compile(r'^/webhook/(?:log-only/)?([^/]+)$')
+
+def path_key_authorized(path: str) -> bool:
+    """
+    False for a path-key webhook route with the wrong key; other routes pass
+    """
+    match = PATH_KEY_ROUTE.match(path)
+    if not match or match.group(1) == 'log-only':
+        return True
+    # compare_digest only takes ASCII str, so compare the UTF-8 bytes
+    return bool(API_KEY) and hmac.compare_digest(match.group(1).encode('utf-8'), API_KEY.encode('utf-8'))
+
+# Body size limits and path key check, applied before any route reads the body.
+# Registered first so it runs inside the drain and timing middlewares.
+body_guard = BodyGuard(MAX_BODY_BYTES, MAX_BODY_BYTES_BY_ROUTE, path_key_authorized)
+app.add_middleware(BodyGuardMiddleware, guard=body_guard)
+
+@app.middleware("http")
+async def reject_while_draining(request: Request, call_next):
+    """
+    Refuse new webhooks once shutdown has started so senders retry elsewhere
+    """
+    if delivery_tracker.draining and request.url.path.startswith('/webhook'):
+        return JSONResponse(
+            status_code=503,
+            content={'detail': 'Service is shutting down'},
+            headers={'Retry-After': '5'},
+        )
+    return await call_next(request)
+
+# Slow request profiler, can also be toggled at runtime via /admin/profiler
+profiler = SlowRequestProfiler(
+    enabled=PROFILE_SLOW_REQUESTS,
+    threshold_ms=PROFILE_THRESHOLD_MS,
+    sample_rate=PROFILE_SAMPLE_RATE,
+    output_dir=PROFILE_DIR,
+)
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    """
+    Add X-Request-ID and Server-Timing headers (parse/validate/render/deliver)
+    """
+    return await timing_middleware(request, call_next, profiler)
+
+# Initialize SES client
+if SES_BACKEND == 'async':
+    # Native asyncio client: SigV4 signed requests over pooled keep-alive connections
+    ses_client = AsyncSESClient(AWS_REGION, endpoint_url=SES_ENDPOINT_URL or None, max_connections=SES_MAX_CONNECTIONS)
+else:
+    ses_client = boto3.client('ses', region_name=AWS_REGION, endpoint_url=SES_ENDPOINT_URL or None)
+
+def email_request(subject: str, body_text: str, body_html: str) -> dict:
+    """
+    SES send_email arguments for a text + HTML email to the configured recipient
+    """
+    return dict(
+        Source=EMAIL_SENDER,
+        Destination={
+            'ToAddresses': [
+                EMAIL_RECIPIENT,
+            ],
+        },
+        Message={
+            'Subject': {
+                'Data': subject,
+                'Charset': 'UTF-8'
+            },
+            'Body': {
+                'Text': {
+                    'Data': body_text,
+                    'Charset': 'UTF-8'
+                },
+                'Html': {
+                    'Data': body_html,
+                    'Charset': 'UTF-8'
+                }
+            }
+        }
+    )
+
+def send_email(subject: str, body_text: str, body_html: str) -> dict:
+    """
+    Send an email with the blocking boto3 client (run in a worker thread)
+    """
+    return ses_client.send_email(**email_request(subject, body_text, body_html))
+
+async def send_email_async(subject: str, body_text: str, body_html: str) -> dict:
+    """
+    Send an email with the asyncio SES client on the event loop
+    """
+    return await ses_client.send_email(**email_request(subject, body_text, body_html))
+
+def email_sender():
+    """
+    Send function matching the configured SES backend
+    """
+    return send_email_async if inspect.iscoroutinefunction(ses_client.send_email) else send_email
 
-# Initialize boto3 SES client
-ses_client = boto3.client('ses', region_name=AWS_REGION)
+async def deliver_email(subject: str, body_text: str, body_html: str, event_id: Optional[str] = None) -> dict:
+    """
+    Send an email through the delivery tracker so shutdown can drain or spool it
+    """
+    return await delivery_tracker.deliver({
+        'subject': subject,
+        'body_text': body_text,
+        'body_html': body_html,
+        'event_id': event_id,
+    }, email_sender())
+
+def flood_claim():
+    """
+    Cross-worker claim for signal flood alerts, or None without shared state
+    """
+    return shared_state.claim_once if shared_state is not None else None
 
 # API Key verification function
 async def verify_api_key(token: Optional[str] = None):
@@ -63,30 +372,25 @@ async def verify_api_key(token: Optional[str] = None):
         detail="Invalid or missing API Key",
     )
 
-# Common webhook processing function
-async def process_webhook_data(webhook_data: dict):
+# Email rendering, shared by immediate and deferred deliveries
+def render_email(webhook_data: dict, event, received_at: Optional[datetime] = None) -> Tuple[str, str, str]:
     """
-    Process webhook data, create and send email notification based on Freqtrade webhook types
+    Subject, text and HTML body of the notification for a validated webhook
     """
-    # Validate input data
-    if not isinstance(webhook_data, dict):
-        raise HTTPException(status_code=400, detail="Invalid webhook data format")
-    
-    # Determine webhook type
     webhook_type = webhook_data.get('type')
-    if not webhook_type:
-        raise HTTPException(status_code=400, detail="Missing 'type' field in webhook data")
+    received_at = received_at or datetime.now()
     
-    # Log the received webhook
-    logger.info(f"Received webhook type: {webhook_type}")
-    logger.debug(f"Webhook data: {json.dumps(webhook_data, indent=2)}")
+    # Display values for the templates below; missing fields fall back to 'Unknown'
+    fields = {key: format_value(value) for key, value in event.model_dump(exclude_none=True).items()}
+    
+    render_start = time.perf_counter()
     
     # Prepare subject based on webhook type
     subject = f"Freqtrade Alert - {webhook_type}"
     
     # Common header for all email types
     body_text = f"Freqtrade Trading Bot Alert\n\n"
-    body_text += f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+    body_text += f"Time: {received_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
     body_text += f"Type: {webhook_type}\n\n"
     
     body_html = f"""
@@ -101,7 +405,7 @@ async def process_webhook_data(webhook_data: dict):
     </head>
     <body>
       <h1>Freqtrade Trading Bot Alert</h1>
-      <p>Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+      <p>Time: {received_at.strftime('%Y-%m-%d %H:%M:%S')}</p>
       <p>Type: <strong>{webhook_type}</strong></p>
       
       <div class="trade-info">
@@ -111,166 +415,162 @@ async def process_webhook_data(webhook_data: dict):
     if webhook_type == 'entry':
         # Entry - bot executes a long/short
         body_text += "📈 ENTERING TRADE\n"
-        body_text += f"Pair: {webhook_data.get('pair', 'Unknown')}\n"
-        body_text += f"Direction: {webhook_data.get('direction', 'Unknown')}\n"
-        body_text += f"Order Type: {webhook_data.get('order_type', 'Unknown')}\n"
-        body_text += f"Price: {webhook_data.get('open_rate', 'Unknown')}\n"
-        body_text += f"Amount: {webhook_data.get('amount', 'Unknown')}\n"
-        body_text += f"Stake Amount: {webhook_data.get('stake_amount', 'Unknown')} {webhook_data.get('stake_currency', '')}\n"
-        body_text += f"Enter Tag: {webhook_data.get('enter_tag', 'Unknown')}\n"
+        body_text += f"Pair: {fields.get('pair', 'Unknown')}\n"
+        body_text += f"Direction: {fields.get('direction', 'Unknown')}\n"
+        body_text += f"Order Type: {fields.get('order_type', 'Unknown')}\n"
+        body_text += f"Price: {fields.get('open_rate', 'Unknown')}\n"
+        body_text += f"Amount: {fields.get('amount', 'Unknown')}\n"
+        body_text += f"Stake Amount: {fields.get('stake_amount', 'Unknown')} {fields.get('stake_currency', '')}\n"
+        body_text += f"Enter Tag: {fields.get('enter_tag', 'Unknown')}\n"
         
         body_html += f"""
         <h2>📈 ENTERING TRADE</h2>
         <ul>
-          <li>Pair: <strong>{webhook_data.get('pair', 'Unknown')}</strong></li>
-          <li>Direction: {webhook_data.get('direction', 'Unknown')}</li>
-          <li>Order Type: {webhook_data.get('order_type', 'Unknown')}</li>
-          <li>Price: {webhook_data.get('open_rate', 'Unknown')}</li>
-          <li>Amount: {webhook_data.get('amount', 'Unknown')}</li>
-          <li>Stake Amount: {webhook_data.get('stake_amount', 'Unknown')} {webhook_data.get('stake_currency', '')}</li>
-          <li>Enter Tag: {webhook_data.get('enter_tag', 'Unknown')}</li>
+          <li>Pair: <strong>{fields.get('pair', 'Unknown')}</strong></li>
+          <li>Direction: {fields.get('direction', 'Unknown')}</li>
+          <li>Order Type: {fields.get('order_type', 'Unknown')}</li>
+          <li>Price: {fields.get('open_rate', 'Unknown')}</li>
+          <li>Amount: {fields.get('amount', 'Unknown')}</li>
+          <li>Stake Amount: {fields.get('stake_amount', 'Unknown')} {fields.get('stake_currency', '')}</li>
+          <li>Enter Tag: {fields.get('enter_tag', 'Unknown')}</li>
         </ul>
         """
         
     elif webhook_type == 'entry_cancel':
         # Entry cancel - bot cancels a long/short order
         body_text += "🚫 ENTRY ORDER CANCELLED\n"
-        body_text += f"Pair: {webhook_data.get('pair', 'Unknown')}\n"
-        body_text += f"Direction: {webhook_data.get('direction', 'Unknown')}\n"
-        body_text += f"Order Type: {webhook_data.get('order_type', 'Unknown')}\n"
-        body_text += f"Price: {webhook_data.get('limit', 'Unknown')}\n"
-        body_text += f"Amount: {webhook_data.get('amount', 'Unknown')}\n"
-        body_text += f"Stake Amount: {webhook_data.get('stake_amount', 'Unknown')} {webhook_data.get('stake_currency', '')}\n"
+        body_text += f"Pair: {fields.get('pair', 'Unknown')}\n"
+        body_text += f"Direction: {fields.get('direction', 'Unknown')}\n"
+        body_text += f"Order Type: {fields.get('order_type', 'Unknown')}\n"
+        body_text += f"Price: {fields.get('limit', 'Unknown')}\n"
+        body_text += f"Amount: {fields.get('amount', 'Unknown')}\n"
+        body_text += f"Stake Amount: {fields.get('stake_amount', 'Unknown')} {fields.get('stake_currency', '')}\n"
         
         body_html += f"""
         <h2>🚫 ENTRY ORDER CANCELLED</h2>
         <ul>
-          <li>Pair: <strong>{webhook_data.get('pair', 'Unknown')}</strong></li>
-          <li>Direction: {webhook_data.get('direction', 'Unknown')}</li>
-          <li>Order Type: {webhook_data.get('order_type', 'Unknown')}</li>
-          <li>Price: {webhook_data.get('limit', 'Unknown')}</li>
-          <li>Amount: {webhook_data.get('amount', 'Unknown')}</li>
-          <li>Stake Amount: {webhook_data.get('stake_amount', 'Unknown')} {webhook_data.get('stake_currency', '')}</li>
+          <li>Pair: <strong>{fields.get('pair', 'Unknown')}</strong></li>
+          <li>Direction: {fields.get('direction', 'Unknown')}</li>
+          <li>Order Type: {fields.get('order_type', 'Unknown')}</li>
+          <li>Price: {fields.get('limit', 'Unknown')}</li>
+          <li>Amount: {fields.get('amount', 'Unknown')}</li>
+          <li>Stake Amount: {fields.get('stake_amount', 'Unknown')} {fields.get('stake_currency', '')}</li>
         </ul>
         """
         
     elif webhook_type == 'entry_fill':
         # Entry fill - bot filled a long/short order
         body_text += "✅ ENTRY ORDER FILLED\n"
-        body_text += f"Pair: {webhook_data.get('pair', 'Unknown')}\n"
-        body_text += f"Direction: {webhook_data.get('direction', 'Unknown')}\n"
-        body_text += f"Order Type: {webhook_data.get('order_type', 'Unknown')}\n"
-        body_text += f"Fill Price: {webhook_data.get('open_rate', 'Unknown')}\n"
-        body_text += f"Amount: {webhook_data.get('amount', 'Unknown')}\n"
-        body_text += f"Stake Amount: {webhook_data.get('stake_amount', 'Unknown')} {webhook_data.get('stake_currency', '')}\n"
-        body_text += f"Enter Tag: {webhook_data.get('enter_tag', 'Unknown')}\n"
+        body_text += f"Pair: {fields.get('pair', 'Unknown')}\n"
+        body_text += f"Direction: {fields.get('direction', 'Unknown')}\n"
+        body_text += f"Order Type: {fields.get('order_type', 'Unknown')}\n"
+        body_text += f"Fill Price: {fields.get('open_rate', 'Unknown')}\n"
+        body_text += f"Amount: {fields.get('amount', 'Unknown')}\n"
+        body_text += f"Stake Amount: {fields.get('stake_amount', 'Unknown')} {fields.get('stake_currency', '')}\n"
+        body_text += f"Enter Tag: {fields.get('enter_tag', 'Unknown')}\n"
         
         body_html += f"""
         <h2>✅ ENTRY ORDER FILLED</h2>
         <ul>
-          <li>Pair: <strong>{webhook_data.get('pair', 'Unknown')}</strong></li>
-          <li>Direction: {webhook_data.get('direction', 'Unknown')}</li>
-          <li>Order Type: {webhook_data.get('order_type', 'Unknown')}</li>
-          <li>Fill Price: {webhook_data.get('open_rate', 'Unknown')}</li>
-          <li>Amount: {webhook_data.get('amount', 'Unknown')}</li>
-          <li>Stake Amount: {webhook_data.get('stake_amount', 'Unknown')} {webhook_data.get('stake_currency', '')}</li>
-          <li>Enter Tag: {webhook_data.get('enter_tag', 'Unknown')}</li>
+          <li>Pair: <strong>{fields.get('pair', 'Unknown')}</strong></li>
+          <li>Direction: {fields.get('direction', 'Unknown')}</li>
+          <li>Order Type: {fields.get('order_type', 'Unknown')}</li>
+          <li>Fill Price: {fields.get('open_rate', 'Unknown')}</li>
+          <li>Amount: {fields.get('amount', 'Unknown')}</li>
+          <li>Stake Amount: {fields.get('stake_amount', 'Unknown')} {fields.get('stake_currency', '')}</li>
+          <li>Enter Tag: {fields.get('enter_tag', 'Unknown')}</li>
         </ul>
         """
         
     elif webhook_type == 'exit':
         # Exit - bot exits a trade
         body_text += "📉 EXITING TRADE\n"
-        body_text += f"Pair: {webhook_data.get('pair', 'Unknown')}\n"
-        body_text += f"Direction: {webhook_data.get('direction', 'Unknown')}\n"
-        body_text += f"Order Type: {webhook_data.get('order_type', 'Unknown')}\n"
-        body_text += f"Price: {webhook_data.get('limit', 'Unknown')}\n"
-        body_text += f"Amount: {webhook_data.get('amount', 'Unknown')}\n"
-        body_text += f"Profit: {webhook_data.get('profit_amount', 'Unknown')} {webhook_data.get('stake_currency', '')} ({webhook_data.get('profit_ratio', 'Unknown')})\n"
-        body_text += f"Exit Reason: {webhook_data.get('exit_reason', 'Unknown')}\n"
+        body_text += f"Pair: {fields.get('pair', 'Unknown')}\n"
+        body_text += f"Direction: {fields.get('direction', 'Unknown')}\n"
+        body_text += f"Order Type: {fields.get('order_type', 'Unknown')}\n"
+        body_text += f"Price: {fields.get('limit', 'Unknown')}\n"
+        body_text += f"Amount: {fields.get('amount', 'Unknown')}\n"
+        body_text += f"Profit: {fields.get('profit_amount', 'Unknown')} {fields.get('stake_currency', '')} ({fields.get('profit_ratio', 'Unknown')})\n"
+        body_text += f"Exit Reason: {fields.get('exit_reason', 'Unknown')}\n"
         
-        # Format profit ratio as percentage if it's a number
-        profit_ratio = webhook_data.get('profit_ratio', 0)
-        try:
-            profit_ratio = float(profit_ratio) * 100
-            profit_ratio_display = f"{profit_ratio:.2f}%"
-        except (ValueError, TypeError):
-            profit_ratio_display = str(profit_ratio)
+        # Format profit ratio as percentage (already coerced to float by the model)
+        if event.profit_ratio is not None:
+            profit_ratio_display = f"{event.profit_ratio * 100:.2f}%"
+        else:
+            profit_ratio_display = 'Unknown'
         
         body_html += f"""
         <h2>📉 EXITING TRADE</h2>
         <ul>
-          <li>Pair: <strong>{webhook_data.get('pair', 'Unknown')}</strong></li>
-          <li>Direction: {webhook_data.get('direction', 'Unknown')}</li>
-          <li>Order Type: {webhook_data.get('order_type', 'Unknown')}</li>
-          <li>Price: {webhook_data.get('limit', 'Unknown')}</li>
-          <li>Amount: {webhook_data.get('amount', 'Unknown')}</li>
-          <li>Profit: {webhook_data.get('profit_amount', 'Unknown')} {webhook_data.get('stake_currency', '')} ({profit_ratio_display})</li>
-          <li>Exit Reason: {webhook_data.get('exit_reason', 'Unknown')}</li>
+          <li>Pair: <strong>{fields.get('pair', 'Unknown')}</strong></li>
+          <li>Direction: {fields.get('direction', 'Unknown')}</li>
+          <li>Order Type: {fields.get('order_type', 'Unknown')}</li>
+          <li>Price: {fields.get('limit', 'Unknown')}</li>
+          <li>Amount: {fields.get('amount', 'Unknown')}</li>
+          <li>Profit: {fields.get('profit_amount', 'Unknown')} {fields.get('stake_currency', '')} ({profit_ratio_display})</li>
+          <li>Exit Reason: {fields.get('exit_reason', 'Unknown')}</li>
         </ul>
         """
         
     elif webhook_type == 'exit_fill':
         # Exit fill - bot fills an exit order
         body_text += "✅ EXIT ORDER FILLED\n"
-        body_text += f"Pair: {webhook_data.get('pair', 'Unknown')}\n"
-        body_text += f"Direction: {webhook_data.get('direction', 'Unknown')}\n"
-        body_text += f"Order Type: {webhook_data.get('order_type', 'Unknown')}\n"
-        body_text += f"Fill Price: {webhook_data.get('close_rate', 'Unknown')}\n"
-        body_text += f"Amount: {webhook_data.get('amount', 'Unknown')}\n"
-        body_text += f"Profit: {webhook_data.get('profit_amount', 'Unknown')} {webhook_data.get('stake_currency', '')} ({webhook_data.get('profit_ratio', 'Unknown')})\n"
-        body_text += f"Exit Reason: {webhook_data.get('exit_reason', 'Unknown')}\n"
-        body_text += f"Trade Duration: {webhook_data.get('open_date', 'Unknown')} to {webhook_data.get('close_date', 'Unknown')}\n"
+        body_text += f"Pair: {fields.get('pair', 'Unknown')}\n"
+        body_text += f"Direction: {fields.get('direction', 'Unknown')}\n"
+        body_text += f"Order Type: {fields.get('order_type', 'Unknown')}\n"
+        body_text += f"Fill Price: {fields.get('close_rate', 'Unknown')}\n"
+        body_text += f"Amount: {fields.get('amount', 'Unknown')}\n"
+        body_text += f"Profit: {fields.get('profit_amount', 'Unknown')} {fields.get('stake_currency', '')} ({fields.get('profit_ratio', 'Unknown')})\n"
+        body_text += f"Exit Reason: {fields.get('exit_reason', 'Unknown')}\n"
+        body_text += f"Trade Duration: {fields.get('open_date', 'Unknown')} to {fields.get('close_date', 'Unknown')}\n"
         
-        # Format profit ratio as percentage if it's a number
-        profit_ratio = webhook_data.get('profit_ratio', 0)
-        try:
-            profit_ratio = float(profit_ratio) * 100
-            profit_ratio_display = f"{profit_ratio:.2f}%"
-            profit_color = "green" if profit_ratio >= 0 else "red"
-        except (ValueError, TypeError):
-            profit_ratio_display = str(profit_ratio)
+        # Format profit ratio as percentage (already coerced to float by the model)
+        if event.profit_ratio is not None:
+            profit_ratio_display = f"{event.profit_ratio * 100:.2f}%"
+            profit_color = "green" if event.profit_ratio >= 0 else "red"
+        else:
+            profit_ratio_display = 'Unknown'
             profit_color = "black"
         
         body_html += f"""
         <h2>✅ EXIT ORDER FILLED</h2>
         <ul>
-          <li>Pair: <strong>{webhook_data.get('pair', 'Unknown')}</strong></li>
-          <li>Direction: {webhook_data.get('direction', 'Unknown')}</li>
-          <li>Order Type: {webhook_data.get('order_type', 'Unknown')}</li>
-          <li>Fill Price: {webhook_data.get('close_rate', 'Unknown')}</li>
-          <li>Amount: {webhook_data.get('amount', 'Unknown')}</li>
-          <li>Profit: <span style="color: {profit_color}">{webhook_data.get('profit_amount', 'Unknown')} {webhook_data.get('stake_currency', '')} ({profit_ratio_display})</span></li>
-          <li>Exit Reason: {webhook_data.get('exit_reason', 'Unknown')}</li>
-          <li>Trade Duration: {webhook_data.get('open_date', 'Unknown')} to {webhook_data.get('close_date', 'Unknown')}</li>
+          <li>Pair: <strong>{fields.get('pair', 'Unknown')}</strong></li>
+          <li>Direction: {fields.get('direction', 'Unknown')}</li>
+          <li>Order Type: {fields.get('order_type', 'Unknown')}</li>
+          <li>Fill Price: {fields.get('close_rate', 'Unknown')}</li>
+          <li>Amount: {fields.get('amount', 'Unknown')}</li>
+          <li>Profit: <span style="color: {profit_color}">{fields.get('profit_amount', 'Unknown')} {fields.get('stake_currency', '')} ({profit_ratio_display})</span></li>
+          <li>Exit Reason: {fields.get('exit_reason', 'Unknown')}</li>
+          <li>Trade Duration: {fields.get('open_date', 'Unknown')} to {fields.get('close_date', 'Unknown')}</li>
         </ul>
         """
         
     elif webhook_type == 'exit_cancel':
         # Exit cancel - bot cancels an exit order
         body_text += "🚫 EXIT ORDER CANCELLED\n"
-        body_text += f"Pair: {webhook_data.get('pair', 'Unknown')}\n"
-        body_text += f"Direction: {webhook_data.get('direction', 'Unknown')}\n"
-        body_text += f"Order Type: {webhook_data.get('order_type', 'Unknown')}\n"
-        body_text += f"Price: {webhook_data.get('limit', 'Unknown')}\n"
-        body_text += f"Amount: {webhook_data.get('amount', 'Unknown')}\n"
-        body_text += f"Profit: {webhook_data.get('profit_amount', 'Unknown')} {webhook_data.get('stake_currency', '')} ({webhook_data.get('profit_ratio', 'Unknown')})\n"
+        body_text += f"Pair: {fields.get('pair', 'Unknown')}\n"
+        body_text += f"Direction: {fields.get('direction', 'Unknown')}\n"
+        body_text += f"Order Type: {fields.get('order_type', 'Unknown')}\n"
+        body_text += f"Price: {fields.get('limit', 'Unknown')}\n"
+        body_text += f"Amount: {fields.get('amount', 'Unknown')}\n"
+        body_text += f"Profit: {fields.get('profit_amount', 'Unknown')} {fields.get('stake_currency', '')} ({fields.get('profit_ratio', 'Unknown')})\n"
         
         body_html += f"""
         <h2>🚫 EXIT ORDER CANCELLED</h2>
         <ul>
-          <li>Pair: <strong>{webhook_data.get('pair', 'Unknown')}</strong></li>
-          <li>Direction: {webhook_data.get('direction', 'Unknown')}</li>
-          <li>Order Type: {webhook_data.get('order_type', 'Unknown')}</li>
-          <li>Price: {webhook_data.get('limit', 'Unknown')}</li>
-          <li>Amount: {webhook_data.get('amount', 'Unknown')}</li>
-          <li>Profit: {webhook_data.get('profit_amount', 'Unknown')} {webhook_data.get('stake_currency', '')} ({webhook_data.get('profit_ratio', 'Unknown')})</li>
+          <li>Pair: <strong>{fields.get('pair', 'Unknown')}</strong></li>
+          <li>Direction: {fields.get('direction', 'Unknown')}</li>
+          <li>Order Type: {fields.get('order_type', 'Unknown')}</li>
+          <li>Price: {fields.get('limit', 'Unknown')}</li>
+          <li>Amount: {fields.get('amount', 'Unknown')}</li>
+          <li>Profit: {fields.get('profit_amount', 'Unknown')} {fields.get('stake_currency', '')} ({fields.get('profit_ratio', 'Unknown')})</li>
         </ul>
         """
     
     elif webhook_type == 'strategy_msg':
         # Handle custom message from strategy
-        msg = webhook_data.get('msg', 'No message content')
+        msg = event.msg if event.msg is not None else 'No message content'
         body_text += "📊 STRATEGY MESSAGE\n"
         
         # Check if message is a dictionary or JSON string
@@ -331,11 +631,11 @@ async def process_webhook_data(webhook_data: dict):
     
     elif webhook_type == 'status':
         # Status - regular status messages
-        body_text += f"STATUS UPDATE: {webhook_data.get('status', 'Unknown')}\n"
+        body_text += f"STATUS UPDATE: {fields.get('status', 'Unknown')}\n"
         
         body_html += f"""
         <h2>STATUS UPDATE</h2>
-        <p>Status: <strong>{webhook_data.get('status', 'Unknown')}</strong></p>
+        <p>Status: <strong>{fields.get('status', 'Unknown')}</strong></p>
         """
     
     else:
@@ -343,7 +643,7 @@ async def process_webhook_data(webhook_data: dict):
         body_text += f"RECEIVED WEBHOOK: {webhook_type}\n"
         
         # Add all available fields
-        for key, value in webhook_data.items():
+        for key, value in fields.items():
             if key != 'type':
                 body_text += f"{key}: {value}\n"
         
@@ -352,7 +652,7 @@ async def process_webhook_data(webhook_data: dict):
         <ul>
         """
         
-        for key, value in webhook_data.items():
+        for key, value in fields.items():
             if key != 'type':
                 body_html += f"<li>{key}: {value}</li>\n"
         
@@ -377,33 +677,159 @@ async def process_webhook_data(webhook_data: dict):
     </html>
     """
     
+    record_stage('render', render_start)
+    
+    return subject, body_text, body_html
+
+async def wait_for_send_slot():
+    """
+    Respect the SES send rate, shared by all workers when shared state is on
+    """
+    if shared_state is not None:
+        wait = await state_call(shared_state.reserve_send)
+    else:
+        wait = local_send_rate.reserve_send()
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+async def release_deferred(record: dict) -> dict:
+    """
+    Render and send a deferred webhook once its delivery window opens
+    """
+    webhook_data = record['webhook']
+    subject, body_text, body_html = render_email(
+        webhook_data, parse_payload(webhook_data), datetime.fromtimestamp(record['received_at'])
+    )
     try:
-        # Send email using AWS SES
-        response = ses_client.send_email(
-            Source=EMAIL_SENDER,
-            Destination={
-                'ToAddresses': [
-                    EMAIL_RECIPIENT,
-                ],
-            },
-            Message={
-                'Subject': {
-                    'Data': subject,
-                    'Charset': 'UTF-8'
-                },
-                'Body': {
-                    'Text': {
-                        'Data': body_text,
-                        'Charset': 'UTF-8'
-                    },
-                    'Html': {
-                        'Data': body_html,
-                        'Charset': 'UTF-8'
-                    }
-                }
-            }
+        await wait_for_send_slot()
+    except asyncio.CancelledError:
+        # Shutting down before the send started: keep it for the next run
+        deferred_queue.requeue(record, time.time())
+        raise
+    response = await deliver_email(subject, body_text, body_html)
+    superseded = f" ({record['coalesced']} older updates coalesced)" if record.get('coalesced') else ''
+    logger.info(f"Deferred email sent for webhook type {webhook_data.get('type')}{superseded}! Message ID: {response['MessageId']}")
+    return response
+
+async def read_webhook_body(request: Request):
+    """
+    Decode the request body as JSON, MessagePack or CBOR according to its Content-Type
+    """
+    content_type = request.headers.get('content-type')
+    try:
+        return decode_body(await request.body(), content_type)
+    except UnsupportedMediaType:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported Content-Type {content_type}; use one of {', '.join(supported_types())}"
         )
+    except MalformedBody as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Common webhook processing function
+async def process_webhook_data(webhook_data: dict):
+    """
+    Process webhook data, create and send email notification based on Freqtrade webhook types
+    """
+    # Validate input data
+    if not isinstance(webhook_data, dict):
+        raise HTTPException(status_code=400, detail="Invalid webhook data format")
+    
+    # Determine webhook type
+    webhook_type = webhook_data.get('type')
+    if not webhook_type:
+        raise HTTPException(status_code=400, detail="Missing 'type' field in webhook data")
+    
+    # Log the received webhook
+    logger.info(f"Received webhook type: {webhook_type}")
+    logger.debug(f"Webhook data: {json.dumps(webhook_data, indent=2)}")
+    
+    # Validate and coerce all typed fields in a single pass before rendering
+    try:
+        with stage('validate'):
+            event = parse_payload(webhook_data)
+    except ValidationError as e:
+        logger.warning(f"Rejected malformed {webhook_type} webhook: {e.error_count()} validation error(s)")
+        raise HTTPException(status_code=422, detail=validation_errors(e))
+    
+    # With several workers, claim the event so a retried webhook is emailed exactly once
+    event_id = None
+    if shared_state is not None:
+        event_id = event_fingerprint(webhook_data)
+        claimed, message_id = await state_call(shared_state.claim, event_id)
+        if not claimed:
+            logger.info(f"Duplicate {webhook_type} webhook ignored (already {'sent' if message_id else 'in flight'})")
+            return {
+                'status': 'duplicate',
+                'message': f'Webhook already received for {webhook_type}',
+                'messageId': message_id
+            }
+    
+    # Closed trades feed the incremental daily/weekly summaries, counted once per DEDUP_TTL_SECONDS
+    # even when a failed send makes Freqtrade retry the same payload
+    if webhook_type == 'exit_fill' and event.profit_ratio is not None:
+        claim_once = shared_state.claim_once if shared_state is not None else local_once.claim_once
+        if await state_call(claim_once, f"pnl:{event_id or event_fingerprint(webhook_data)}"):
+            await state_call(pnl_summary.record, event.pair or 'Unknown', event.strategy or 'Unknown',
+                             event.profit_ratio)
+    
+    # A bot or pair firing far above its usual rate gets one alert instead of a flood of emails;
+    # the alert is sent in the background so the webhook that tripped it is answered right away
+    if anomaly_detector is not None:
+        incidents, suppressed = anomaly_detector.observe(webhook_data, time.time())
+        for incident in incidents:
+            logger.warning(f"Signal flood from {incident.scope} {incident.key}: {incident.reason}")
+            task = asyncio.create_task(send_alert(incident, deliver_email, flood_claim()))
+            alert_tasks.add(task)
+            task.add_done_callback(alert_tasks.discard)
+        if suppressed:
+            if event_id is not None:
+                await state_call(shared_state.complete, event_id, 'suppressed')
+            logger.info(f"Suppressed {webhook_type} email during signal flood")
+            return {
+                'status': 'suppressed',
+                'message': f'Webhook received; {webhook_type} email suppressed during a signal flood'
+            }
+    
+    # Types with a delivery schedule (quiet hours, business hours, delay) may have to wait;
+    # the raw event is queued and only rendered when it is released
+    now = datetime.now()
+    release_at = release_time(delivery_rules, webhook_type, now)
+    key = coalesce_key(webhook_data, COALESCE_KEY) if webhook_type in COALESCE_TYPES else None
+    if key is not None and release_at is None:
+        release_at = now + timedelta(seconds=COALESCE_WINDOW)
+    if release_at is not None:
+        record = await state_call(deferred_queue.push, webhook_data, release_at.timestamp(), key=key)
+        release_at = datetime.fromtimestamp(record['release_at'])
+        if event_id is not None:
+            await state_call(shared_state.complete, event_id, f"deferred:{record['id']}")
+        if record['coalesced']:
+            # Latest wins: the pending email now renders this event instead
+            logger.info(f"Coalesced {webhook_type} webhook into pending email ({record['coalesced']} superseded)")
+            return {
+                'status': 'coalesced',
+                'message': f'Webhook received; replaced pending {webhook_type} email scheduled for {release_at.isoformat()}',
+                'releaseAt': release_at.isoformat()
+            }
+        logger.info(f"Deferred {webhook_type} email until {release_at.isoformat()}")
+        return {
+            'status': 'deferred',
+            'message': f'Webhook received; email for {webhook_type} scheduled for {release_at.isoformat()}',
+            'releaseAt': release_at.isoformat()
+        }
+    
+    subject, body_text, body_html = render_email(webhook_data, event)
+    
+    try:
+        await wait_for_send_slot()
         
+        # Send email using AWS SES (tracked so shutdown can drain or spool it)
+        with stage('deliver'):
+            response = await deliver_email(subject, body_text, body_html, event_id)
+        
+        if event_id is not None:
+            await state_call(shared_state.complete, event_id, response['MessageId'])
         logger.info(f"Email sent for webhook type {webhook_type}! Message ID: {response['MessageId']}")
         
         return {
@@ -412,6 +838,9 @@ async def process_webhook_data(webhook_data: dict):
             'messageId': response['MessageId']
         }
     except Exception as e:
+        if event_id is not None:
+            # Let Freqtrade's retry claim the event again
+            await state_call(shared_state.release, event_id)
         logger.error(f"Failed to send email for webhook type {webhook_type}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
 
@@ -422,9 +851,12 @@ async def webhook(request: Request, token: Optional[str] = None, authorized: boo
     """
     try:
         # Get the webhook data
-        webhook_data = await request.json()
+        with stage('parse'):
+            webhook_data = await read_webhook_body(request)
         # Process webhook data and send email
         return await process_webhook_data(webhook_data)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing webhook: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -438,14 +870,15 @@ async def webhook_log_only(request: Request, token: Optional[str] = None, author
     """
     try:
         # Get the webhook data
-        webhook_data = await request.json()
+        with stage('parse'):
+            webhook_data = await read_webhook_body(request)
         
         # Validate input data
         if not isinstance(webhook_data, dict):
             raise HTTPException(status_code=400, detail="Invalid webhook data format")
         
         # Log the received webhook with special tag for easy filtering
-        logger.info(f"LOG_ONLY_WEBHOOK: {json.dumps(webhook_data, indent=2)}")
+        logger.info(f"LOG_ONLY_WEBHOOK: {json.dumps(webhook_data, indent=2, default=str)}")
         
         # Return success response
         return {
@@ -453,6 +886,8 @@ async def webhook_log_only(request: Request, token: Optional[str] = None, author
             'message': 'Webhook received and logged (no email sent)',
             'timestamp': datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing log-only webhook: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -472,14 +907,15 @@ async def webhook_log_only_path_auth(path_key: str, request: Request):
     
     try:
         # Get the webhook data
-        webhook_data = await request.json()
+        with stage('parse'):
+            webhook_data = await read_webhook_body(request)
         
         # Validate input data
         if not isinstance(webhook_data, dict):
             raise HTTPException(status_code=400, detail="Invalid webhook data format")
         
         # Log the received webhook with special tag for easy filtering
-        logger.info(f"LOG_ONLY_WEBHOOK: {json.dumps(webhook_data, indent=2)}")
+        logger.info(f"LOG_ONLY_WEBHOOK: {json.dumps(webhook_data, indent=2, default=str)}")
         
         # Return success response
         return {
@@ -487,6 +923,8 @@ async def webhook_log_only_path_auth(path_key: str, request: Request):
             'message': 'Webhook received and logged (no email sent)',
             'timestamp': datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing log-only webhook: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -518,9 +956,12 @@ async def webhook_path_auth(
     
     try:
         # Get the webhook data
-        webhook_data = await request.json()
+        with stage('parse'):
+            webhook_data = await read_webhook_body(request)
         # Process webhook data and send email
         return await process_webhook_data(webhook_data)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing webhook: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -531,7 +972,57 @@ async def index():
     logger.debug("Health check endpoint accessed")
     return {"status": "online", "service": "Freqtrade Email Notifier"}
 
+@app.get("/admin/profiler")
+async def profiler_status(token: Optional[str] = None, authorized: bool = Depends(verify_api_key)):
+    """
+    Current slow request profiler settings
+    """
+    return profiler.status()
+
+@app.post("/admin/profiler")
+async def configure_profiler(
+    enabled: bool,
+    threshold_ms: Optional[float] = None,
+    sample_rate: Optional[float] = None,
+    token: Optional[str] = None,
+    authorized: bool = Depends(verify_api_key),
+):
+    """
+    Enable/disable the slow request profiler at runtime
+    """
+    profiler.enabled = enabled
+    if threshold_ms is not None:
+        profiler.threshold_ms = threshold_ms
+    if sample_rate is not None:
+        profiler.sample_rate = sample_rate
+    logger.info(f"Slow request profiler updated: {profiler.status()}")
+    return profiler.status()
+
+@app.get("/metrics")
+async def metrics(token: Optional[str] = None, authorized: bool = Depends(verify_api_key)):
+    """
+    Operational counters
+    """
+    return {
+        'body_guard': body_guard.stats(),
+        'in_flight_emails': len(delivery_tracker.in_flight),
+        'deferred': await state_call(deferred_queue.status),
+        'anomaly': anomaly_detector.status() if anomaly_detector is not None else None,
+    }
+
+# Readiness probe for load balancers; flips to 503 while draining on shutdown
+@app.get("/ready")
+async def ready():
+    if delivery_tracker.draining:
+        return JSONResponse(status_code=503, content={"status": "draining"})
+    return {"status": "ready"}
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
-    logger.info(f"Starting server on 127.0.0.1:{port}")
-    uvicorn.run(app, host="127.0.0.1", port=port)
\ No newline at end of file
+    logger.info(f"Starting server on 127.0.0.1:{port} with {WORKERS} worker(s)")
+    if WORKERS > 1:
+        # Workers import the app themselves, so it has to be passed as an import string
+        uvicorn.run("app:app", host="127.0.0.1", port=port, workers=WORKERS,
+                    timeout_graceful_shutdown=SHUTDOWN_REQUEST_TIMEOUT)
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=port, timeout_graceful_shutdown=SHUTDOWN_REQUEST_TIMEOUT)
\ No newline at end of file
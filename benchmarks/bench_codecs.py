@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Benchmark webhook body parsing: json vs orjson vs msgpack (and CBOR).
+
+Every webhook type from freqtrade_webhook_config.json is encoded in each
+format and decoded repeatedly, as one event per request and as a bulk
+array of events the way an aggregator forwards them. The decode_body rows
+are the service's own path per Content-Type, including the conversion of
+binary formats to the JSON dict shape. CBOR is skipped when cbor2 is not installed.
+
+Usage:
+    python benchmarks/bench_codecs.py --iterations 50000 --bulk 100
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+import msgpack
+import orjson
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_validation import load_sample_payloads  # noqa: E402
+from body_codecs import decode_body  # noqa: E402
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+def codecs() -> list:
+    """
+    (name, encode, decode) for every available format
+    """
+    available = [
+        ('json', lambda value: json.dumps(value).encode('utf-8'), json.loads),
+        ('orjson', orjson.dumps, orjson.loads),
+    ]
+    available.append(('msgpack', msgpack.packb, lambda body: msgpack.unpackb(body, raw=False)))
+    if cbor2 is not None:
+        available.append(('cbor2', cbor2.dumps, cbor2.loads))
+    # The service's own path per Content-Type
+    available.append(('decode_body/json', available[0][1],
+                      lambda body: decode_body(body, 'application/json')))
+    available.append(('decode_body/msgpack', msgpack.packb, lambda body: decode_body(body, 'application/msgpack')))
+    return available
+
+
+def bench(decode, body: bytes, iterations: int) -> float:
+    """
+    Return the mean decode cost in microseconds
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode(body)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark webhook body decoding per format')
+    parser.add_argument('--iterations', type=int, default=50000,
+                        help='Decodes per format and payload (default: 50000)')
+    parser.add_argument('--bulk', type=int, default=100,
+                        help='Events per bulk array (default: 100)')
+    args = parser.parse_args()
+
+    payloads = load_sample_payloads()
+    # A bulk forward mixes every webhook type
+    bulk = list(itertools.islice(itertools.cycle(payloads.values()), args.bulk))
+    shapes = list(payloads.items()) + [(f"bulk x{args.bulk}", bulk)]
+    available = codecs()
+
+    print(f"{'payload':<14} {'codec':<20} {'bytes':>7} {'us/decode':>10} {'events/s':>12}")
+    for name, value in shapes:
+        events = len(value) if isinstance(value, list) else 1
+        for codec, encode, decode in available:
+            body = encode(value)
+            assert decode(body) == value, f"{codec} round trip changed {name}"
+            # Warm up before timing
+            iterations = max(1, args.iterations // events)
+            bench(decode, body, min(1000, iterations))
+            cost = bench(decode, body, iterations)
+            print(f"{name:<14} {codec:<20} {len(body):>7} {cost:>10.2f} {events * 1e6 / cost:>12,.0f}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
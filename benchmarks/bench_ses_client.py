@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+Benchmark the asyncio SES client against boto3 in a thread pool.
+
+Both backends send the same emails to a local fake SES endpoint with the
+given concurrency; throughput, latency and client-side CPU time per email
+are reported. The fake endpoint can add latency to mimic SES and runs in
+its own process, so its threads neither compete for this process's GIL nor
+show up in the thread counts.
+
+Usage:
+    python benchmarks/bench_ses_client.py --emails 2000 --concurrency 200 --ses-latency-ms 50
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+from botocore.credentials import Credentials
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ses_async import AsyncSESClient  # noqa: E402
+
+EMAIL = {
+    'Source': 'bench@example.com',
+    'Destination': {'ToAddresses': ['recipient@example.com']},
+    'Message': {
+        'Subject': {'Data': 'Freqtrade Alert - entry', 'Charset': 'UTF-8'},
+        'Body': {
+            'Text': {'Data': 'Pair: BTC/USDT\n' * 20, 'Charset': 'UTF-8'},
+            'Html': {'Data': '<li>Pair: BTC/USDT</li>\n' * 20, 'Charset': 'UTF-8'},
+        },
+    },
+}
+
+
+async def run(send, emails: int, concurrency: int) -> list:
+    """
+    Send `emails` emails with at most `concurrency` in flight; returns latencies
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await send()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(emails)))
+    return latencies
+
+
+def report(name: str, elapsed: float, cpu: float, latencies: list, threads: int):
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    cpu_ms = cpu / len(latencies) * 1000
+    print(f"{name:<8} {len(latencies) / elapsed:>9.0f} {p50:>8.1f} {p99:>8.1f} {cpu_ms:>8.2f} {threads:>8}")
+
+
+def start_fake_ses(latency_ms: float) -> tuple:
+    """
+    Run fake_ses.py in a subprocess; returns (process, endpoint url)
+    """
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), 'fake_ses.py'),
+         '--port', str(port), '--latency-ms', str(latency_ms)],
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return proc, f"http://127.0.0.1:{port}/"
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError('Fake SES endpoint did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark async SES client vs boto3 in threads')
+    parser.add_argument('--emails', type=int, default=2000, help='Emails per backend (default: 2000)')
+    parser.add_argument('--concurrency', type=int, default=200, help='Concurrent sends (default: 200)')
+    parser.add_argument('--ses-latency-ms', type=float, default=50.0, help='Fake SES latency (default: 50)')
+    args = parser.parse_args()
+
+    server, endpoint = start_fake_ses(args.ses_latency_ms)
+    credentials = Credentials('benchmark', 'benchmark')
+
+    print(f"{'backend':<8} {'emails/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'cpu ms':>8} {'threads':>8}")
+
+    # boto3: one blocking call per thread, as asyncio.to_thread would run it
+    boto_client = boto3.client(
+        'ses', region_name='us-east-1', endpoint_url=endpoint,
+        aws_access_key_id=credentials.access_key, aws_secret_access_key=credentials.secret_key,
+        config=Config(max_pool_connections=args.concurrency),
+    )
+    executor = ThreadPoolExecutor(max_workers=args.concurrency)
+
+    async def boto_send():
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, lambda: boto_client.send_email(**EMAIL))
+
+    threads_before = threading.active_count()
+    start, cpu_start = time.perf_counter(), time.process_time()
+    latencies = asyncio.run(run(boto_send, args.emails, args.concurrency))
+    report('boto3', time.perf_counter() - start, time.process_time() - cpu_start, latencies, threading.active_count() - threads_before)
+    executor.shutdown()
+
+    # asyncio client: everything on the event loop
+    async def async_bench():
+        client = AsyncSESClient('us-east-1', endpoint_url=endpoint, credentials=credentials,
+                                max_connections=args.concurrency)
+        try:
+            return await run(lambda: client.send_email(**EMAIL), args.emails, args.concurrency)
+        finally:
+            await client.aclose()
+
+    threads_before = threading.active_count()
+    start, cpu_start = time.perf_counter(), time.process_time()
+    latencies = asyncio.run(async_bench())
+    report('async', time.perf_counter() - start, time.process_time() - cpu_start, latencies, threading.active_count() - threads_before)
+    server.terminate()
+    server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Benchmark payload validation cost per webhook type.
+
+Payloads are built from the templates in freqtrade_webhook_config.json with
+every placeholder rendered as a string, exactly as Freqtrade sends them.
+
+Usage:
+    python benchmarks/bench_validation.py --iterations 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import PAYLOAD_MODELS, parse_payload  # noqa: E402
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'freqtrade_webhook_config.json')
+
+# Sample values substituted for the "{placeholder}" strings in the templates
+SAMPLE_VALUES = {
+    'trade_id': '1234',
+    'exchange': 'binance',
+    'pair': 'BTC/USDT',
+    'direction': 'Long',
+    'leverage': '1.0',
+    'open_rate': '50123.45',
+    'close_rate': '51234.56',
+    'current_rate': '51200.1',
+    'limit': '51234.56',
+    'amount': '0.00123',
+    'open_date': '2025-03-20 10:15:00.123456+00:00',
+    'close_date': '2025-03-20 14:45:30.654321+00:00',
+    'stake_amount': '61.65',
+    'stake_currency': 'USDT',
+    'base_currency': 'BTC',
+    'quote_currency': 'USDT',
+    'order_type': 'limit',
+    'enter_tag': 'rsi_cross',
+    'exit_reason': 'roi',
+    'gain': 'profit',
+    'profit_amount': '1.36',
+    'profit_ratio': '0.0221',
+    'status': 'running',
+    'msg': 'Market is trending up',
+}
+
+
+def load_sample_payloads():
+    """
+    Render each webhook template from the example config with sample values
+    """
+    with open(CONFIG_PATH) as f:
+        webhook_config = json.load(f)['webhook']
+
+    payloads = {}
+    for webhook_type in PAYLOAD_MODELS:
+        template = webhook_config[webhook_type]
+        payloads[webhook_type] = {
+            key: SAMPLE_VALUES.get(value.strip('{}'), value) if key != 'type' else value
+            for key, value in template.items()
+        }
+    return payloads
+
+
+def bench(payload, iterations):
+    """
+    Return the mean validation cost in microseconds
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        parse_payload(payload)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark webhook payload validation')
+    parser.add_argument('--iterations', type=int, default=50000,
+                        help='Validations per webhook type (default: 50000)')
+    args = parser.parse_args()
+
+    payloads = load_sample_payloads()
+
+    print(f"{'type':<14} {'fields':>6} {'us/event':>10} {'events/s':>12}")
+    for webhook_type, payload in payloads.items():
+        # Warm up before timing
+        bench(payload, min(1000, args.iterations))
+        cost = bench(payload, args.iterations)
+        print(f"{webhook_type:<14} {len(payload):>6} {cost:>10.2f} {1e6 / cost:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Benchmark webhook throughput with 1..N uvicorn workers on one host.
+
+Each run starts the notifier with the given worker count against a local
+fake SES endpoint, sends distinct webhooks with bounded concurrency and
+reports requests per second.
+
+Usage:
+    python benchmarks/bench_workers.py --workers 1,2,4 --requests 4000
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import fake_ses  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_service(workers: int, port: int, ses_url: str, state_dir: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        WORKERS=str(workers),
+        SHARED_STATE_PATH=os.path.join(state_dir, f'state-{workers}.db'),
+        SUMMARY_SNAPSHOT_PATH=os.path.join(state_dir, 'pnl_summary.json'),
+        SPOOL_DIR=os.path.join(state_dir, 'spool'),
+        PROFILE_DIR=os.path.join(state_dir, 'profiles'),
+        DEFERRED_QUEUE_PATH=os.path.join(state_dir, 'deferred_queue.jsonl'),
+        SES_ENDPOINT_URL=ses_url,
+        AWS_ACCESS_KEY_ID='benchmark',
+        AWS_SECRET_ACCESS_KEY='benchmark',
+        API_KEY='',
+    )
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app:app', '--host', '127.0.0.1', '--port', str(port),
+         '--workers', str(workers), '--log-level', 'warning', '--app-dir', ROOT],
+        # Run from the temporary directory so app.log and other relative files stay out of the checkout
+        cwd=state_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Service at {url} did not become ready")
+
+
+async def fire(url: str, total: int, concurrency: int, tag: str) -> tuple:
+    """
+    Send `total` distinct entry webhooks; returns (elapsed seconds, failures).
+    `tag` keeps payloads of different runs apart so none are deduplicated.
+    """
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+    failures = 0
+
+    async def worker(client):
+        nonlocal failures
+        while not queue.empty():
+            i = queue.get_nowait()
+            payload = {'type': 'entry', 'trade_id': str(i), 'pair': 'BTC/USDT', 'amount': '0.001',
+                       'open_rate': '50000.0', 'stake_currency': 'USDT', 'enter_tag': tag}
+            response = await client.post(url, json=payload)
+            if response.status_code != 200:
+                failures += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        return time.perf_counter() - start, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark throughput scaling across workers')
+    parser.add_argument('--workers', type=str, default=f"1,2,{os.cpu_count() or 4}",
+                        help='Comma-separated worker counts to test')
+    parser.add_argument('--requests', type=int, default=4000, help='Webhooks per run (default: 4000)')
+    parser.add_argument('--concurrency', type=int, default=64, help='Concurrent clients (default: 64)')
+    parser.add_argument('--ses-latency-ms', type=float, default=0.0, help='Fake SES response delay')
+    args = parser.parse_args()
+
+    ses = fake_ses.start(latency_ms=args.ses_latency_ms)
+    ses_url = f"http://127.0.0.1:{ses.server_address[1]}"
+
+    print(f"{'workers':>7} {'requests':>9} {'seconds':>8} {'req/s':>9} {'speedup':>8} {'failed':>7}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as state_dir:
+        for workers in (int(n) for n in args.workers.split(',')):
+            port = free_port()
+            proc = start_service(workers, port, ses_url, state_dir)
+            try:
+                wait_ready(f"http://127.0.0.1:{port}/")
+                # Warm up every worker's connections before measuring
+                url = f"http://127.0.0.1:{port}/webhook"
+                asyncio.run(fire(url, workers * 50, args.concurrency, 'warmup'))
+                elapsed, failures = asyncio.run(fire(url, args.requests, args.concurrency, 'measure'))
+            finally:
+                proc.terminate()
+                proc.wait()
+            rate = args.requests / elapsed
+            baseline = baseline or rate
+            print(f"{workers:>7} {args.requests:>9} {elapsed:>8.2f} {rate:>9.0f} {rate / baseline:>7.2f}x {failures:>7}")
+    ses.shutdown()
+
+
+if __name__ == '__main__':
+    main()
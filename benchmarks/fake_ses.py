@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Minimal local stand-in for the SES query API, for benchmarks.
+
+Answers every POST with a SendEmail response carrying a fresh MessageId,
+optionally after an artificial delay to mimic SES latency. Point the
+notifier at it with SES_ENDPOINT_URL=http://127.0.0.1:<port>.
+
+Usage:
+    python benchmarks/fake_ses.py --port 9324 --latency-ms 20
+"""
+
+import argparse
+import itertools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPONSE = """<SendEmailResponse xmlns="http://ses.amazonaws.com/doc/2010-12-01/">
+  <SendEmailResult>
+    <MessageId>{message_id}</MessageId>
+  </SendEmailResult>
+  <ResponseMetadata>
+    <RequestId>{message_id}</RequestId>
+  </ResponseMetadata>
+</SendEmailResponse>
+"""
+
+
+class FakeSESServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open hundreds of connections at once
+    request_queue_size = 1024
+
+
+def make_handler(latency: float):
+    counter = itertools.count(1)
+
+    class FakeSESHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if latency:
+                time.sleep(latency)
+            body = RESPONSE.format(message_id=f"fake-{next(counter):012d}").encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeSESHandler
+
+
+def start(port: int = 0, latency_ms: float = 0.0) -> FakeSESServer:
+    """
+    Start the fake SES server in a background thread; returns the server
+    (its bound port is server.server_address[1])
+    """
+    server = FakeSESServer(('127.0.0.1', port), make_handler(latency_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake SES endpoint for benchmarks')
+    parser.add_argument('--port', type=int, default=9324, help='Port to listen on (default: 9324)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Artificial response delay')
+    args = parser.parse_args()
+
+    server = FakeSESServer(('127.0.0.1', args.port), make_handler(args.latency_ms / 1000))
+    print(f"Fake SES listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
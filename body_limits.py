@@ -0,0 +1,178 @@
+"""
+ASGI request body guard: per-route body size limits enforced while the body
+streams in, and path-key authentication before any of it is read.
+
+Oversize requests are answered with 413 as soon as their Content-Length (or
+the bytes received so far) exceed the route's limit, so the app never
+buffers more than the limit. Requests to /webhook/{path_key} with a wrong
+key get a 401 without their body being read at all.
+"""
+
+import json
+import logging
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger("freqtrade-notifier")
+
+SIZE_UNITS = {'k': 1024, 'm': 1024 * 1024}
+# Methods whose bodies are never read
+BODYLESS_METHODS = {'GET', 'HEAD', 'OPTIONS', 'DELETE'}
+
+
+def parse_size(value: str) -> int:
+    """
+    "65536", "64k" or "1m" -> bytes
+    """
+    value = value.strip().lower()
+    if value and value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+def parse_route_limits(spec: str) -> Dict[str, int]:
+    """
+    Parse "/webhook/log-only=1m,/webhook=64k" into {path prefix: bytes}
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        prefix, size = item.split('=')
+        limits[prefix.strip()] = parse_size(size)
+    return limits
+
+
+class BodyGuard:
+    """
+    Body size limits, path-key check and rejection counters shared with the
+    middleware (and reported by /metrics)
+    """
+
+    def __init__(self, default_limit: int, route_limits: Optional[Dict[str, int]] = None,
+                 path_key_authorized: Optional[Callable[[str], bool]] = None):
+        self.default_limit = default_limit
+        # Longest prefix first, so /webhook/log-only wins over /webhook
+        self.route_limits = sorted((route_limits or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.path_key_authorized = path_key_authorized
+        self.too_large = 0
+        self.unauthorized = 0
+        # Bytes actually received from rejected requests vs. announced but never read
+        self.rejected_bytes_read = 0
+        self.rejected_bytes_unread = 0
+
+    def limit_for(self, path: str) -> int:
+        for prefix, limit in self.route_limits:
+            if path == prefix or path.startswith(prefix.rstrip('/') + '/'):
+                return limit
+        return self.default_limit
+
+    def reject(self, reason: str, read: int, declared: Optional[int]):
+        if reason == 'too_large':
+            self.too_large += 1
+        else:
+            self.unauthorized += 1
+        self.rejected_bytes_read += read
+        if declared is not None and declared > read:
+            self.rejected_bytes_unread += declared - read
+
+    def stats(self) -> dict:
+        return {
+            'default_limit': self.default_limit,
+            'route_limits': dict(self.route_limits),
+            'rejected_too_large': self.too_large,
+            'rejected_unauthorized': self.unauthorized,
+            'rejected_bytes_read': self.rejected_bytes_read,
+            'rejected_bytes_unread': self.rejected_bytes_unread,
+        }
+
+
+def _content_length(scope) -> Optional[int]:
+    for name, value in scope['headers']:
+        if name == b'content-length':
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+async def _respond(send, status: int, detail: str):
+    body = json.dumps({'detail': detail}).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii')),
+            # The rest of the body is not going to be read
+            (b'connection', b'close'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class BodyGuardMiddleware:
+    """
+    Pure ASGI middleware applying a BodyGuard to every HTTP request
+    """
+
+    def __init__(self, app, guard: BodyGuard):
+        self.app = app
+        self.guard = guard
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] in BODYLESS_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        guard = self.guard
+        path = scope['path']
+        declared = _content_length(scope)
+
+        if guard.path_key_authorized is not None and not guard.path_key_authorized(path):
+            guard.reject('unauthorized', 0, declared)
+            logger.warning(f"Rejected path key request to {path} before reading its body")
+            await _respond(send, 401, 'Invalid API Key in path')
+            return
+
+        limit = guard.limit_for(path)
+        if declared is not None and declared > limit:
+            guard.reject('too_large', 0, declared)
+            logger.warning(f"Rejected {declared} byte request to {path} (limit {limit})")
+            await _respond(send, 413, f"Request body too large (limit {limit} bytes)")
+            return
+
+        # Stream the body in, stopping as soon as it passes the limit
+        chunks = []
+        received = 0
+        while True:
+            message = await receive()
+            if message['type'] != 'http.request':
+                # Client went away; let the app see the disconnect
+                break
+            chunk = message.get('body', b'')
+            received += len(chunk)
+            if received > limit:
+                guard.reject('too_large', received, declared)
+                logger.warning(f"Rejected request to {path} after {received} bytes (limit {limit})")
+                await _respond(send, 413, f"Request body too large (limit {limit} bytes)")
+                return
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                message = {'type': 'http.request', 'body': b''.join(chunks), 'more_body': False}
+                break
+
+        await self.app(scope, _replay_receive(message, receive), send)
+
+
+def _replay_receive(first: dict, receive):
+    """
+    receive() that hands the app the buffered body (or the disconnect) in
+    one message, then falls through to the real receive
+    """
+    pending = [first]
+
+    async def replay():
+        if pending:
+            return pending.pop()
+        return await receive()
+
+    return replay
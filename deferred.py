@@ -0,0 +1,391 @@
+"""
+Deferred delivery: quiet hours, business hours and fixed delays per webhook type.
+
+A webhook whose delivery rule says "not now" is kept raw in a DeferredQueue
+(a min-heap on release time, journaled to disk so a restart does not lose
+it) and only rendered and sent when its release time comes. The release
+loop hands due messages out in batches of a configurable size with a pause
+between batches, so a window opening on a backlog does not burst SES.
+
+Messages pushed with a coalescing key (e.g. type + pair) are latest-wins:
+a newer event for a key that is still pending replaces the pending one in
+place, so a burst of per-candle updates ends up as a single email carrying
+the newest values.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from summary import WEEKDAYS, parse_clock
+
+logger = logging.getLogger("freqtrade-notifier")
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_days(text: str) -> set:
+    """
+    "mon-fri" or "mon,wed,sat" -> weekday numbers
+    """
+    days = set()
+    for part in text.lower().split(','):
+        if '-' in part:
+            first, last = (WEEKDAYS.index(day[:3]) for day in part.split('-'))
+            days.update((first + i) % 7 for i in range((last - first) % 7 + 1))
+        else:
+            days.add(WEEKDAYS.index(part[:3]))
+    return days
+
+
+def parse_duration(text: str) -> float:
+    """
+    "300", "90s", "5m", "2h" or "1d" -> seconds
+    """
+    text = text.strip().lower()
+    if text and text[-1] in DURATION_UNITS:
+        return float(text[:-1]) * DURATION_UNITS[text[-1]]
+    return float(text)
+
+
+def _at(day: datetime, clock: Tuple[int, int]) -> datetime:
+    return day.replace(hour=clock[0], minute=clock[1], second=0, microsecond=0)
+
+
+class QuietHours:
+    """
+    Hold messages during a daily window (which may span midnight) and
+    release them when it ends
+    """
+
+    def __init__(self, start: Tuple[int, int], end: Tuple[int, int]):
+        self.start = start
+        self.end = end
+
+    def release_at(self, now: datetime) -> Optional[datetime]:
+        start, end = _at(now, self.start), _at(now, self.end)
+        if start <= end:
+            return end if start <= now < end else None
+        # Window wraps midnight, e.g. 23:00-07:00
+        if now >= start:
+            return end + timedelta(days=1)
+        return end if now < end else None
+
+    def __repr__(self):
+        return f"quiet {self.start[0]:02d}:{self.start[1]:02d}-{self.end[0]:02d}:{self.end[1]:02d}"
+
+
+class BusinessHours:
+    """
+    Deliver only inside a daily window on the given weekdays; anything
+    outside waits for the next opening
+    """
+
+    def __init__(self, days: set, start: Tuple[int, int], end: Tuple[int, int]):
+        self.days = days
+        self.start = start
+        self.end = end
+
+    def release_at(self, now: datetime) -> Optional[datetime]:
+        for offset in range(8):
+            day = now + timedelta(days=offset)
+            if day.weekday() not in self.days:
+                continue
+            opening = _at(day, self.start)
+            if offset == 0 and opening <= now < _at(day, self.end):
+                return None
+            if opening > now:
+                return opening
+        return None
+
+    def __repr__(self):
+        days = ','.join(WEEKDAYS[day] for day in sorted(self.days))
+        return f"business {days} {self.start[0]:02d}:{self.start[1]:02d}-{self.end[0]:02d}:{self.end[1]:02d}"
+
+
+class FixedDelay:
+    """
+    Deliver every message a fixed time after it was received
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def release_at(self, now: datetime) -> Optional[datetime]:
+        return now + timedelta(seconds=self.seconds) if self.seconds > 0 else None
+
+    def __repr__(self):
+        return f"delay {self.seconds:g}s"
+
+
+def parse_rule(text: str):
+    """
+    "quiet 23:00-07:00", "business mon-fri 09:00-18:00" or "delay 5m"
+    """
+    kind, _, args = text.strip().partition(' ')
+    args = args.split()
+    if kind == 'quiet':
+        start, end = args[0].split('-')
+        return QuietHours(parse_clock(start), parse_clock(end))
+    if kind == 'business':
+        days = parse_days(args[0]) if len(args) > 1 else parse_days('mon-fri')
+        start, end = args[-1].split('-')
+        return BusinessHours(days, parse_clock(start), parse_clock(end))
+    if kind == 'delay':
+        return FixedDelay(parse_duration(args[0]))
+    raise ValueError(f"Unknown delivery rule: {text!r}")
+
+
+def parse_delivery_rules(spec: str) -> Dict[str, object]:
+    """
+    Parse "status,strategy_msg=quiet 23:00-07:00; *=delay 1m" into
+    {webhook type: rule}; "*" applies to types without their own rule
+    """
+    rules = {}
+    for item in filter(None, (part.strip() for part in spec.split(';'))):
+        types, rule = item.split('=', 1)
+        rule = parse_rule(rule)
+        for webhook_type in filter(None, (t.strip() for t in types.split(','))):
+            rules[webhook_type] = rule
+    return rules
+
+
+def coalesce_key(webhook: dict, fields: List[str]) -> str:
+    """
+    Coalescing key of a webhook built from the given fields (e.g. type, pair)
+    """
+    return '\x1f'.join(str(webhook.get(field, '')) for field in fields)
+
+
+def release_time(rules: Dict[str, object], webhook_type: str, now: datetime) -> Optional[datetime]:
+    """
+    When a webhook of this type received at `now` may be sent (None: right away)
+    """
+    rule = rules.get(webhook_type) or rules.get('*')
+    return rule.release_at(now) if rule is not None else None
+
+
+class DeferredQueue:
+    """
+    Min-heap of deferred webhooks ordered by release time. Every change is
+    appended to a JSONL journal, replayed (and compacted) at startup.
+    """
+    # Whether calls may block on other processes (and so belong in a worker thread)
+    blocking = False
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        # (release_at, sequence, id); entries removed from _entries are skipped lazily
+        self._heap: List[Tuple[float, int, str]] = []
+        self._entries: Dict[str, dict] = {}
+        # Coalescing key -> id of the pending record for that key
+        self._keys: Dict[str, str] = {}
+        self._seq = itertools.count()
+        self._journal = None
+        self._journal_lines = 0
+        # Events folded into an already pending record since startup
+        self.coalesced = 0
+        # Set by the release loop so an earlier message wakes it up
+        self.wakeup: Optional[asyncio.Event] = None
+        self.wakeup_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.load()
+
+    def push(self, webhook: dict, release_at: float, received_at: Optional[float] = None,
+             key: Optional[str] = None) -> dict:
+        """
+        Defer a raw webhook until `release_at` (epoch seconds). With a `key`,
+        a pending record for the same key is replaced in place instead (its
+        release time is kept, so a steady stream cannot postpone it forever);
+        the returned record's `coalesced` count is then non-zero.
+        """
+        received_at = received_at or time.time()
+        current = self._entries.get(self._keys.get(key)) if key is not None else None
+        if current is not None:
+            current['webhook'] = webhook
+            current['received_at'] = received_at
+            current['coalesced'] = current.get('coalesced', 0) + 1
+            self.coalesced += 1
+            self._append({'op': 'add', 'record': current})
+            return current
+
+        record = {
+            'id': uuid.uuid4().hex,
+            'release_at': release_at,
+            'received_at': received_at,
+            'attempts': 0,
+            'key': key,
+            'coalesced': 0,
+            'webhook': webhook,
+        }
+        self.requeue(record, release_at)
+        return record
+
+    def requeue(self, record: dict, release_at: float):
+        """
+        Put a (possibly previously released) record back in the queue
+        """
+        key = record.get('key')
+        if key is not None:
+            pending_id = self._keys.get(key)
+            if pending_id is not None and pending_id != record['id']:
+                # A newer event for the same key is already waiting; it wins
+                self.coalesced += 1
+                return
+            self._keys[key] = record['id']
+        record['release_at'] = release_at
+        self._entries[record['id']] = record
+        heapq.heappush(self._heap, (release_at, next(self._seq), record['id']))
+        self._append({'op': 'add', 'record': record})
+        self._wake()
+
+    def _wake(self):
+        """
+        Wake the release loop; safe to call from a worker thread
+        """
+        if self.wakeup is not None and not self.wakeup_loop.is_closed():
+            self.wakeup_loop.call_soon_threadsafe(self.wakeup.set)
+
+    def pop_due(self, now: float, limit: int) -> List[dict]:
+        """
+        Remove and return up to `limit` records due at `now`, earliest first
+        """
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < limit:
+            release_at, _, record_id = heapq.heappop(self._heap)
+            record = self._entries.get(record_id)
+            if record is None or record['release_at'] != release_at:
+                # Stale heap entry of a record that was requeued or removed
+                continue
+            del self._entries[record_id]
+            if record.get('key') is not None:
+                self._keys.pop(record['key'], None)
+            self._append({'op': 'done', 'id': record_id})
+            due.append(record)
+        return due
+
+    def next_release(self) -> Optional[float]:
+        while self._heap:
+            release_at, _, record_id = self._heap[0]
+            record = self._entries.get(record_id)
+            if record is not None and record['release_at'] == release_at:
+                return release_at
+            heapq.heappop(self._heap)
+        return None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _append(self, entry: dict):
+        if self._journal is None:
+            return
+        self._journal.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        self._journal.flush()
+        self._journal_lines += 1
+        # Rewrite once removed records dominate the journal
+        if self._journal_lines > max(1000, 4 * len(self._entries)):
+            self._compact()
+
+    def _compact(self):
+        if self._journal is not None:
+            self._journal.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for record in self._entries.values():
+                f.write(json.dumps({'op': 'add', 'record': record}, separators=(',', ':')) + '\n')
+        os.replace(tmp_path, self.path)
+        self._journal = open(self.path, 'a')
+        self._journal_lines = len(self._entries)
+
+    def load(self):
+        """
+        Restore pending records from the journal
+        """
+        if not self.path:
+            return
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn last write of a crash
+                        continue
+                    if entry.get('op') == 'add':
+                        record = entry['record']
+                        self._entries[record['id']] = record
+                    elif entry.get('op') == 'done':
+                        self._entries.pop(entry['id'], None)
+            self._heap = [(record['release_at'], next(self._seq), record_id)
+                          for record_id, record in self._entries.items()]
+            self._keys = {record['key']: record_id for record_id, record in self._entries.items()
+                          if record.get('key') is not None}
+            heapq.heapify(self._heap)
+            if self._entries:
+                logger.info(f"Restored {len(self._entries)} deferred email(s) from {self.path}")
+        self._compact()
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def status(self) -> dict:
+        next_at = self.next_release()
+        return {
+            'pending': len(self),
+            'next_release': datetime.fromtimestamp(next_at).isoformat() if next_at else None,
+            'coalesced': self.coalesced,
+        }
+
+
+async def _call(queue: DeferredQueue, fn, *args):
+    # A queue in the shared database may wait on another worker's write lock
+    if queue.blocking:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+async def run_release_loop(queue: DeferredQueue, release: Callable[[dict], Awaitable[dict]],
+                           batch_size: int = 10, batch_interval: float = 1.0, max_attempts: int = 5,
+                           poll_interval: float = 30.0):
+    """
+    Release due messages until cancelled: at most `batch_size` at a time,
+    `batch_interval` seconds apart. A failed release is retried with
+    exponential backoff and dropped after `max_attempts`.
+    """
+    wakeup = asyncio.Event()
+    queue.wakeup_loop = asyncio.get_running_loop()
+    queue.wakeup = wakeup
+    while True:
+        now = time.time()
+        batch = await _call(queue, queue.pop_due, now, batch_size)
+        if not batch:
+            wakeup.clear()
+            next_at = await _call(queue, queue.next_release)
+            timeout = poll_interval if next_at is None else min(poll_interval, max(0.0, next_at - now))
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        results = await asyncio.gather(*(release(record) for record in batch), return_exceptions=True)
+        for record, result in zip(batch, results):
+            if not isinstance(result, Exception):
+                continue
+            record['attempts'] += 1
+            webhook_type = record['webhook'].get('type')
+            if record['attempts'] >= max_attempts:
+                logger.error(f"Dropping deferred {webhook_type} email after {record['attempts']} attempts: {result}")
+                continue
+            backoff = min(3600.0, 60.0 * 2 ** (record['attempts'] - 1))
+            logger.warning(f"Deferred {webhook_type} email failed ({result}), retrying in {backoff:.0f}s")
+            await _call(queue, queue.requeue, record, time.time() + backoff)
+        await asyncio.sleep(batch_interval)
@@ -0,0 +1,145 @@
+"""
+In-flight delivery tracking, graceful drain and the on-disk spool.
+
+Every email goes through DeliveryTracker.deliver(), which runs the send as
+its own task so it survives the cancellation of the request that started
+it. On shutdown the tracker stops accepting work, waits for in-flight sends
+up to a deadline and writes whatever is still undelivered to the spool
+directory; the spool is replayed at the next startup.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+logger = logging.getLogger("freqtrade-notifier")
+
+# send(subject, body_text, body_html) -> SES response; blocking or a coroutine function
+SendFunc = Callable[[str, str, str], Union[dict, Awaitable[dict]]]
+
+
+class DeliveryTracker:
+    """
+    Tracks emails being sent and spools the ones that could not finish
+    """
+
+    def __init__(self, spool_dir: str):
+        self.spool_dir = spool_dir
+        self.draining = False
+        self.in_flight: Dict[asyncio.Task, dict] = {}
+
+    def begin_drain(self):
+        """
+        Stop accepting new webhooks; readiness reports not-ready from now on
+        """
+        if not self.draining:
+            logger.info("Draining: no longer accepting new webhooks")
+        self.draining = True
+
+    def _send(self, send: SendFunc, message: dict) -> dict:
+        response = send(message['subject'], message['body_text'], message['body_html'])
+        # A message spooled while its send was still running must not be replayed
+        self._unspool(message['id'])
+        return response
+
+    async def _send_async(self, send: SendFunc, message: dict) -> dict:
+        response = await send(message['subject'], message['body_text'], message['body_html'])
+        self._unspool(message['id'])
+        return response
+
+    async def deliver(self, message: dict, send: SendFunc) -> dict:
+        """
+        Send a rendered message ({subject, body_text, body_html, ...}) on the
+        event loop (async senders) or in a worker thread (blocking senders).
+        The send keeps running if the caller is cancelled.
+        """
+        message.setdefault('id', uuid.uuid4().hex)
+        if inspect.iscoroutinefunction(send):
+            task = asyncio.ensure_future(self._send_async(send, message))
+        else:
+            task = asyncio.ensure_future(asyncio.to_thread(self._send, send, message))
+        self.in_flight[task] = message
+        task.add_done_callback(lambda t: self.in_flight.pop(t, None))
+        return await asyncio.shield(task)
+
+    async def drain(self, timeout: float) -> int:
+        """
+        Wait up to `timeout` seconds for in-flight sends and spool the rest.
+        Returns the number of spooled messages.
+        """
+        self.begin_drain()
+        pending = set(self.in_flight)
+        if pending:
+            logger.info(f"Waiting up to {timeout}s for {len(pending)} in-flight email(s)")
+            _, pending = await asyncio.wait(pending, timeout=timeout)
+        for task in pending:
+            self.spool(self.in_flight.get(task))
+        if pending:
+            logger.warning(f"Spooled {len(pending)} undelivered email(s) to {self.spool_dir}")
+        return len(pending)
+
+    def _path(self, message_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{message_id}.json")
+
+    def spool(self, message: Optional[dict]):
+        """
+        Atomically persist an undelivered message for replay
+        """
+        if message is None:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = self._path(message['id'])
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(message, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _unspool(self, message_id: str):
+        try:
+            os.remove(self._path(message_id))
+        except FileNotFoundError:
+            pass
+
+    async def replay(self, send: SendFunc, on_sent: Optional[Callable[[dict, dict], Awaitable[None]]] = None) -> int:
+        """
+        Deliver everything left in the spool by a previous run. Each file is
+        claimed by renaming it, so concurrent workers never replay the same
+        message. Returns the number of messages delivered.
+        """
+        if not os.path.isdir(self.spool_dir):
+            return 0
+
+        delivered = 0
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            claimed = f"{path}.replaying-{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                # Another worker took it
+                continue
+
+            try:
+                with open(claimed) as f:
+                    message = json.load(f)
+                response = await self.deliver(message, send)
+            except asyncio.CancelledError:
+                # Shutting down: the send is still tracked and drain() spools it if unfinished
+                os.remove(claimed)
+                raise
+            except Exception as e:
+                logger.error(f"Failed to replay spooled email {name}: {str(e)}")
+                os.rename(claimed, path)
+                continue
+
+            os.remove(claimed)
+            delivered += 1
+            logger.info(f"Replayed spooled email {message['id']}! Message ID: {response['MessageId']}")
+            if on_sent is not None:
+                await on_sent(message, response)
+        return delivered
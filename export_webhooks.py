@@ -0,0 +1,450 @@
+#!/usr/bin/env python
+"""
+Export archived Freqtrade webhooks to columnar files and analyze them.
+
+Sources are the same as for replay_webhooks.py (app.log LOG_ONLY_WEBHOOK
+entries and JSONL files) and are streamed in chunks of --chunk-size rows,
+so memory stays flat however long the history is. Two output formats:
+  - npy (default): a directory with one NumPy .npy array per column and
+    dictionaries.json mapping the type/pair codes back to strings
+  - parquet: a single file, one row group per chunk (requires pyarrow)
+
+Columns: ts (datetime64[ms]; app.log times as logged, timezone-aware JSONL
+times in UTC, NaT when missing), type and pair (dictionary codes, -1 when
+missing), trade_id (-1 when missing) and the float columns below (NaN when
+missing).
+
+The analyze command loads an export and computes, with vectorized NumPy
+operations only: signals per pair per hour, the exit_fill profit_ratio
+distribution and the latency between each trade's first entry and its
+first entry_fill.
+
+Usage:
+    python export_webhooks.py export app.log.1 app.log --out history
+    python export_webhooks.py export trades.jsonl --out history.parquet --format parquet
+    python export_webhooks.py analyze history
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from collections import Counter
+from datetime import timezone
+from typing import Dict, Iterable
+
+import numpy as np
+
+from models import EMPTY_VALUES
+from replay_webhooks import Event, iter_events
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+DEFAULT_CHUNK_SIZE = 100000
+
+DICTIONARY_COLUMNS = ('type', 'pair')
+FLOAT_COLUMNS = ('profit_ratio', 'open_rate', 'close_rate', 'amount', 'stake_amount')
+COLUMNS = {
+    'ts': np.dtype('datetime64[ms]'),
+    'type': np.dtype('int16'),
+    'pair': np.dtype('int32'),
+    'trade_id': np.dtype('int64'),
+    **{name: np.dtype('float64') for name in FLOAT_COLUMNS},
+}
+
+PROFIT_QUANTILES = (0, 5, 25, 50, 75, 95, 100)
+LATENCY_QUANTILES = (50, 90, 99, 100)
+
+# Fixed .npy header size (magic + length + dict), so the final row count
+# can be written over the placeholder once the stream ends
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+NPY_HEADER_SIZE = 128
+
+
+class Dictionary:
+    """
+    Maps strings to dense integer codes in order of first appearance
+    """
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.codes = {}
+        self.values = []
+        for value in values:
+            self.code(value)
+
+    def code(self, value) -> int:
+        if not isinstance(value, str) or not value:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _to_float(value) -> float:
+    if isinstance(value, str) and value.strip().lower() in EMPTY_VALUES:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _to_int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+class ChunkBuilder:
+    """
+    Accumulates events row by row and hands them out as column arrays
+    """
+
+    def __init__(self, dictionaries: Dict[str, Dictionary]):
+        self.dictionaries = dictionaries
+        self.rows = {name: [] for name in COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.rows['ts'])
+
+    def add(self, event: Event):
+        timestamp, payload = event
+        rows = self.rows
+        if timestamp is not None and timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        # datetime objects (and None as NaT) are converted in one go by take()
+        rows['ts'].append(timestamp)
+        for name in DICTIONARY_COLUMNS:
+            rows[name].append(self.dictionaries[name].code(payload.get(name)))
+        rows['trade_id'].append(_to_int(payload.get('trade_id')))
+        for name in FLOAT_COLUMNS:
+            value = payload.get(name)
+            rows[name].append(np.nan if value is None else _to_float(value))
+
+    def take(self) -> Dict[str, np.ndarray]:
+        columns = {name: np.array(values, dtype=COLUMNS[name]) for name, values in self.rows.items()}
+        self.rows = {name: [] for name in COLUMNS}
+        return columns
+
+
+def _npy_header(dtype: np.dtype, rows: int) -> bytes:
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (rows,)})
+    length = NPY_HEADER_SIZE - len(NPY_MAGIC) - 2
+    return NPY_MAGIC + struct.pack('<H', length) + header.ljust(length - 1).encode('latin1') + b'\n'
+
+
+class NpyWriter:
+    """
+    Appends chunks to one .npy file per column under a directory
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.rows = 0
+        self.files = {}
+        for name, dtype in COLUMNS.items():
+            f = open(os.path.join(path, f"{name}.npy"), 'wb')
+            f.write(_npy_header(dtype, 0))
+            self.files[name] = f
+
+    def write(self, columns: Dict[str, np.ndarray], dictionaries: Dict[str, Dictionary]):
+        for name, f in self.files.items():
+            f.write(columns[name].tobytes())
+        self.rows += len(columns['ts'])
+
+    def close(self, dictionaries: Dict[str, Dictionary]):
+        for name, f in self.files.items():
+            f.seek(0)
+            f.write(_npy_header(COLUMNS[name], self.rows))
+            f.close()
+        with open(os.path.join(self.path, 'dictionaries.json'), 'w') as f:
+            json.dump({name: dictionaries[name].values for name in DICTIONARY_COLUMNS}, f)
+
+
+class ParquetWriter:
+    """
+    Writes each chunk as a row group of a Parquet file, with type/pair as
+    dictionary encoded string columns
+    """
+
+    def __init__(self, path: str):
+        if pq is None:
+            raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)')
+        fields = [pa.field('ts', pa.timestamp('ms'))]
+        fields += [pa.field(name, pa.dictionary(pa.int32(), pa.string())) for name in DICTIONARY_COLUMNS]
+        fields += [pa.field('trade_id', pa.int64())] + [pa.field(name, pa.float64()) for name in FLOAT_COLUMNS]
+        self.schema = pa.schema(fields)
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.rows = 0
+
+    def write(self, columns: Dict[str, np.ndarray], dictionaries: Dict[str, Dictionary]):
+        arrays = []
+        for field in self.schema:
+            values = columns[field.name]
+            if field.name in DICTIONARY_COLUMNS:
+                indices = pa.array(values.astype(np.int32), mask=values < 0)
+                dictionary = pa.array(dictionaries[field.name].values, pa.string())
+                arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+            elif field.name == 'trade_id':
+                arrays.append(pa.array(values, mask=values < 0))
+            else:
+                arrays.append(pa.array(values, type=field.type, from_pandas=True))
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        self.rows += len(columns['ts'])
+
+    def close(self, dictionaries: Dict[str, Dictionary]):
+        self.writer.close()
+
+
+def export(events: Iterable[Event], path: str, fmt: str = 'npy', chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Stream events into a columnar export at `path`. Returns the row count.
+    """
+    writer = ParquetWriter(path) if fmt == 'parquet' else NpyWriter(path)
+    dictionaries = {name: Dictionary() for name in DICTIONARY_COLUMNS}
+    builder = ChunkBuilder(dictionaries)
+    try:
+        for event in events:
+            builder.add(event)
+            if len(builder) >= chunk_size:
+                writer.write(builder.take(), dictionaries)
+        if len(builder):
+            writer.write(builder.take(), dictionaries)
+    finally:
+        writer.close(dictionaries)
+    return writer.rows
+
+
+def _parquet_codes(column) -> tuple:
+    """
+    Dictionary codes (-1 for nulls) and values of a dictionary column whose
+    chunks share one dictionary
+    """
+    if not column.num_chunks:
+        return np.zeros(0, dtype=np.int32), []
+    codes = np.concatenate([chunk.indices.fill_null(-1).to_numpy() for chunk in column.chunks])
+    return codes.astype(np.int32), column.chunk(0).dictionary.to_pylist()
+
+
+def load(path: str, mmap: bool = True) -> dict:
+    """
+    Load an export as {'columns': {name: array}, 'dictionaries': {name: [values]}}.
+    .npy columns are memory mapped.
+    """
+    if os.path.isdir(path):
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None)
+                   for name in COLUMNS}
+        with open(os.path.join(path, 'dictionaries.json')) as f:
+            dictionaries = json.load(f)
+        return {'columns': columns, 'dictionaries': dictionaries}
+
+    if pq is None:
+        raise RuntimeError('Reading Parquet exports requires pyarrow (pip install pyarrow)')
+    # Row groups carry their own dictionaries; unify them so the codes are comparable
+    table = pq.read_table(path, columns=list(COLUMNS)).unify_dictionaries()
+    columns, dictionaries = {}, {}
+    for name, dtype in COLUMNS.items():
+        column = table.column(name)
+        if name in DICTIONARY_COLUMNS:
+            columns[name], dictionaries[name] = _parquet_codes(column)
+        elif name == 'trade_id':
+            columns[name] = column.fill_null(-1).to_numpy()
+        else:
+            columns[name] = column.to_numpy().astype(dtype)
+    return {'columns': columns, 'dictionaries': dictionaries}
+
+
+def _type_mask(data: dict, webhook_type: str) -> np.ndarray:
+    types = data['dictionaries']['type']
+    if webhook_type not in types:
+        return np.zeros(len(data['columns']['type']), dtype=bool)
+    return np.asarray(data['columns']['type']) == types.index(webhook_type)
+
+
+def signals_per_pair_hour(data: dict) -> dict:
+    """
+    Count of webhooks per pair per hour, as a (pairs x hours) matrix over
+    the hours from the first to the last timestamped pair webhook
+    """
+    ts = np.asarray(data['columns']['ts'])
+    pair = np.asarray(data['columns']['pair'])
+    pairs = data['dictionaries']['pair']
+    valid = (pair >= 0) & ~np.isnat(ts)
+    if not valid.any():
+        return {'pairs': pairs, 'hours': np.array([], dtype='datetime64[h]'),
+                'counts': np.zeros((len(pairs), 0), dtype=np.int64)}
+
+    hour = ts[valid].astype('datetime64[h]')
+    first = hour.min()
+    offset = (hour - first).astype(np.int64)
+    span = int(offset.max()) + 1
+    counts = np.bincount(pair[valid].astype(np.int64) * span + offset, minlength=len(pairs) * span)
+    return {'pairs': pairs, 'hours': first + np.arange(span), 'counts': counts.reshape(len(pairs), span)}
+
+
+def profit_distribution(data: dict, bins: int = 20) -> dict:
+    """
+    profit_ratio statistics of exit_fill webhooks, overall and per pair
+    """
+    profit = np.asarray(data['columns']['profit_ratio'])
+    mask = _type_mask(data, 'exit_fill') & np.isfinite(profit)
+    values = profit[mask]
+    if not len(values):
+        return {'count': 0}
+
+    pairs = data['dictionaries']['pair']
+    pair = np.asarray(data['columns']['pair'])[mask]
+    known = pair >= 0
+    per_pair_count = np.bincount(pair[known], minlength=len(pairs))
+    per_pair_total = np.bincount(pair[known], weights=values[known], minlength=len(pairs))
+    histogram, edges = np.histogram(values, bins=bins)
+    return {
+        'count': len(values),
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'win_rate': float((values > 0).mean()),
+        'quantiles': dict(zip(PROFIT_QUANTILES, np.percentile(values, PROFIT_QUANTILES).tolist())),
+        'histogram': (histogram, edges),
+        'per_pair': {pairs[i]: (int(per_pair_count[i]), float(per_pair_total[i] / per_pair_count[i]))
+                     for i in np.flatnonzero(per_pair_count)},
+    }
+
+
+def _first_by_trade(data: dict, webhook_type: str, span: int) -> tuple:
+    """
+    Trade keys and earliest timestamp of the webhooks of one type
+    """
+    ts = np.asarray(data['columns']['ts'])
+    trade_id = np.asarray(data['columns']['trade_id'])
+    pair = np.asarray(data['columns']['pair'])
+    mask = _type_mask(data, webhook_type) & (trade_id >= 0) & ~np.isnat(ts)
+    # trade_id is only unique per bot; the pair tells apart bots sharing a notifier
+    keys = trade_id[mask] * span + (pair[mask].astype(np.int64) + 1)
+    times = ts[mask].astype(np.int64)
+    order = np.lexsort((times, keys))
+    unique_keys, first = np.unique(keys[order], return_index=True)
+    return unique_keys, times[order][first]
+
+
+def fill_latency(data: dict) -> dict:
+    """
+    Seconds between each trade's first entry and its first entry_fill
+    """
+    span = len(data['dictionaries']['pair']) + 1
+    entry_keys, entry_times = _first_by_trade(data, 'entry', span)
+    fill_keys, fill_times = _first_by_trade(data, 'entry_fill', span)
+    _, entry_index, fill_index = np.intersect1d(entry_keys, fill_keys, assume_unique=True, return_indices=True)
+    latency = (fill_times[fill_index] - entry_times[entry_index]) / 1000.0
+    # A fill logged before its entry means the trade id was reused or the logs are out of order
+    latency = latency[latency >= 0]
+    if not len(latency):
+        return {'count': 0, 'unfilled': len(entry_keys)}
+    return {
+        'count': len(latency),
+        'unfilled': len(entry_keys) - len(entry_index),
+        'mean': float(latency.mean()),
+        'quantiles': dict(zip(LATENCY_QUANTILES, np.percentile(latency, LATENCY_QUANTILES).tolist())),
+    }
+
+
+def print_summary(data: dict, top: int = 10):
+    columns, dictionaries = data['columns'], data['dictionaries']
+    rows = len(columns['ts'])
+    type_counts = np.bincount(np.asarray(columns['type'])[np.asarray(columns['type']) >= 0],
+                              minlength=len(dictionaries['type']))
+    print(f"Rows:     {rows}")
+    print(f"Types:    {', '.join(f'{t}={c}' for t, c in zip(dictionaries['type'], type_counts.tolist())) or '-'}")
+
+    signals = signals_per_pair_hour(data)
+    counts = signals['counts']
+    if counts.size:
+        totals = counts.sum(axis=1)
+        active_hours = np.maximum((counts > 0).sum(axis=1), 1)
+        print(f"\nSignals per pair per hour ({signals['hours'][0]} .. {signals['hours'][-1]}, top {top}):")
+        for i in np.argsort(-totals, kind='stable')[:top]:
+            if not totals[i]:
+                break
+            peak = int(counts[i].argmax())
+            print(f"  {signals['pairs'][i]:<16} total {totals[i]:>8}  mean {totals[i] / active_hours[i]:>7.1f}/h  "
+                  f"peak {counts[i, peak]:>6} at {signals['hours'][peak]}")
+
+    profit = profit_distribution(data)
+    if profit['count']:
+        quantiles = '  '.join(f"p{q}={v:+.4f}" for q, v in profit['quantiles'].items())
+        print(f"\nexit_fill profit_ratio ({profit['count']} exits): mean {profit['mean']:+.4f} "
+              f"std {profit['std']:.4f} win rate {profit['win_rate']:.1%}")
+        print(f"  {quantiles}")
+        histogram, edges = profit['histogram']
+        scale = 40 / max(int(histogram.max()), 1)
+        for count, low in zip(histogram.tolist(), edges[:-1].tolist()):
+            print(f"  {low:>+9.4f} {count:>8} {'#' * int(round(count * scale))}")
+
+    latency = fill_latency(data)
+    if latency['count']:
+        quantiles = '  '.join(f"p{q}={v:.1f}s" for q, v in latency['quantiles'].items())
+        print(f"\nentry -> entry_fill latency ({latency['count']} trades, {latency['unfilled']} unfilled): "
+              f"mean {latency['mean']:.1f}s  {quantiles}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export archived webhooks to columnar files and analyze them')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help='Convert app.log/JSONL archives to columnar files')
+    export_parser.add_argument('sources', nargs='+',
+                               help='app.log files (LOG_ONLY_WEBHOOK entries) and/or .jsonl files, in order')
+    export_parser.add_argument('--out', type=str, required=True,
+                               help='Output directory (npy) or file (parquet)')
+    export_parser.add_argument('--format', type=str, choices=['npy', 'parquet'], default='npy',
+                               help='Output format (default: npy)')
+    export_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                               help=f'Rows buffered per write (default: {DEFAULT_CHUNK_SIZE})')
+    export_parser.add_argument('--type', type=str, action='append', dest='types',
+                               help='Only export webhooks of this type (repeatable)')
+    export_parser.add_argument('--summary', action='store_true', help='Analyze the export once written')
+
+    analyze_parser = commands.add_parser('analyze', help='Summarize an export')
+    analyze_parser.add_argument('path', help='Export directory (npy) or file (parquet)')
+    analyze_parser.add_argument('--top', type=int, default=10, help='Pairs to list (default: 10)')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'export':
+            if args.chunk_size <= 0:
+                parser.error('--chunk-size must be positive')
+            errors = Counter()
+            events = iter_events(args.sources, errors)
+            if args.types:
+                events = (event for event in events if event[1].get('type') in args.types)
+            start = time.perf_counter()
+            rows = export(events, args.out, args.format, args.chunk_size)
+            elapsed = time.perf_counter() - start
+            print(f"Exported {rows} webhooks to {args.out} in {elapsed:.2f}s")
+            if errors['malformed']:
+                print(f"Skipped {errors['malformed']} malformed entries")
+            path = args.out
+            if not args.summary:
+                return
+        else:
+            path = args.path
+        start = time.perf_counter()
+        data = load(path)
+        print_summary(data, getattr(args, 'top', 10))
+        print(f"\nAnalyzed in {time.perf_counter() - start:.2f}s")
+    except (FileNotFoundError, RuntimeError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Typed payload models for Freqtrade webhooks.
+
+Freqtrade renders every placeholder in the webhook templates as a string
+("{amount}" -> "0.001"), so numeric and date fields arrive stringified.
+The models below are compiled once at import time and coerce those fields
+in a single validation pass, so the renderer only ever sees typed values.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+# Placeholder values Freqtrade emits for fields that are not set
+EMPTY_VALUES = {'', 'none', 'null', 'nan'}
+
+# Fields coerced to numbers/dates for every trade related webhook type
+NUMERIC_FIELDS = (
+    'leverage', 'open_rate', 'close_rate', 'current_rate', 'limit', 'amount',
+    'stake_amount', 'profit_amount', 'profit_ratio',
+)
+DATE_FIELDS = ('open_date', 'close_date')
+
+
+class WebhookPayload(BaseModel):
+    """
+    Base model for all webhook types. Unknown fields are kept as-is so
+    custom templates keep working.
+    """
+    model_config = ConfigDict(extra='allow', coerce_numbers_to_str=True)
+
+    type: str
+
+
+class TradePayload(WebhookPayload):
+    """
+    Fields shared by entry/exit webhooks
+    """
+    trade_id: Optional[int] = None
+    exchange: Optional[str] = None
+    pair: Optional[str] = None
+    direction: Optional[str] = None
+    order_type: Optional[str] = None
+    stake_currency: Optional[str] = None
+    base_currency: Optional[str] = None
+    quote_currency: Optional[str] = None
+    enter_tag: Optional[str] = None
+    exit_reason: Optional[str] = None
+    strategy: Optional[str] = None
+    gain: Optional[str] = None
+    leverage: Optional[float] = None
+    open_rate: Optional[float] = None
+    close_rate: Optional[float] = None
+    current_rate: Optional[float] = None
+    limit: Optional[float] = None
+    amount: Optional[float] = None
+    stake_amount: Optional[float] = None
+    profit_amount: Optional[float] = None
+    profit_ratio: Optional[float] = None
+    open_date: Optional[datetime] = None
+    close_date: Optional[datetime] = None
+
+    @field_validator('trade_id', *NUMERIC_FIELDS, *DATE_FIELDS, mode='before')
+    @classmethod
+    def empty_to_none(cls, value: Any) -> Any:
+        """
+        Treat Freqtrade's "None"/empty placeholders as missing values
+        """
+        if isinstance(value, str) and value.strip().lower() in EMPTY_VALUES:
+            return None
+        return value
+
+
+class EntryPayload(TradePayload):
+    pass
+
+
+class EntryCancelPayload(TradePayload):
+    pass
+
+
+class EntryFillPayload(TradePayload):
+    pass
+
+
+class ExitPayload(TradePayload):
+    pass
+
+
+class ExitFillPayload(TradePayload):
+    pass
+
+
+class ExitCancelPayload(TradePayload):
+    pass
+
+
+class StatusPayload(WebhookPayload):
+    status: Optional[str] = None
+
+
+class StrategyMsgPayload(WebhookPayload):
+    msg: Any = None
+
+
+# Model lookup by webhook type; anything else falls back to WebhookPayload
+PAYLOAD_MODELS: Dict[str, Type[WebhookPayload]] = {
+    'entry': EntryPayload,
+    'entry_cancel': EntryCancelPayload,
+    'entry_fill': EntryFillPayload,
+    'exit': ExitPayload,
+    'exit_fill': ExitFillPayload,
+    'exit_cancel': ExitCancelPayload,
+    'status': StatusPayload,
+    'strategy_msg': StrategyMsgPayload,
+}
+
+
+def parse_payload(webhook_data: dict) -> WebhookPayload:
+    """
+    Validate and coerce a webhook dict into its typed model.
+    Raises pydantic.ValidationError for malformed payloads.
+    """
+    webhook_type = webhook_data.get('type')
+    # A non-string type (e.g. a list) is left to WebhookPayload to reject
+    model = PAYLOAD_MODELS.get(webhook_type, WebhookPayload) if isinstance(webhook_type, str) else WebhookPayload
+    return model.model_validate(webhook_data)
+
+
+def validation_errors(error: ValidationError) -> list:
+    """
+    Convert a ValidationError into a JSON serializable error list
+    """
+    return [
+        {
+            'loc': list(err['loc']),
+            'msg': err['msg'],
+            'type': err['type'],
+        }
+        for err in error.errors(include_url=False)
+    ]
+
+
+def format_value(value: Any) -> str:
+    """
+    Render a typed value for display in an email
+    """
+    if isinstance(value, float):
+        # Avoid scientific notation for small prices/amounts
+        text = f"{value:.12f}".rstrip('0').rstrip('.')
+        return text if text not in ('', '-0') else '0'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
@@ -0,0 +1,148 @@
+"""
+Per-request stage timings and a slow-request sampling profiler.
+
+Code inside a request marks its stages with `stage('render')` (or
+`record_stage()`); the timing middleware reports them in a Server-Timing
+header together with an X-Request-ID. Outside of a request, or with the
+profiler disabled, the hooks cost little more than a context variable
+lookup.
+"""
+
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger("freqtrade-notifier")
+
+# Stage timings of the current request: list of (stage name, milliseconds)
+_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar('stage_timings', default=None)
+request_id: ContextVar[str] = ContextVar('request_id', default='-')
+# Client request IDs are reused only when safe in a file name and a log line
+SAFE_REQUEST_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a block as one stage of the current request
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.append((name, (time.perf_counter() - start) * 1000))
+
+
+def record_stage(name: str, start: float):
+    """
+    Record a stage that started at perf_counter() value `start`
+    """
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, (time.perf_counter() - start) * 1000))
+
+
+def server_timing(timings: List[Tuple[str, float]], total_ms: float) -> str:
+    """
+    Format timings as a Server-Timing header value
+    """
+    parts = [f"{name};dur={ms:.2f}" for name, ms in timings]
+    parts.append(f"total;dur={total_ms:.2f}")
+    return ', '.join(parts)
+
+
+class SlowRequestProfiler:
+    """
+    Samples requests with cProfile and keeps the profiles of those slower
+    than the threshold. Only one request is profiled at a time, since a
+    profiler sees everything the event loop runs while it is enabled.
+    """
+
+    def __init__(self, enabled: bool = False, threshold_ms: float = 1000.0,
+                 sample_rate: float = 1.0, output_dir: str = 'profiles'):
+        self.enabled = enabled
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.active = False
+        self.captured = 0
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """
+        Start profiling the current request if enabled, sampled and idle
+        """
+        if not self.enabled or self.active or random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) is already active
+            return None
+        self.active = True
+        return profile
+
+    def finish(self, profile: cProfile.Profile, total_ms: float, path: str, rid: str):
+        """
+        Stop profiling and write the profile to disk if the request was slow.
+        A failed write is logged; it must never change the response.
+        """
+        profile.disable()
+        self.active = False
+        if total_ms < self.threshold_ms:
+            return
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{int(total_ms)}ms-{rid}.prof"
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            profile.dump_stats(os.path.join(self.output_dir, name))
+        except OSError as e:
+            logger.error(f"Failed to save profile of slow request {rid} {path}: {str(e)}")
+            return
+        self.captured += 1
+        logger.warning(f"Slow request {rid} {path} took {total_ms:.0f}ms; profile saved to {name}")
+
+    def status(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': self.threshold_ms,
+            'sample_rate': self.sample_rate,
+            'output_dir': self.output_dir,
+            'captured': self.captured,
+        }
+
+
+async def timing_middleware(request, call_next, profiler: SlowRequestProfiler):
+    """
+    Tag the request with an ID, collect stage timings and profile slow requests
+    """
+    rid = request.headers.get('x-request-id', '')
+    if not SAFE_REQUEST_ID.fullmatch(rid):
+        rid = uuid.uuid4().hex[:16]
+    rid_token = request_id.set(rid)
+    timings = []
+    timings_token = _timings.set(timings)
+    profile = profiler.start()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        total_ms = (time.perf_counter() - start) * 1000
+        if profile is not None:
+            profiler.finish(profile, total_ms, request.url.path, rid)
+        _timings.reset(timings_token)
+        request_id.reset(rid_token)
+    response.headers['X-Request-ID'] = rid
+    response.headers['Server-Timing'] = server_timing(timings, total_ms)
+    return response
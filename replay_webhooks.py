@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""
+Replay archived Freqtrade webhooks against the notifier.
+
+Sources are streamed, never loaded whole:
+  - app.log files (including rotated app.log.N): the multi-line
+    `LOG_ONLY_WEBHOOK: {...}` entries written by /webhook/log-only
+  - JSONL files (*.jsonl): one webhook payload per line, or an envelope
+    {"ts": "<ISO timestamp>", "payload": {...}}; timestamps with an offset
+    are converted to naive UTC
+
+Events are replayed at their original pace (--speed 1), accelerated
+(--speed 60 plays an hour per minute) or as fast as possible (--max-speed),
+with at most --concurrency requests in flight. Achieved rate and latency
+percentiles are reported at the end.
+
+Replaying against /webhook sends real emails; point --url at
+/webhook/log-only or run the service against a fake SES
+(benchmarks/fake_ses.py) when testing capacity.
+
+Usage:
+    python replay_webhooks.py app.log.1 app.log --speed 60
+    python replay_webhooks.py trades.jsonl --max-speed --concurrency 32
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_URL = "http://localhost:5001/webhook"
+API_KEY = os.environ.get('API_KEY', '')
+
+LOG_MARKER = 'LOG_ONLY_WEBHOOK: '
+# "%(asctime)s - %(name)s - %(levelname)s - %(message)s" as configured in app.py
+LOG_RECORD_RE = re.compile(
+    r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}) - (.+?) - ([A-Z]+) - (.*)$'
+)
+
+# (original timestamp or None, webhook payload)
+Event = Tuple[Optional[datetime], dict]
+
+
+def _parse_event(timestamp: Optional[datetime], lines: List[str]) -> Optional[Event]:
+    try:
+        payload = json.loads(''.join(lines))
+    except json.JSONDecodeError:
+        return None
+    return (timestamp, payload) if isinstance(payload, dict) else None
+
+
+def iter_log_events(lines: Iterable[str], errors: Optional[Counter] = None) -> Iterator[Event]:
+    """
+    Yield webhooks from LOG_ONLY_WEBHOOK entries of an app.log line stream.
+    An entry is yielded as soon as its JSON is complete, without waiting
+    for the next record.
+    """
+    timestamp, buffer = None, None
+    for line in lines:
+        record = LOG_RECORD_RE.match(line.rstrip('\n'))
+        if record:
+            if buffer is not None and errors is not None:
+                # The previous entry never formed valid JSON
+                errors['malformed'] += 1
+            buffer = None
+            message = record.group(5)
+            if not message.startswith(LOG_MARKER):
+                continue
+            timestamp = datetime.strptime(record.group(1), '%Y-%m-%d %H:%M:%S').replace(
+                microsecond=int(record.group(2)) * 1000)
+            buffer = [message[len(LOG_MARKER):], '\n']
+        elif buffer is not None:
+            buffer.append(line)
+        else:
+            continue
+
+        # json.dumps(indent=2) closes the top-level object with "}" on its own line
+        if buffer[0].rstrip() in ('{}', '[]') or line.rstrip('\n') == '}':
+            event = _parse_event(timestamp, buffer)
+            if event is not None:
+                yield event
+                buffer = None
+
+    if buffer is not None and errors is not None:
+        errors['malformed'] += 1
+
+
+def iter_jsonl_events(lines: Iterable[str], errors: Optional[Counter] = None) -> Iterator[Event]:
+    """
+    Yield webhooks from a JSONL stream of payloads or {"ts", "payload"} envelopes
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = None
+        if isinstance(record, dict) and isinstance(record.get('payload'), dict):
+            ts = record.get('ts')
+            try:
+                timestamp = datetime.fromisoformat(ts) if ts else None
+            except (TypeError, ValueError):
+                timestamp = None
+            # Log timestamps are naive, and the two cannot be compared when sources are mixed
+            if timestamp is not None and timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+            yield timestamp, record['payload']
+        elif isinstance(record, dict) and 'type' in record:
+            yield None, record
+        elif errors is not None:
+            errors['malformed'] += 1
+
+
+def _read_lines(path: str) -> Iterator[str]:
+    """
+    Lines of a file up to its size when opened. Replaying a log into the
+    service that writes it would otherwise read its own entries back forever.
+    """
+    with open(path, 'rb') as f:
+        remaining = os.fstat(f.fileno()).st_size
+        for line in f:
+            if remaining <= 0:
+                break
+            remaining -= len(line)
+            yield line.decode('utf-8', errors='replace')
+
+
+def iter_events(paths: List[str], errors: Optional[Counter] = None) -> Iterator[Event]:
+    """
+    Stream events from each source file in turn
+    """
+    for path in paths:
+        parse = iter_jsonl_events if path.endswith(('.jsonl', '.ndjson')) else iter_log_events
+        yield from parse(_read_lines(path), errors)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def target_url(url: str, api_key: str, auth_method: str) -> Tuple[str, dict]:
+    """
+    Final URL and query parameters for the chosen authentication method
+    """
+    if not api_key:
+        return url, {}
+    if auth_method == 'path':
+        return f"{url.rstrip('/')}/{api_key}", {}
+    return url, {'token': api_key}
+
+
+async def replay(events: Iterable[Event], url: str, params: Optional[dict] = None, speed: float = 1.0,
+                 max_speed: bool = False, concurrency: int = 16, timeout: float = 30.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None) -> dict:
+    """
+    Send events to `url`, paced by their timestamps divided by `speed` (or
+    back to back with `max_speed`), with at most `concurrency` requests in
+    flight. Returns the run statistics.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = Counter()
+    max_lag = 0.0
+    tasks = set()
+
+    async def send(client: httpx.AsyncClient, payload: dict):
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, params=params, json=payload)
+            statuses[response.status_code] += 1
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+        finally:
+            latencies.append(time.perf_counter() - start)
+            semaphore.release()
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout, transport=transport) as client:
+        start = time.perf_counter()
+        first_ts = None
+        for timestamp, payload in events:
+            due = None
+            if not max_speed and timestamp is not None:
+                if first_ts is None:
+                    first_ts = timestamp
+                due = start + (timestamp - first_ts).total_seconds() / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await semaphore.acquire()
+            if due is not None:
+                # Falling behind schedule means the service (or --concurrency) can't keep up
+                max_lag = max(max_lag, time.perf_counter() - due)
+            task = asyncio.create_task(send(client, payload))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'sent': len(latencies),
+        'elapsed': elapsed,
+        'rate': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'statuses': statuses,
+        'max_lag': max_lag,
+        'latency_ms': {f"p{q}": percentile(latencies, q) * 1000 for q in (50, 90, 99, 100)},
+    }
+
+
+def print_report(stats: dict, errors: Counter):
+    print(f"Sent:     {stats['sent']} webhooks in {stats['elapsed']:.2f}s ({stats['rate']:.1f}/s)")
+    print(f"Statuses: {', '.join(f'{k}={v}' for k, v in sorted(stats['statuses'].items(), key=str)) or '-'}")
+    if errors['malformed']:
+        print(f"Skipped:  {errors['malformed']} malformed entries")
+    latency = stats['latency_ms']
+    print(f"Latency:  p50={latency['p50']:.1f}ms p90={latency['p90']:.1f}ms "
+          f"p99={latency['p99']:.1f}ms max={latency['p100']:.1f}ms")
+    if stats['max_lag'] > 0.001:
+        print(f"Max lag behind schedule: {stats['max_lag'] * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay archived webhooks against the notifier')
+    parser.add_argument('sources', nargs='+',
+                        help='app.log files (LOG_ONLY_WEBHOOK entries) and/or .jsonl files, replayed in order')
+    parser.add_argument('--url', type=str, default=DEFAULT_URL,
+                        help=f'Webhook URL (default: {DEFAULT_URL})')
+    parser.add_argument('--api-key', type=str, default=API_KEY,
+                        help='API key for authentication (default: from .env file)')
+    parser.add_argument('--auth-method', type=str, choices=['query', 'path'], default='query',
+                        help='Authentication method: query parameter or path (default: query)')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Time-warp factor over the original pace (default: 1.0)')
+    parser.add_argument('--max-speed', action='store_true',
+                        help='Ignore timestamps and send as fast as --concurrency allows')
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='Maximum requests in flight (default: 16)')
+    parser.add_argument('--limit', type=int, default=0,
+                        help='Stop after this many events (default: all)')
+    parser.add_argument('--type', type=str, action='append', dest='types',
+                        help='Only replay webhooks of this type (repeatable)')
+    args = parser.parse_args()
+
+    if args.speed <= 0:
+        parser.error('--speed must be positive')
+
+    errors = Counter()
+    events = iter_events(args.sources, errors)
+    if args.types:
+        events = (event for event in events if event[1].get('type') in args.types)
+    if args.limit:
+        events = itertools.islice(events, args.limit)
+
+    url, params = target_url(args.url, args.api_key, args.auth_method)
+    mode = 'max speed' if args.max_speed else f"{args.speed:g}x original pace"
+    print(f"Replaying {', '.join(args.sources)} to {args.url} at {mode} (concurrency {args.concurrency})")
+    try:
+        stats = asyncio.run(replay(events, url, params, speed=args.speed, max_speed=args.max_speed,
+                                   concurrency=args.concurrency))
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print_report(stats, errors)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Asyncio SES client: SigV4 signed SendEmail calls over a pooled keep-alive
+httpx connection pool.
+
+AsyncSESClient.send_email() takes the same keyword arguments as boto3's
+ses_client.send_email() and returns the same {'MessageId': ...} shape, so it
+can replace the module-level ses_client. Sends run on the event loop: no
+thread is tied up per in-flight email. Only fetching credentials (an
+instance or task role refresh is a blocking metadata request) goes to a
+worker thread, and only when botocore says they are due for a refresh.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import html
+import itertools
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import urlencode, urlsplit
+
+import boto3
+import httpx
+
+logger = logging.getLogger("freqtrade-notifier")
+
+SES_API_VERSION = '2010-12-01'
+CONTENT_TYPE = 'application/x-www-form-urlencoded; charset=utf-8'
+# Errors worth retrying, mirroring botocore's legacy retry mode
+RETRYABLE_CODES = {'Throttling', 'ThrottlingException', 'RequestThrottled', 'ServiceUnavailable'}
+# httpcore rescans every queued request against every connection of a pool on
+# each state change, so one large pool burns CPU quadratically; connections
+# are split across several small pools instead
+POOL_SHARD_SIZE = 8
+
+_TAG_RE = {tag: re.compile(f"<{tag}>(.*?)</{tag}>", re.S) for tag in ('MessageId', 'RequestId', 'Code', 'Message')}
+
+
+class SESError(Exception):
+    """
+    Error response returned by SES
+    """
+
+    def __init__(self, code: str, message: str, status_code: int):
+        super().__init__(f"{code}: {message}" if code else message)
+        self.code = code
+        self.status_code = status_code
+
+
+def _xml_value(tag: str, body: str) -> Optional[str]:
+    match = _TAG_RE[tag].search(body)
+    return html.unescape(match.group(1)) if match else None
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
+
+
+class SigV4Signer:
+    """
+    AWS Signature Version 4 for form-encoded POST requests
+    """
+
+    def __init__(self, region: str, service: str = 'ses'):
+        self.region = region
+        self.service = service
+        self._key_cache = (None, None, None)
+
+    def _signing_key(self, secret_key: str, date: str) -> bytes:
+        cached_secret, cached_date, key = self._key_cache
+        if cached_secret != secret_key or cached_date != date:
+            key = _hmac(f"AWS4{secret_key}".encode('utf-8'), date)
+            for part in (self.region, self.service, 'aws4_request'):
+                key = _hmac(key, part)
+            self._key_cache = (secret_key, date, key)
+        return key
+
+    def sign(self, url: str, body: bytes, access_key: str, secret_key: str,
+             token: Optional[str] = None, now: Optional[datetime] = None) -> dict:
+        """
+        Headers (including Authorization) for a POST of `body` to `url`
+        """
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+        date = amz_date[:8]
+        parts = urlsplit(url)
+
+        headers = {
+            'content-type': CONTENT_TYPE,
+            'host': parts.netloc,
+            'x-amz-date': amz_date,
+        }
+        if token:
+            headers['x-amz-security-token'] = token
+        signed_headers = ';'.join(sorted(headers))
+        canonical_headers = ''.join(f"{name}:{headers[name]}\n" for name in sorted(headers))
+        canonical_request = '\n'.join((
+            'POST', parts.path or '/', parts.query, canonical_headers, signed_headers,
+            hashlib.sha256(body).hexdigest(),
+        ))
+
+        scope = f"{date}/{self.region}/{self.service}/aws4_request"
+        string_to_sign = '\n'.join((
+            'AWS4-HMAC-SHA256', amz_date, scope,
+            hashlib.sha256(canonical_request.encode('utf-8')).hexdigest(),
+        ))
+        signature = hmac.new(
+            self._signing_key(secret_key, date), string_to_sign.encode('utf-8'), hashlib.sha256
+        ).hexdigest()
+
+        headers['authorization'] = (
+            f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        del headers['host']
+        return headers
+
+
+def send_email_params(Source: str, Destination: dict, Message: dict, ReplyToAddresses=None, **kwargs) -> dict:
+    """
+    Flatten boto3 style send_email arguments into SES query API parameters
+    """
+    params = {'Action': 'SendEmail', 'Version': SES_API_VERSION, 'Source': Source}
+    for field in ('ToAddresses', 'CcAddresses', 'BccAddresses'):
+        for i, address in enumerate(Destination.get(field, []), start=1):
+            params[f"Destination.{field}.member.{i}"] = address
+    for i, address in enumerate(ReplyToAddresses or [], start=1):
+        params[f"ReplyToAddresses.member.{i}"] = address
+    for key, value in Message['Subject'].items():
+        params[f"Message.Subject.{key}"] = value
+    for part, content in Message['Body'].items():
+        for key, value in content.items():
+            params[f"Message.Body.{part}.{key}"] = value
+    for key in ('ReturnPath', 'SourceArn', 'ReturnPathArn', 'ConfigurationSetName'):
+        if key in kwargs:
+            params[key] = kwargs[key]
+    return params
+
+
+class AsyncSESClient:
+    """
+    Drop-in async replacement for boto3's SES client send_email()
+    """
+
+    def __init__(self, region: str, endpoint_url: Optional[str] = None, max_connections: int = 100,
+                 timeout: float = 10.0, max_attempts: int = 3, credentials=None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.endpoint_url = endpoint_url or f"https://email.{region}.amazonaws.com/"
+        self.signer = SigV4Signer(region)
+        self.max_attempts = max_attempts
+        # Reuse boto3's credential chain (env vars, profiles, instance/task roles)
+        self.credentials = credentials or boto3.Session().get_credentials()
+        self._frozen = None
+        shard_size = min(POOL_SHARD_SIZE, max_connections)
+        limits = httpx.Limits(max_connections=shard_size, max_keepalive_connections=shard_size)
+        # Load the CA bundle once for all pools
+        ssl_context = httpx.create_ssl_context()
+        self.pools = [
+            httpx.AsyncClient(timeout=timeout, limits=limits, verify=ssl_context, transport=transport)
+            for _ in range(-(-max_connections // shard_size))
+        ]
+        self._next_pool = itertools.cycle(self.pools)
+
+    async def send_email(self, **kwargs) -> dict:
+        body = urlencode(send_email_params(**kwargs)).encode('utf-8')
+
+        for attempt in range(1, self.max_attempts + 1):
+            creds = await self.frozen_credentials()
+            headers = self.signer.sign(self.endpoint_url, body, creds.access_key, creds.secret_key, creds.token)
+            try:
+                response = await next(self._next_pool).post(self.endpoint_url, content=body, headers=headers)
+            except httpx.TransportError as e:
+                if attempt == self.max_attempts:
+                    raise
+                logger.warning(f"SES request failed ({str(e)}), retrying")
+            else:
+                text = response.text
+                if response.status_code == 200:
+                    return {
+                        'MessageId': _xml_value('MessageId', text),
+                        'ResponseMetadata': {
+                            'RequestId': _xml_value('RequestId', text),
+                            'HTTPStatusCode': response.status_code,
+                        },
+                    }
+                error = SESError(_xml_value('Code', text) or '', _xml_value('Message', text) or text,
+                                 response.status_code)
+                retryable = response.status_code >= 500 or error.code in RETRYABLE_CODES
+                if not retryable or attempt == self.max_attempts:
+                    raise error
+                logger.warning(f"SES returned {error}, retrying")
+            # Exponential backoff between attempts
+            await asyncio.sleep(0.1 * 2 ** (attempt - 1))
+
+    async def frozen_credentials(self):
+        """
+        Cached frozen credentials, fetched in a worker thread when first used
+        and again once refreshable credentials near their expiry
+        """
+        if self.credentials is None:
+            raise SESError('MissingCredentials', 'Unable to locate AWS credentials', 0)
+        # refresh_needed() only compares timestamps; static credentials never need one
+        refresh_needed = getattr(self.credentials, 'refresh_needed', None)
+        if self._frozen is None or (refresh_needed is not None and refresh_needed()):
+            self._frozen = await asyncio.to_thread(self.credentials.get_frozen_credentials)
+        return self._frozen
+
+    async def aclose(self):
+        for pool in self.pools:
+            await pool.aclose()
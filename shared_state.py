@@ -0,0 +1,393 @@
+"""
+Cross-process state for multi-worker deployments.
+
+When the service runs with several uvicorn workers, every worker is a
+separate process with its own memory. This module keeps the state that has
+to be shared in a local SQLite database in WAL mode:
+
+- delivery claims, so a webhook retried by Freqtrade (or a summary run seen
+  by every worker) is emailed exactly once
+- a token bucket limiting the combined SES send rate of all workers
+- the PnL summary aggregates, updated with a single UPSERT per exit_fill
+- the deferred delivery queue, indexed on release time and coalescing key
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from deferred import DeferredQueue
+from summary import PERIODS, PnlSummary, period_key
+
+logger = logging.getLogger("freqtrade-notifier")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    event_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    message_id TEXT,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_limit (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pnl (
+    period TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    period_key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    total REAL NOT NULL,
+    cumulative REAL NOT NULL,
+    peak REAL NOT NULL,
+    max_drawdown REAL NOT NULL,
+    PRIMARY KEY (period, kind, key)
+);
+CREATE TABLE IF NOT EXISTS deferred (
+    id TEXT PRIMARY KEY,
+    release_at REAL NOT NULL,
+    key TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deferred_release_at ON deferred (release_at);
+CREATE UNIQUE INDEX IF NOT EXISTS deferred_key ON deferred (key);
+"""
+
+# Rows of a period that rolled over are reset in place by the UPSERT
+PNL_UPSERT = """
+INSERT INTO pnl (period, kind, key, period_key, count, wins, total, cumulative, peak, max_drawdown)
+VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?)
+ON CONFLICT (period, kind, key) DO UPDATE SET
+    count = CASE WHEN period_key = excluded.period_key THEN count + 1 ELSE 1 END,
+    wins = CASE WHEN period_key = excluded.period_key THEN wins + excluded.wins ELSE excluded.wins END,
+    total = CASE WHEN period_key = excluded.period_key THEN total + excluded.total ELSE excluded.total END,
+    peak = CASE WHEN period_key = excluded.period_key
+        THEN max(peak, cumulative + excluded.cumulative) ELSE excluded.peak END,
+    max_drawdown = CASE WHEN period_key = excluded.period_key
+        THEN max(max_drawdown, max(peak, cumulative + excluded.cumulative) - (cumulative + excluded.cumulative))
+        ELSE excluded.max_drawdown END,
+    cumulative = CASE WHEN period_key = excluded.period_key
+        THEN cumulative + excluded.cumulative ELSE excluded.cumulative END,
+    period_key = excluded.period_key
+"""
+
+
+def event_fingerprint(webhook_data: dict) -> str:
+    """
+    Stable identifier of a webhook payload; Freqtrade retries send identical bodies
+    """
+    canonical = json.dumps(webhook_data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class LocalOnce:
+    """
+    In-memory claim_once for a single process: a key is granted once per
+    `ttl` seconds. Keys expire in insertion order, so memory is bounded by
+    the keys seen within the TTL.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self.claimed = OrderedDict()
+
+    def claim_once(self, key: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        while self.claimed:
+            oldest, claimed_at = next(iter(self.claimed.items()))
+            if now - claimed_at < self.ttl:
+                break
+            del self.claimed[oldest]
+        if key in self.claimed:
+            return False
+        self.claimed[key] = now
+        return True
+
+
+class LocalSendRate:
+    """
+    In-memory SES send rate limit for a single process: the same token
+    bucket as SharedState.reserve_send, kept in two attributes
+    """
+
+    def __init__(self, max_send_rate: float = 0.0):
+        self.max_send_rate = max_send_rate
+        self.tokens = max_send_rate
+        self.updated = None
+
+    def reserve_send(self, now: Optional[float] = None) -> float:
+        """
+        Take one token; returns how long the caller has to wait before sending
+        """
+        if self.max_send_rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        elapsed = 0.0 if self.updated is None else now - self.updated
+        # Refill up to one second worth of burst, then take a token (may go negative)
+        self.tokens = min(self.max_send_rate, self.tokens + elapsed * self.max_send_rate) - 1
+        self.updated = now
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.max_send_rate
+
+
+class SharedState:
+    """
+    SQLite (WAL) backed state shared by all worker processes on the host
+    """
+
+    def __init__(self, path: str, dedup_ttl: float = 300.0, claim_timeout: float = 60.0,
+                 max_send_rate: float = 0.0):
+        self.path = path
+        self.dedup_ttl = dedup_ttl
+        self.claim_timeout = claim_timeout
+        self.max_send_rate = max_send_rate
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self.conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def _immediate(self, fn, *args):
+        """
+        Run fn(*args) inside a write transaction, serialized across processes
+        """
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = fn(*args)
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+            return result
+
+    def claim(self, event_id: str) -> Tuple[bool, Optional[str]]:
+        """
+        Claim an event for delivery. Returns (claimed, message_id); when not
+        claimed, message_id is set if another worker already sent it.
+        """
+        def _claim(now):
+            row = self.conn.execute(
+                'SELECT status, message_id, updated FROM deliveries WHERE event_id = ?', (event_id,)
+            ).fetchone()
+            if row is not None:
+                status, message_id, updated = row
+                if status == 'sent' and now - updated < self.dedup_ttl:
+                    return False, message_id
+                if status == 'sending' and now - updated < self.claim_timeout:
+                    return False, None
+            self.conn.execute(
+                'INSERT OR REPLACE INTO deliveries (event_id, status, message_id, updated) VALUES (?, ?, NULL, ?)',
+                (event_id, 'sending', now)
+            )
+            return True, None
+
+        now = time.time()
+        self._purge(now)
+        return self._immediate(_claim, now)
+
+    def complete(self, event_id: str, message_id: Optional[str]):
+        """
+        Mark a claimed event as delivered
+        """
+        with self._lock:
+            self.conn.execute(
+                'UPDATE deliveries SET status = ?, message_id = ?, updated = ? WHERE event_id = ?',
+                ('sent', message_id, time.time(), event_id)
+            )
+
+    def release(self, event_id: str):
+        """
+        Drop a claim after a failed delivery so a retry can claim it again
+        """
+        with self._lock:
+            self.conn.execute('DELETE FROM deliveries WHERE event_id = ? AND status = ?', (event_id, 'sending'))
+
+    def claim_once(self, event_id: str) -> bool:
+        """
+        Claim-and-complete in one step for work that cannot be retried
+        """
+        claimed, _ = self.claim(event_id)
+        if claimed:
+            self.complete(event_id, None)
+        return claimed
+
+    def _purge(self, now: float):
+        # Expire old delivery records at most once a minute per process
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        with self._lock:
+            self.conn.execute('DELETE FROM deliveries WHERE updated < ?', (now - max(self.dedup_ttl, self.claim_timeout),))
+
+    def reserve_send(self) -> float:
+        """
+        Take one token from the shared SES rate limit bucket. Returns how
+        long the caller has to wait before sending (0 when unlimited).
+        """
+        if self.max_send_rate <= 0:
+            return 0.0
+
+        def _reserve(now):
+            row = self.conn.execute('SELECT tokens, updated FROM rate_limit WHERE name = ?', ('ses',)).fetchone()
+            tokens, updated = row if row else (self.max_send_rate, now)
+            # Refill up to one second worth of burst, then take a token (may go negative)
+            tokens = min(self.max_send_rate, tokens + (now - updated) * self.max_send_rate) - 1
+            self.conn.execute(
+                'INSERT OR REPLACE INTO rate_limit (name, tokens, updated) VALUES (?, ?, ?)', ('ses', tokens, now)
+            )
+            return 0.0 if tokens >= 0 else -tokens / self.max_send_rate
+
+        return self._immediate(_reserve, time.time())
+
+
+class SharedPnlSummary(PnlSummary):
+    """
+    PnlSummary whose aggregates live in the shared database, so every worker
+    records into and reports from the same rows
+    """
+    blocking = True
+
+    def __init__(self, state: SharedState):
+        self.state = state
+        super().__init__(snapshot_path=None)
+
+    def record(self, pair: str, strategy: str, profit_ratio: float, when: Optional[datetime] = None):
+        when = when or datetime.now()
+        win = 1 if profit_ratio > 0 else 0
+        rows = [
+            (period, kind, key, period_key(period, when), win, profit_ratio, profit_ratio,
+             max(0.0, profit_ratio), max(0.0, -profit_ratio))
+            for period in PERIODS
+            for kind, key in (('pair', pair), ('strategy', strategy), ('total', 'all'))
+        ]
+        self.state._immediate(self.state.conn.executemany, PNL_UPSERT, rows)
+
+    def _rows(self, period: str, key: str, kind: str) -> List[dict]:
+        with self.state._lock:
+            rows = self.state.conn.execute(
+                'SELECT key, count, wins, total, max_drawdown FROM pnl WHERE period = ? AND kind = ? AND period_key = ?',
+                (period, kind, key)
+            ).fetchall()
+        return [
+            {
+                'key': row_key,
+                'count': count,
+                'total_profit_ratio': total,
+                'mean_profit_ratio': total / count if count else 0.0,
+                'win_rate': wins / count if count else 0.0,
+                'max_drawdown': max_drawdown,
+            }
+            for row_key, count, wins, total, max_drawdown in rows
+        ]
+
+    def save(self):
+        # Every record() is already committed to the shared database
+        pass
+
+    def load(self):
+        pass
+
+
+class SharedDeferredQueue(DeferredQueue):
+    """
+    DeferredQueue kept in the shared database: any worker can defer a
+    message and due messages are claimed (deleted) by exactly one worker
+    """
+    blocking = True
+
+    def __init__(self, state: SharedState):
+        self.state = state
+        super().__init__(path=None)
+
+    def push(self, webhook: dict, release_at: float, received_at: Optional[float] = None,
+             key: Optional[str] = None) -> dict:
+        if key is None:
+            return super().push(webhook, release_at, received_at)
+        received_at = received_at or time.time()
+
+        # Look up and insert in one transaction, so concurrent workers agree on the pending record
+        def _push():
+            row = self.state.conn.execute('SELECT id, record FROM deferred WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                # Latest wins: replace the pending record's event, keep its release time
+                record = json.loads(row[1])
+                record['webhook'] = webhook
+                record['received_at'] = received_at
+                record['coalesced'] = record.get('coalesced', 0) + 1
+                self.state.conn.execute('UPDATE deferred SET record = ? WHERE id = ?', (json.dumps(record), row[0]))
+                return record
+            record = {
+                'id': uuid.uuid4().hex,
+                'release_at': release_at,
+                'received_at': received_at,
+                'attempts': 0,
+                'key': key,
+                'coalesced': 0,
+                'webhook': webhook,
+            }
+            self.state.conn.execute(
+                'INSERT INTO deferred (id, release_at, key, record) VALUES (?, ?, ?, ?)',
+                (record['id'], release_at, key, json.dumps(record))
+            )
+            return record
+
+        record = self.state._immediate(_push)
+        if record['coalesced']:
+            self.coalesced += 1
+        else:
+            self._wake()
+        return record
+
+    def requeue(self, record: dict, release_at: float):
+        record['release_at'] = release_at
+
+        def _requeue():
+            key = record.get('key')
+            if key is not None and self.state.conn.execute(
+                'SELECT 1 FROM deferred WHERE key = ? AND id != ?', (key, record['id'])
+            ).fetchone():
+                # A newer event for the same key is already waiting; it wins
+                return False
+            self.state.conn.execute(
+                'INSERT OR REPLACE INTO deferred (id, release_at, key, record) VALUES (?, ?, ?, ?)',
+                (record['id'], release_at, key, json.dumps(record))
+            )
+            return True
+
+        if not self.state._immediate(_requeue):
+            self.coalesced += 1
+            return
+        self._wake()
+
+    def pop_due(self, now: float, limit: int) -> List[dict]:
+        def _pop():
+            rows = self.state.conn.execute(
+                'SELECT id, record FROM deferred WHERE release_at <= ? ORDER BY release_at LIMIT ?', (now, limit)
+            ).fetchall()
+            self.state.conn.executemany('DELETE FROM deferred WHERE id = ?', [(row[0],) for row in rows])
+            return [json.loads(row[1]) for row in rows]
+
+        return self.state._immediate(_pop)
+
+    def next_release(self) -> Optional[float]:
+        with self.state._lock:
+            return self.state.conn.execute('SELECT min(release_at) FROM deferred').fetchone()[0]
+
+    def __len__(self) -> int:
+        with self.state._lock:
+            return self.state.conn.execute('SELECT count(*) FROM deferred').fetchone()[0]
+
+    def load(self):
+        # Rows live in the shared database
+        pass
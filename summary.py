@@ -0,0 +1,355 @@
+"""
+Incremental daily/weekly PnL summaries built from exit_fill webhooks.
+
+Every exit_fill updates a handful of array-backed accumulators in O(1), so
+building a report only walks the distinct pairs/strategies of the period and
+never rescans history. The current and just completed periods are
+snapshotted to disk every few seconds while they change, so a restart does
+not reset the day.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from array import array
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger("freqtrade-notifier")
+
+PERIODS = ('daily', 'weekly')
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def period_key(period: str, when: datetime) -> str:
+    """
+    Identifier of the daily/weekly period containing `when`
+    """
+    if period == 'daily':
+        return when.strftime('%Y-%m-%d')
+    year, week, _ = when.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def completed_period(period: str, when: datetime) -> datetime:
+    """
+    A time inside the last daily/weekly period that ended before `when`
+    """
+    return when - timedelta(days=1 if period == 'daily' else 7)
+
+
+class PnlAccumulator:
+    """
+    Per-key profit statistics stored column-wise in compact arrays.
+    Keys are mapped to a row index once; updates are O(1).
+    """
+    __slots__ = ('index', 'count', 'wins', 'total', 'cumulative', 'peak', 'max_drawdown')
+
+    def __init__(self):
+        self.index = {}
+        self.count = array('l')
+        self.wins = array('l')
+        self.total = array('d')
+        self.cumulative = array('d')
+        self.peak = array('d')
+        self.max_drawdown = array('d')
+
+    def update(self, key: str, profit_ratio: float):
+        row = self.index.get(key)
+        if row is None:
+            row = self.index[key] = len(self.count)
+            for column in (self.count, self.wins):
+                column.append(0)
+            for column in (self.total, self.cumulative, self.peak, self.max_drawdown):
+                column.append(0.0)
+
+        self.count[row] += 1
+        if profit_ratio > 0:
+            self.wins[row] += 1
+        self.total[row] += profit_ratio
+
+        # Drawdown of the running (summed) profit ratio since the period start
+        cumulative = self.cumulative[row] + profit_ratio
+        self.cumulative[row] = cumulative
+        if cumulative > self.peak[row]:
+            self.peak[row] = cumulative
+        drawdown = self.peak[row] - cumulative
+        if drawdown > self.max_drawdown[row]:
+            self.max_drawdown[row] = drawdown
+
+    def rows(self) -> List[dict]:
+        """
+        Statistics for every key, O(number of keys)
+        """
+        result = []
+        for key, row in self.index.items():
+            count = self.count[row]
+            result.append({
+                'key': key,
+                'count': count,
+                'total_profit_ratio': self.total[row],
+                'mean_profit_ratio': self.total[row] / count if count else 0.0,
+                'win_rate': self.wins[row] / count if count else 0.0,
+                'max_drawdown': self.max_drawdown[row],
+            })
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            'keys': list(self.index),
+            'count': self.count.tolist(),
+            'wins': self.wins.tolist(),
+            'total': self.total.tolist(),
+            'cumulative': self.cumulative.tolist(),
+            'peak': self.peak.tolist(),
+            'max_drawdown': self.max_drawdown.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'PnlAccumulator':
+        acc = cls()
+        acc.index = {key: row for row, key in enumerate(data['keys'])}
+        acc.count = array('l', data['count'])
+        acc.wins = array('l', data['wins'])
+        acc.total = array('d', data['total'])
+        acc.cumulative = array('d', data['cumulative'])
+        acc.peak = array('d', data['peak'])
+        acc.max_drawdown = array('d', data['max_drawdown'])
+        return acc
+
+
+class PnlSummary:
+    """
+    Rolling per-pair, per-strategy and overall aggregates for the current
+    day and ISO week. A period is rolled over lazily when the clock moves
+    past it; the one before is kept so it can still be reported.
+    """
+
+    # Whether calls may block on other processes (and so belong in a worker thread)
+    blocking = False
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path
+        self.periods = {}
+        self.previous = {}
+        # Recorded trades not yet written to the snapshot
+        self.dirty = False
+        self.load()
+
+    @staticmethod
+    def _empty(key: str) -> dict:
+        return {'key': key, 'pair': PnlAccumulator(), 'strategy': PnlAccumulator(), 'total': PnlAccumulator()}
+
+    def _current(self, period: str, when: datetime) -> dict:
+        key = period_key(period, when)
+        state = self.periods.get(period)
+        if state is None or state['key'] != key:
+            if state is not None:
+                self.previous[period] = state
+            state = self.periods[period] = self._empty(key)
+        return state
+
+    def record(self, pair: str, strategy: str, profit_ratio: float, when: Optional[datetime] = None):
+        """
+        Account a closed trade in every period
+        """
+        when = when or datetime.now()
+        for period in PERIODS:
+            state = self._current(period, when)
+            state['pair'].update(pair, profit_ratio)
+            state['strategy'].update(strategy, profit_ratio)
+            state['total'].update('all', profit_ratio)
+        self.dirty = True
+
+    def _rows(self, period: str, key: str, kind: str) -> List[dict]:
+        """
+        Per-key statistics of one accumulator (pair/strategy/total) for a period
+        """
+        for state in (self.periods.get(period), self.previous.get(period)):
+            if state is not None and state['key'] == key:
+                return state[kind].rows()
+        # Nothing recorded in this period
+        return []
+
+    def report(self, period: str, when: Optional[datetime] = None) -> dict:
+        """
+        Summary of the period containing `when`, O(pairs + strategies)
+        """
+        key = period_key(period, when or datetime.now())
+        total = self._rows(period, key, 'total')
+        pairs = sorted(self._rows(period, key, 'pair'), key=lambda row: row['total_profit_ratio'])
+        return {
+            'period': period,
+            'key': key,
+            'total': total[0] if total else None,
+            'pairs': pairs,
+            'strategies': sorted(self._rows(period, key, 'strategy'), key=lambda row: row['key']),
+            'worst_pair': pairs[0] if pairs else None,
+            'best_pair': pairs[-1] if pairs else None,
+        }
+
+    def save(self):
+        """
+        Atomically write the current and previous periods to the snapshot file
+        """
+        if not self.snapshot_path:
+            return
+
+        def dump(periods: dict) -> dict:
+            return {
+                period: {
+                    'key': state['key'],
+                    **{name: state[name].to_dict() for name in ('pair', 'strategy', 'total')},
+                }
+                for period, state in periods.items()
+            }
+
+        data = dump(self.periods)
+        data['previous'] = dump(self.previous)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.snapshot_path)
+            self.dirty = False
+        except OSError as e:
+            logger.error(f"Failed to write PnL summary snapshot: {str(e)}")
+
+    def load(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path) as f:
+                data = json.load(f)
+            # Snapshots written before the previous periods were kept have no 'previous'
+            for periods, states in ((self.previous, data.pop('previous', {})), (self.periods, data)):
+                for period, state in states.items():
+                    periods[period] = {
+                        'key': state['key'],
+                        **{name: PnlAccumulator.from_dict(state[name]) for name in ('pair', 'strategy', 'total')},
+                    }
+            logger.info(f"Loaded PnL summary snapshot from {self.snapshot_path}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Ignoring unreadable PnL summary snapshot {self.snapshot_path}: {str(e)}")
+
+
+def render_report(report: dict) -> Tuple[str, str, str]:
+    """
+    Render a summary report as (subject, text body, html body)
+    """
+    title = f"{report['period'].capitalize()} summary {report['key']}"
+    total = report['total']
+    if total is None:
+        headline = "No closed trades"
+    else:
+        headline = f"{total['count']} trades, {total['total_profit_ratio'] * 100:+.2f}%"
+        if report['worst_pair']:
+            headline += f", worst pair {report['worst_pair']['key']}"
+
+    subject = f"Freqtrade {title}: {headline}"
+
+    def row_text(row):
+        return (f"{row['key']}: {row['count']} trades, total {row['total_profit_ratio'] * 100:+.2f}%, "
+                f"mean {row['mean_profit_ratio'] * 100:+.2f}%, win rate {row['win_rate'] * 100:.0f}%, "
+                f"max drawdown {row['max_drawdown'] * 100:.2f}%")
+
+    body_text = f"Freqtrade {title}\n\n{headline}\n"
+    body_html = f"""
+    <html>
+    <body>
+      <h1>Freqtrade {title}</h1>
+      <p><strong>{headline}</strong></p>
+    """
+    if total is not None:
+        body_text += f"\nOverall: {row_text(total)}\n"
+        for section, rows in (('Pairs', report['pairs']), ('Strategies', report['strategies'])):
+            body_text += f"\n{section}:\n" + "".join(f"  {row_text(row)}\n" for row in rows)
+            body_html += f"<h2>{section}</h2>\n<ul>\n"
+            body_html += "".join(f"<li>{row_text(row)}</li>\n" for row in rows)
+            body_html += "</ul>\n"
+    body_html += """
+    </body>
+    </html>
+    """
+    return subject, body_text, body_html
+
+
+def parse_clock(text: str) -> Tuple[int, int]:
+    """
+    Parse "HH:MM" into (hour, minute); raises ValueError when out of range
+    """
+    hour, minute = (int(x) for x in text.split(':'))
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        raise ValueError(f"Invalid time of day {text!r}, expected 00:00-23:59")
+    return hour, minute
+
+
+def parse_schedule(daily_at: str, weekly_at: str) -> List[tuple]:
+    """
+    Parse "HH:MM[,HH:MM]" daily times and "ddd HH:MM[,...]" weekly times
+    into (period, weekday or None, hour, minute) entries
+    """
+    schedule = []
+    for item in filter(None, (part.strip() for part in daily_at.split(','))):
+        schedule.append(('daily', None, *parse_clock(item)))
+    for item in filter(None, (part.strip() for part in weekly_at.split(','))):
+        day, clock = item.split()
+        schedule.append(('weekly', WEEKDAYS.index(day[:3].lower()), *parse_clock(clock)))
+    return schedule
+
+
+def next_run(schedule: List[tuple], now: datetime) -> Tuple[datetime, str]:
+    """
+    Next (time, period) at which a summary is due
+    """
+    candidates = []
+    for period, weekday, hour, minute in schedule:
+        run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if weekday is not None:
+            run_at += timedelta(days=(weekday - now.weekday()) % 7)
+        if run_at <= now:
+            run_at += timedelta(days=7 if weekday is not None else 1)
+        candidates.append((run_at, period))
+    return min(candidates)
+
+
+async def run_scheduler(summary: PnlSummary, schedule: List[tuple], send: Callable[[str, str, str], Awaitable[dict]],
+                        claim: Optional[Callable[[str], bool]] = None):
+    """
+    Render and send summaries at the configured times until cancelled. Each
+    run reports the last completed day or week, so trades closing just
+    before midnight are not missed. `claim(run_id)` lets only one of several
+    workers send a given run.
+    """
+    last_run = datetime.now()
+    while True:
+        # Never schedule at or before the previous run, even if sleep woke early
+        run_at, period = next_run(schedule, max(datetime.now(), last_run))
+        last_run = run_at
+        await asyncio.sleep(max(0.0, (run_at - datetime.now()).total_seconds()))
+        # Both may wait on the shared database, so they run in a worker thread
+        if claim is not None and not await asyncio.to_thread(claim, f"summary:{period}:{run_at.isoformat()}"):
+            continue
+        try:
+            completed = completed_period(period, run_at)
+            if summary.blocking:
+                report = await asyncio.to_thread(summary.report, period, completed)
+            else:
+                report = summary.report(period, completed)
+            subject, body_text, body_html = render_report(report)
+            response = await send(subject, body_text, body_html)
+            logger.info(f"Sent {period} summary email! Message ID: {response['MessageId']}")
+        except Exception as e:
+            logger.error(f"Failed to send {period} summary email: {str(e)}", exc_info=True)
+
+
+async def run_snapshots(summary: PnlSummary, interval: float = 30.0):
+    """
+    Write the snapshot every `interval` seconds while trades are being
+    recorded, rather than once per trade, until cancelled
+    """
+    while True:
+        await asyncio.sleep(interval)
+        if summary.dirty:
+            summary.save()
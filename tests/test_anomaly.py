@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""
+Unit tests for the signal-rate anomaly detector
+"""
+
+import asyncio
+
+from anomaly import AnomalyDetector, RateWindow, render_alert, run_monitor, send_alert
+
+T0 = 1_700_000_040.0
+
+
+def entry(pair: str = "BTC/USDT", bot: str = "bot-a", webhook_type: str = "entry") -> dict:
+    return {"type": webhook_type, "pair": pair, "bot_name": bot}
+
+
+def test_window_slides_and_learns_baseline():
+    """Test counts expire after the window and the EWMA tracks the usual count"""
+    window = RateWindow(60.0, alpha=0.5)
+    window.advance(T0)
+    for _ in range(5):
+        window.add(cancel=False)
+    window.add(cancel=True)
+    assert (window.total, window.cancel_total) == (6, 1)
+
+    window.advance(T0 + 30)
+    assert window.total == 6 and window.baseline > 0
+    window.advance(T0 + 61)
+    assert (window.total, window.cancel_total) == (0, 0)
+
+    # A long idle gap empties the window in bounded time and decays the baseline
+    window.advance(T0 + 86400)
+    assert window.total == 0 and window.baseline < 1e-6 and window.warm
+
+
+def test_absolute_limit_alerts_once_and_suppresses():
+    """Test a pair flood raises a single incident and suppresses the flood"""
+    detector = AnomalyDetector(pair_max_rate=5, bot_max_rate=100, min_signals=100)
+    results = [detector.observe(entry(), T0 + i * 0.1) for i in range(10)]
+
+    assert all(started == [] and not suppressed for started, suppressed in results[:4])
+    started, suppressed = results[4]
+    assert suppressed and [(i.scope, i.key) for i in started] == [("pair", "bot-a BTC/USDT")]
+    assert all(started == [] and suppressed for started, suppressed in results[5:])
+    assert detector.incidents[("pair", "bot-a BTC/USDT")].suppressed == 5
+
+    # Other pairs of the bot and other webhook types still go through
+    assert detector.observe(entry("ETH/USDT"), T0 + 1) == ([], False)
+    assert detector.observe({"type": "status", "bot_name": "bot-a", "pair": "BTC/USDT"}, T0 + 1) == ([], False)
+
+
+def test_bot_flood_covers_its_pairs():
+    """Test a bot flood across many pairs gives one bot alert and suppresses every pair"""
+    detector = AnomalyDetector(bot_max_rate=10, pair_max_rate=100, min_signals=100)
+    started = []
+    for i in range(20):
+        new, _ = detector.observe(entry(f"P{i}/USDT"), T0 + i)
+        started += new
+    assert [(i.scope, i.key) for i in started] == [("bot", "bot-a")]
+    assert detector.observe(entry("NEW/USDT"), T0 + 21) == ([], True)
+    assert detector.observe(entry("NEW/USDT", bot="bot-b"), T0 + 21) == ([], False)
+
+
+def test_cancel_ratio_triggers():
+    """Test mostly-cancel traffic is flagged even below the rate limits"""
+    detector = AnomalyDetector(pair_max_rate=100, bot_max_rate=100, min_signals=6, max_cancel_ratio=0.5)
+    for i in range(4):
+        assert detector.observe(entry(), T0 + i) == ([], False)
+    for i in range(3):
+        assert detector.observe(entry(webhook_type="entry_cancel"), T0 + 5 + i) == ([], False)
+    # 4 cancels out of 8
+    started, suppressed = detector.observe(entry(webhook_type="entry_cancel"), T0 + 9)
+    assert suppressed and "4 of 8 signals" in started[0].reason
+
+
+def test_rate_above_baseline_triggers():
+    """Test a burst well above the learned rate is flagged"""
+    detector = AnomalyDetector(pair_max_rate=0, bot_max_rate=0, rate_factor=3, min_signals=5, max_cancel_ratio=0)
+    # One entry every 10s for 10 minutes: about 6 per minute
+    for i in range(60):
+        assert detector.observe(entry(), T0 + i * 10) == ([], False)
+    now = T0 + 600
+    for i in range(30):
+        started, suppressed = detector.observe(entry(), now + i * 0.1)
+        if started:
+            break
+    assert suppressed and "usual rate" in started[0].reason
+    assert started[0].baseline > 3
+
+
+def test_incident_ends_after_cooldown():
+    """Test the all-clear comes once the key stayed calm for the cooldown"""
+    detector = AnomalyDetector(pair_max_rate=5, bot_max_rate=100, min_signals=100, cooldown=120)
+    for i in range(8):
+        detector.observe(entry(), T0 + i)
+    assert detector.check(T0 + 30) == []
+    # Window empty from T0 + 68, calm for 120s after that
+    assert detector.check(T0 + 70) == []
+    ended = detector.check(T0 + 190)
+    assert [(i.key, i.suppressed) for i in ended] == [("bot-a BTC/USDT", 3)]
+    assert detector.incidents == {}
+    assert detector.observe(entry(), T0 + 200) == ([], False)
+
+
+def test_keys_are_bounded():
+    """Test idle windows are evicted but flooding keys are kept"""
+    detector = AnomalyDetector(pair_max_rate=2, bot_max_rate=1000, min_signals=100, max_keys=10)
+    detector.observe(entry("HOT/USDT"), T0)
+    detector.observe(entry("HOT/USDT"), T0)
+    for i in range(50):
+        detector.observe(entry(f"P{i}/USDT"), T0 + 1)
+    assert len(detector.windows) == 10
+    hot = ("pair", "bot-a HOT/USDT")
+    assert hot in detector.incidents and hot not in detector.windows
+    # The flood's window is tracked again once it has calmed down
+    detector.check(T0 + 1000)
+    detector.check(T0 + 2000)
+    assert detector.incidents == {} and next(reversed(detector.windows)) == hot
+
+
+def test_render_alert_and_all_clear():
+    """Test alert and resolved emails carry the trigger and suppressed count"""
+    detector = AnomalyDetector(pair_max_rate=3, bot_max_rate=100, min_signals=100, cooldown=0)
+    incidents = [incident for i in range(5) for incident in detector.observe(entry(), T0 + i)[0]]
+    assert len(incidents) == 1
+    subject, body_text, body_html = render_alert(incidents[0])
+    assert subject.startswith("[ALERT]") and "bot-a BTC/USDT" in subject
+    assert "3 signals in 60s (limit 3)" in body_text
+
+    assert detector.check(T0 + 100) == incidents
+    subject, body_text, _ = render_alert(incidents[0])
+    assert subject.startswith("[RESOLVED]")
+    assert "2 notifications were suppressed" in body_text
+
+
+def test_monitor_sends_all_clear():
+    """Test the background monitor ends calm incidents and emails them"""
+    detector = AnomalyDetector(pair_max_rate=2, bot_max_rate=100, min_signals=100, cooldown=0)
+    detector.observe(entry(), T0)
+    detector.observe(entry(), T0)
+    sent = []
+    clock = iter([T0 + 100, T0 + 200])
+
+    async def send(subject, body_text, body_html):
+        sent.append(subject)
+        return {"MessageId": "m-1"}
+
+    async def run():
+        task = asyncio.create_task(run_monitor(detector, send, interval=0, clock=lambda: next(clock, T0 + 300)))
+        for _ in range(10):
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(run())
+    assert len(sent) == 1 and sent[0].startswith("[RESOLVED]")
+
+
+def test_alert_sent_by_one_worker():
+    """Test workers sharing a claim send one alert and one all-clear between them"""
+    claimed, sent = set(), []
+
+    def claim(key):
+        if key in claimed:
+            return False
+        claimed.add(key)
+        return True
+
+    async def send(subject, body_text, body_html):
+        sent.append(subject)
+        return {"MessageId": f"m-{len(sent)}"}
+
+    workers = [AnomalyDetector(pair_max_rate=2, bot_max_rate=100, min_signals=100, cooldown=0) for _ in range(2)]
+    for offset, detector in enumerate(workers):
+        for n in range(2):
+            for incident in detector.observe(entry(), T0 + offset + n)[0]:
+                asyncio.run(send_alert(incident, send, claim))
+        for now in (T0 + 200, T0 + 300):
+            for incident in detector.check(now):
+                asyncio.run(send_alert(incident, send, claim))
+    assert [subject[:10] for subject in sent] == ["[ALERT] Fr", "[RESOLVED]"]
@@ -7,6 +7,7 @@ import pytest
 from fastapi.testclient import TestClient
 import json
 import os
+import tempfile
 from unittest.mock import patch, MagicMock
 
 # Set test environment variables
@@ -14,6 +15,12 @@ os.environ["EMAIL_SENDER"] = "test@example.com"
 os.environ["EMAIL_RECIPIENT"] = "recipient@example.com"
 os.environ["AWS_REGION"] = "us-east-1"
 os.environ["API_KEY"] = "test_api_key"
+# Keep state files written by the app out of the working tree
+STATE_DIR = tempfile.mkdtemp()
+os.environ["SUMMARY_SNAPSHOT_PATH"] = os.path.join(STATE_DIR, "pnl_summary.json")
+os.environ["SPOOL_DIR"] = os.path.join(STATE_DIR, "spool")
+os.environ["PROFILE_DIR"] = os.path.join(STATE_DIR, "profiles")
+os.environ["DEFERRED_QUEUE_PATH"] = os.path.join(STATE_DIR, "deferred_queue.jsonl")
 
 # Import app after setting environment variables
 from app import app
@@ -255,6 +262,268 @@ def test_strategy_msg_list(mock_ses):
     assert "BTC" in html_content
     assert "ETH" in html_content
 
+@patch('app.ses_client')
+def test_webhook_malformed_payload_rejected(mock_ses):
+    """Test that malformed numeric fields are rejected with 422 before sending"""
+    response = client.post(
+        "/webhook?token=test_api_key",
+        json={"type": "exit_fill", "pair": "BTC/USDT", "profit_ratio": "not-a-number"}
+    )
+    
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["profit_ratio"]
+    mock_ses.send_email.assert_not_called()
+
+@patch('app.ses_client')
+def test_webhook_stringified_values(mock_ses):
+    """Test that stringified Freqtrade values are rendered as typed values"""
+    mock_ses.send_email.return_value = {"MessageId": "test-message-id"}
+    
+    response = client.post(
+        "/webhook?token=test_api_key",
+        json={"type": "exit_fill", "pair": "BTC/USDT", "profit_ratio": "-0.0125", "amount": "0.00123"}
+    )
+    
+    assert response.status_code == 200
+    html_content = mock_ses.send_email.call_args[1]["Message"]["Body"]["Html"]["Data"]
+    assert "-1.25%" in html_content
+    assert "color: red" in html_content
+
+@patch('app.ses_client')
+def test_webhook_duplicate_sent_once(mock_ses):
+    """Test that a retried webhook is emailed once when shared state is enabled"""
+    from shared_state import SharedState
+    mock_ses.send_email.return_value = {"MessageId": "test-message-id"}
+    
+    with patch('app.shared_state', SharedState(os.path.join(STATE_DIR, "state.db"))):
+        payload = {"type": "entry", "pair": "ETH/USDT", "trade_id": "7"}
+        first = client.post("/webhook?token=test_api_key", json=payload)
+        second = client.post("/webhook?token=test_api_key", json=payload)
+    
+    assert first.json()["status"] == "success"
+    assert second.json() == {
+        "status": "duplicate",
+        "message": "Webhook already received for entry",
+        "messageId": "test-message-id"
+    }
+    mock_ses.send_email.assert_called_once()
+
+@patch('app.ses_client')
+def test_exit_fill_retry_counted_once(mock_ses):
+    """Test that a retried exit_fill after a failed send is counted once in the PnL summary"""
+    from summary import PnlSummary
+    mock_ses.send_email.side_effect = [Exception("Throttling"), {"MessageId": "test-message-id"}]
+
+    payload = {"type": "exit_fill", "pair": "SOL/USDT", "trade_id": "8", "profit_ratio": "0.01"}
+    with patch('app.pnl_summary', PnlSummary()) as summary:
+        first = client.post("/webhook?token=test_api_key", json=payload)
+        retry = client.post("/webhook?token=test_api_key", json=payload)
+
+    assert first.status_code == 500
+    assert retry.status_code == 200
+    total = summary.report('daily')['total']
+    assert total['count'] == 1
+    assert total['total_profit_ratio'] == pytest.approx(0.01)
+
+def test_ready_flips_while_draining():
+    """Test readiness and webhook routes return 503 once draining starts"""
+    from app import delivery_tracker
+    assert client.get("/ready").status_code == 200
+    
+    with patch.object(delivery_tracker, 'draining', True):
+        assert client.get("/ready").json() == {"status": "draining"}
+        response = client.post("/webhook?token=test_api_key", json=valid_webhook)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+
+@patch('app.ses_client')
+def test_server_timing_header(mock_ses):
+    """Test that stage timings and the request ID are returned as headers"""
+    mock_ses.send_email.return_value = {"MessageId": "test-message-id"}
+    
+    response = client.post(
+        "/webhook?token=test_api_key",
+        json=valid_webhook,
+        headers={"X-Request-ID": "req-123"}
+    )
+    
+    assert response.headers["X-Request-ID"] == "req-123"
+    stages = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert stages == ["parse", "validate", "render", "deliver", "total"]
+
+@patch('app.ses_client')
+def test_profiler_captures_slow_requests(mock_ses):
+    """Test that the profiler can be enabled at runtime and writes profiles"""
+    mock_ses.send_email.return_value = {"MessageId": "test-message-id"}
+    
+    response = client.post("/admin/profiler?token=test_api_key&enabled=true&threshold_ms=0")
+    assert response.json()["enabled"] is True
+    try:
+        client.post("/webhook?token=test_api_key", json=valid_webhook)
+    finally:
+        client.post("/admin/profiler?token=test_api_key&enabled=false&threshold_ms=1000")
+    
+    assert any(name.endswith(".prof") for name in os.listdir(os.path.join(STATE_DIR, "profiles")))
+
+@patch('app.ses_client')
+def test_profiler_ignores_unsafe_request_id(mock_ses):
+    """Test that a client request ID is never used as a path and a failed profile write keeps the response"""
+    mock_ses.send_email.return_value = {"MessageId": "test-message-id"}
+    
+    client.post("/admin/profiler?token=test_api_key&enabled=true&threshold_ms=0")
+    try:
+        response = client.post("/webhook?token=test_api_key", json=valid_webhook,
+                               headers={"X-Request-ID": "../../a/b"})
+        assert response.status_code == 200
+        assert "/" not in response.headers["X-Request-ID"]
+        with patch('cProfile.Profile.dump_stats', side_effect=OSError("disk full")):
+            response = client.post("/webhook?token=test_api_key", json=valid_webhook)
+        assert response.status_code == 200
+    finally:
+        client.post("/admin/profiler?token=test_api_key&enabled=false&threshold_ms=1000")
+
+def test_profiler_admin_requires_auth():
+    """Test that the profiler admin endpoint requires the API key"""
+    assert client.post("/admin/profiler?enabled=true").status_code == 401
+
+def test_webhook_with_async_ses_backend():
+    """Test the asyncio SES client works as a drop-in for the boto3 client"""
+    import httpx
+    from botocore.credentials import Credentials
+    from ses_async import AsyncSESClient
+    
+    async_client = AsyncSESClient(
+        "us-east-1",
+        credentials=Credentials("AKID", "SECRET"),
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, text="<MessageId>async-id</MessageId>")),
+    )
+    with patch('app.ses_client', async_client):
+        response = client.post("/webhook?token=test_api_key", json=valid_webhook)
+    
+    assert response.status_code == 200
+    assert response.json()["messageId"] == "async-id"
+
+def test_oversize_body_rejected_with_413():
+    """Test that bodies over the route limit are rejected before parsing"""
+    from app import body_guard
+    before = body_guard.stats()
+    payload = dict(valid_webhook, msg="x" * (body_guard.limit_for("/webhook") + 1))
+    
+    response = client.post("/webhook?token=test_api_key", json=payload)
+    assert response.status_code == 413
+    
+    # Chunked upload without Content-Length is cut off while streaming
+    chunks = (b"x" * 1024 for _ in range(body_guard.limit_for("/webhook") // 1024 + 2))
+    response = client.post("/webhook?token=test_api_key", content=chunks)
+    assert response.status_code == 413
+    
+    stats = client.get("/metrics?token=test_api_key").json()["body_guard"]
+    assert stats["rejected_too_large"] == before["rejected_too_large"] + 2
+    assert stats["rejected_bytes_read"] > before["rejected_bytes_read"]
+    assert stats["rejected_bytes_unread"] > before["rejected_bytes_unread"]
+
+def test_wrong_path_key_rejected_before_body():
+    """Test that path-key routes with a wrong key get 401 without the body being read"""
+    from app import body_guard
+    before = body_guard.stats()["rejected_unauthorized"]
+    
+    for path in ("/webhook/wrong_key", "/webhook/log-only/wrong_key"):
+        response = client.post(path, json=valid_webhook)
+        assert response.status_code == 401
+    
+    assert body_guard.stats()["rejected_unauthorized"] == before + 2
+
+def test_non_ascii_path_key_rejected():
+    """Test that a non-ASCII path key gets 401 from the body guard rather than an error"""
+    from app import body_guard
+    before = body_guard.stats()["rejected_unauthorized"]
+    
+    for path in ("/webhook/%C3%A9", "/webhook/log-only/%C3%A9"):
+        response = client.post(path, json=valid_webhook)
+        assert response.status_code == 401
+    
+    assert body_guard.stats()["rejected_unauthorized"] == before + 2
+
+def test_metrics_requires_auth():
+    """Test that the metrics endpoint requires the API key"""
+    assert client.get("/metrics").status_code == 401
+
+@patch('app.ses_client')
+def test_scheduled_type_is_deferred_and_rendered_on_release(mock_ses):
+    """Test a webhook inside quiet hours is queued raw and only sent when released"""
+    import asyncio
+    import time
+    import app as app_module
+    from deferred import FixedDelay
+    mock_ses.send_email.return_value = {"MessageId": "deferred-message-id"}
+    
+    with patch.dict(app_module.delivery_rules, {"status": FixedDelay(3600)}):
+        response = client.post("/webhook?token=test_api_key", json={"type": "status", "status": "running"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "deferred"
+    mock_ses.send_email.assert_not_called()
+    
+    [record] = app_module.deferred_queue.pop_due(time.time() + 3600, limit=10)
+    assert record["webhook"] == {"type": "status", "status": "running"}
+    assert asyncio.run(app_module.release_deferred(record))["MessageId"] == "deferred-message-id"
+    assert "running" in mock_ses.send_email.call_args.kwargs["Message"]["Body"]["Text"]["Data"]
+
+@patch('app.ses_client')
+def test_per_pair_updates_coalesce_latest_wins(mock_ses):
+    """Test a burst of updates for one pair leaves a single pending email with the newest value"""
+    import time
+    import app as app_module
+    
+    with patch.object(app_module, "COALESCE_TYPES", {"strategy_msg"}):
+        responses = [
+            client.post("/webhook?token=test_api_key",
+                        json={"type": "strategy_msg", "pair": "BTC/USDT", "msg": f"signal {n}"})
+            for n in range(3)
+        ]
+        other = client.post("/webhook?token=test_api_key",
+                            json={"type": "strategy_msg", "pair": "ETH/USDT", "msg": "signal 0"})
+    assert [r.json()["status"] for r in responses] == ["deferred", "coalesced", "coalesced"]
+    assert other.json()["status"] == "deferred"
+    mock_ses.send_email.assert_not_called()
+    assert client.get("/metrics?token=test_api_key").json()["deferred"]["coalesced"] >= 2
+    
+    records = app_module.deferred_queue.pop_due(time.time() + app_module.COALESCE_WINDOW, limit=10)
+    assert sorted(r["webhook"]["msg"] for r in records) == ["signal 0", "signal 2"]
+    assert max(r["coalesced"] for r in records) == 2
+
+@patch('app.ses_client')
+def test_webhook_accepts_msgpack(mock_ses):
+    """Test a MessagePack body is processed like the equivalent JSON webhook"""
+    import msgpack
+    mock_ses.send_email.return_value = {"MessageId": "msgpack-message-id"}
+    
+    response = client.post(
+        "/webhook?token=test_api_key",
+        content=msgpack.packb({"type": "status", "status": "msgpack running"}),
+        headers={"Content-Type": "application/msgpack"}
+    )
+    assert response.status_code == 200
+    assert response.json()["messageId"] == "msgpack-message-id"
+    assert "msgpack running" in mock_ses.send_email.call_args.kwargs["Message"]["Body"]["Text"]["Data"]
+    
+    log_only = client.post(
+        "/webhook/log-only?token=test_api_key",
+        content=msgpack.packb({"type": "status", "status": "logged"}),
+        headers={"Content-Type": "application/msgpack"}
+    )
+    assert log_only.status_code == 200
+
+def test_webhook_rejects_unknown_content_type_and_corrupt_body():
+    """Test unsupported formats get a 415 and undecodable bodies a 400"""
+    response = client.post("/webhook?token=test_api_key", content=b"type=status",
+                           headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 415
+    assert "application/msgpack" in response.json()["detail"]
+    
+    response = client.post("/webhook?token=test_api_key", content=b"\xc1",
+                           headers={"Content-Type": "application/msgpack"})
+    assert response.status_code == 400
+
 # Run the tests when file is executed directly
 if __name__ == "__main__":
     pytest.main(["-xvs", __file__]) 
\ No newline at end of file
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Unit tests for Content-Type based body decoding
+"""
+
+import json
+from datetime import datetime, timezone
+
+import msgpack
+import pytest
+
+from body_codecs import MalformedBody, UnsupportedMediaType, decode_body, media_type
+
+PAYLOAD = {"type": "exit_fill", "pair": "BTC/USDT", "profit_ratio": "0.0221", "trade_id": 1234,
+           "leverage": 1.5, "enter_tag": None, "nested": {"ids": [1, 2, 3]}}
+
+
+def test_media_type_ignores_parameters_and_case():
+    """Test Content-Type parameters and casing do not affect format selection"""
+    assert media_type("Application/MsgPack; charset=binary") == "application/msgpack"
+    assert media_type(None) == ""
+
+
+@pytest.mark.parametrize("content_type", [None, "application/json", "application/json; charset=utf-8",
+                                          "application/vnd.freqtrade+json"])
+def test_json_bodies(content_type):
+    """Test JSON (the default when no Content-Type is sent) decodes to the payload"""
+    assert decode_body(json.dumps(PAYLOAD).encode(), content_type) == PAYLOAD
+
+
+@pytest.mark.parametrize("content_type", ["application/msgpack", "application/x-msgpack", "application/vnd.msgpack"])
+def test_msgpack_decodes_to_the_json_shape(content_type):
+    """Test MessagePack decodes into the same dict as the JSON body"""
+    assert decode_body(msgpack.packb(PAYLOAD), content_type) == PAYLOAD
+
+
+def test_binary_only_values_become_strings():
+    """Test bytes and timestamps, which JSON cannot carry, are turned into strings"""
+    when = datetime(2025, 3, 20, 14, 45, 30, tzinfo=timezone.utc)
+    body = msgpack.packb({"type": "status", "status": b"running", "at": when}, datetime=True)
+    decoded = decode_body(body, "application/msgpack")
+    assert decoded == {"type": "status", "status": "running", "at": "2025-03-20T14:45:30+00:00"}
+    json.dumps(decoded)
+
+
+def test_cbor_when_installed():
+    """Test CBOR bodies decode like JSON ones when cbor2 is available"""
+    cbor2 = pytest.importorskip("cbor2")
+    assert decode_body(cbor2.dumps(PAYLOAD), "application/cbor") == PAYLOAD
+
+
+def test_errors():
+    """Test unknown formats and corrupt bodies raise distinct errors"""
+    with pytest.raises(UnsupportedMediaType):
+        decode_body(b"type=entry", "application/x-www-form-urlencoded")
+    with pytest.raises(MalformedBody):
+        decode_body(b"{not json", "application/json")
+    with pytest.raises(MalformedBody):
+        decode_body(msgpack.packb(PAYLOAD)[:-3], "application/msgpack")
+
+
+def test_json_non_finite_numbers_fall_back_to_the_json_module():
+    """Test NaN, which json.dumps emits but orjson rejects, is still accepted"""
+    decoded = decode_body(json.dumps({"type": "exit", "profit_ratio": float("nan")}).encode(), "application/json")
+    assert decoded["profit_ratio"] != decoded["profit_ratio"]
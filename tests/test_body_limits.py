@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Unit tests for the request body guard
+"""
+
+import asyncio
+
+from body_limits import BodyGuard, BodyGuardMiddleware, parse_route_limits, parse_size
+
+
+def run_request(guard: BodyGuard, path: str, chunks: list, content_length=None):
+    """Drive the middleware with a streamed body; returns (status, body bytes read by the app, chunks pulled)"""
+    pulled = []
+    sent = []
+    seen = {}
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+
+    async def receive():
+        message = messages.pop(0)
+        pulled.append(message)
+        return message
+
+    async def send(message):
+        sent.append(message)
+
+    async def app(scope, receive, send):
+        message = await receive()
+        seen["body"] = message["body"]
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    headers = [(b"content-length", str(content_length).encode())] if content_length is not None else []
+    scope = {"type": "http", "method": "POST", "path": path, "headers": headers}
+    asyncio.run(BodyGuardMiddleware(app, guard)(scope, receive, send))
+    return sent[0]["status"], seen.get("body"), len(pulled)
+
+
+def test_parse_sizes_and_route_limits():
+    """Test size suffixes and per-route limit parsing"""
+    assert parse_size("65536") == 65536
+    assert parse_size("64k") == 65536
+    assert parse_size("1M") == 1024 * 1024
+    assert parse_route_limits("/webhook/log-only=1m, /webhook=8k") == {
+        "/webhook/log-only": 1024 * 1024, "/webhook": 8192,
+    }
+
+
+def test_longest_prefix_wins():
+    """Test the most specific route limit applies"""
+    guard = BodyGuard(100, {"/webhook": 10, "/webhook/log-only": 50})
+    assert guard.limit_for("/webhook") == 10
+    assert guard.limit_for("/webhook/secret") == 10
+    assert guard.limit_for("/webhook/log-only/secret") == 50
+    assert guard.limit_for("/webhooks") == 100
+    assert guard.limit_for("/admin/profiler") == 100
+
+
+def test_body_within_limit_reaches_app_in_one_message():
+    """Test streamed chunks within the limit are handed to the app intact"""
+    guard = BodyGuard(10)
+    status, body, _ = run_request(guard, "/webhook", [b"abc", b"def", b"gh"])
+    assert status == 200
+    assert body == b"abcdefgh"
+
+
+def test_streaming_body_cut_off_at_limit():
+    """Test reading stops at the first chunk past the limit"""
+    guard = BodyGuard(10)
+    status, body, pulled = run_request(guard, "/webhook", [b"x" * 6, b"x" * 6, b"x" * 6, b"x" * 6])
+    assert status == 413
+    assert body is None
+    assert pulled == 2
+    assert guard.stats()["rejected_bytes_read"] == 12
+
+
+def test_declared_oversize_rejected_without_reading():
+    """Test a Content-Length over the limit is rejected before any body is read"""
+    guard = BodyGuard(10)
+    status, _, pulled = run_request(guard, "/webhook", [b"x" * 20], content_length=20)
+    assert status == 413
+    assert pulled == 0
+    assert guard.stats()["rejected_bytes_unread"] == 20
+
+
+def test_unauthorized_path_key_rejected_without_reading():
+    """Test the path-key check happens before the body is read"""
+    guard = BodyGuard(1000, path_key_authorized=lambda path: path != "/webhook/wrong")
+    status, _, pulled = run_request(guard, "/webhook/wrong", [b"{}"], content_length=2)
+    assert status == 401
+    assert pulled == 0
+    assert guard.stats()["rejected_unauthorized"] == 1
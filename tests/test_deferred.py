@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Unit tests for delivery schedules and the deferred queue
+"""
+
+import asyncio
+import pytest
+import time
+from datetime import datetime
+
+from deferred import (BusinessHours, DeferredQueue, FixedDelay, QuietHours, coalesce_key, parse_delivery_rules,
+                      release_time, run_release_loop)
+
+# A Thursday
+THU = datetime(2025, 3, 20)
+
+
+def test_quiet_hours_across_midnight():
+    """Test a 23:00-07:00 window holds night messages until 07:00"""
+    rule = QuietHours((23, 0), (7, 0))
+    assert rule.release_at(THU.replace(hour=23, minute=30)) == datetime(2025, 3, 21, 7, 0)
+    assert rule.release_at(THU.replace(hour=3)) == THU.replace(hour=7)
+    assert rule.release_at(THU.replace(hour=12)) is None
+
+
+def test_business_hours_wait_for_next_opening():
+    """Test messages outside mon-fri 09:00-18:00 wait for the next business morning"""
+    rule = BusinessHours({0, 1, 2, 3, 4}, (9, 0), (18, 0))
+    assert rule.release_at(THU.replace(hour=10)) is None
+    assert rule.release_at(THU.replace(hour=8)) == THU.replace(hour=9)
+    assert rule.release_at(THU.replace(hour=19)) == datetime(2025, 3, 21, 9, 0)
+    # Friday evening -> Monday morning
+    assert rule.release_at(datetime(2025, 3, 21, 18, 30)) == datetime(2025, 3, 24, 9, 0)
+
+
+def test_parse_delivery_rules():
+    """Test the DELIVERY_SCHEDULES format and the "*" fallback"""
+    rules = parse_delivery_rules("status, strategy_msg=quiet 23:00-07:00; entry=business mon-fri 09:00-18:00; *=delay 5m")
+    assert isinstance(rules["status"], QuietHours) and rules["status"] is rules["strategy_msg"]
+    assert rules["entry"].days == {0, 1, 2, 3, 4}
+    assert isinstance(rules["*"], FixedDelay) and rules["*"].seconds == 300
+    assert release_time(rules, "exit", THU) == THU.replace(minute=5)
+    assert release_time({}, "exit", THU) is None
+
+
+@pytest.mark.parametrize("spec", ["status=quiet 23:00-24:00", "entry=business mon-fri 09:60-18:00"])
+def test_parse_delivery_rules_rejects_invalid_times(spec):
+    """Test out-of-range times fail when the rules are loaded, not per webhook"""
+    with pytest.raises(ValueError):
+        parse_delivery_rules(spec)
+
+
+def test_queue_pops_in_release_order_and_survives_restart(tmp_path):
+    """Test the heap order and that pending records are restored from the journal"""
+    path = str(tmp_path / "deferred.jsonl")
+    queue = DeferredQueue(path)
+    for i, release_at in enumerate([30.0, 10.0, 20.0, 40.0]):
+        queue.push({"type": "status", "n": i}, release_at)
+    assert queue.next_release() == 10.0
+    assert [r["webhook"]["n"] for r in queue.pop_due(25.0, limit=10)] == [1, 2]
+    queue.close()
+
+    # Simulate a crash mid-write
+    with open(path, "a") as f:
+        f.write('{"op": "add", "rec')
+    restored = DeferredQueue(path)
+    assert len(restored) == 2
+    assert [r["webhook"]["n"] for r in restored.pop_due(100.0, limit=10)] == [0, 3]
+
+
+def test_requeue_invalidates_old_heap_entry(tmp_path):
+    """Test a requeued record is only released at its new time"""
+    queue = DeferredQueue(str(tmp_path / "deferred.jsonl"))
+    record = queue.push({"type": "status"}, 10.0)
+    queue.requeue(record, 50.0)
+    assert queue.pop_due(20.0, limit=10) == []
+    assert queue.next_release() == 50.0
+    assert len(queue.pop_due(60.0, limit=10)) == 1
+
+
+def test_release_loop_batches_and_retries(tmp_path):
+    """Test due records are released in bounded batches and failures are requeued"""
+    queue = DeferredQueue(str(tmp_path / "deferred.jsonl"))
+    for i in range(25):
+        queue.push({"type": "status", "n": i}, time.time() - 1)
+    failing = queue.push({"type": "status", "n": "fail"}, time.time() - 1)
+    # Records of one batch are popped together, so they all see the same queue length
+    batches = {}
+
+    async def release(record):
+        if record["webhook"]["n"] == "fail":
+            raise RuntimeError("SES down")
+        batches.setdefault(len(queue), []).append(record["webhook"]["n"])
+
+    async def run():
+        loop = asyncio.ensure_future(run_release_loop(queue, release, batch_size=10, batch_interval=0.01))
+        while sum(len(batch) for batch in batches.values()) < 25:
+            await asyncio.sleep(0.01)
+        loop.cancel()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert sorted(len(batch) for batch in batches.values()) == [5, 10, 10]
+    # The failure is back in the queue with a backoff
+    assert len(queue) == 1
+    assert failing["attempts"] == 1
+    assert queue.next_release() > time.time() + 30
+
+
+def test_latest_wins_coalescing(tmp_path):
+    """Test a newer event for a pending key replaces it in place and keeps its release time"""
+    path = str(tmp_path / "deferred.jsonl")
+    queue = DeferredQueue(path)
+    key = coalesce_key({"type": "status", "pair": "BTC/USDT"}, ["type", "pair"])
+    first = queue.push({"type": "status", "pair": "BTC/USDT", "n": 1}, 10.0, key=key)
+    queue.push({"type": "status", "pair": "ETH/USDT", "n": 1}, 10.0, key=coalesce_key({"type": "status", "pair": "ETH/USDT"}, ["type", "pair"]))
+    for n in range(2, 6):
+        latest = queue.push({"type": "status", "pair": "BTC/USDT", "n": n}, 10.0 + n, key=key)
+    assert latest is first and latest["coalesced"] == 4
+    assert len(queue) == 2
+    assert queue.status()["coalesced"] == 4
+    queue.close()
+
+    # The replacement is journaled, and the key is still pending after a restart
+    restored = DeferredQueue(path)
+    assert restored.push({"type": "status", "pair": "BTC/USDT", "n": 6}, 99.0, key=key)["coalesced"] == 5
+    released = {r["webhook"]["pair"]: r["webhook"]["n"] for r in restored.pop_due(10.0, limit=10)}
+    assert released == {"BTC/USDT": 6, "ETH/USDT": 1}
+
+    # Once released, the key starts a new pending record
+    assert restored.push({"type": "status", "pair": "BTC/USDT", "n": 7}, 20.0, key=key)["coalesced"] == 0
+
+
+def test_failed_release_superseded_by_newer_event(tmp_path):
+    """Test a retry is dropped when a newer event for its key arrived meanwhile"""
+    queue = DeferredQueue(str(tmp_path / "deferred.jsonl"))
+    [old] = [queue.push({"type": "status", "n": 1}, 10.0, key="k")] and queue.pop_due(10.0, limit=1)
+    queue.push({"type": "status", "n": 2}, 20.0, key="k")
+    queue.requeue(old, 30.0)
+    assert [r["webhook"]["n"] for r in queue.pop_due(100.0, limit=10)] == [2]
+    assert queue.coalesced == 1
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Unit tests for delivery tracking, draining and the spool
+"""
+
+import asyncio
+import os
+import threading
+
+from delivery import DeliveryTracker
+
+MESSAGE = {"subject": "Freqtrade Alert - entry", "body_text": "text", "body_html": "<p>html</p>"}
+
+
+def test_drain_spools_unfinished_and_replay_sends(tmp_path):
+    """Test a send still running at the deadline is spooled and replayed later"""
+    release = threading.Event()
+
+    def slow_send(subject, body_text, body_html):
+        release.wait(5)
+        raise RuntimeError("connection reset")
+
+    async def shutdown():
+        tracker = DeliveryTracker(str(tmp_path))
+        request = asyncio.ensure_future(tracker.deliver(dict(MESSAGE), slow_send))
+        await asyncio.sleep(0.05)
+        spooled = await tracker.drain(timeout=0.05)
+        request.cancel()
+        return tracker, spooled
+
+    # asyncio.run() would wait for the blocked send thread, so drive the loop by hand
+    loop = asyncio.new_event_loop()
+    tracker, spooled = loop.run_until_complete(shutdown())
+    assert spooled == 1
+    assert tracker.draining
+    assert len(os.listdir(tmp_path)) == 1
+    release.set()
+    loop.close()
+
+    sent = []
+
+    async def startup():
+        tracker = DeliveryTracker(str(tmp_path))
+        return await tracker.replay(lambda s, t, h: sent.append(s) or {"MessageId": "replayed"})
+
+    assert asyncio.run(startup()) == 1
+    assert sent == [MESSAGE["subject"]]
+    assert os.listdir(tmp_path) == []
+
+
+def test_drain_waits_for_fast_sends(tmp_path):
+    """Test sends finishing within the deadline are not spooled"""
+    async def run():
+        tracker = DeliveryTracker(str(tmp_path))
+        response = await tracker.deliver(dict(MESSAGE), lambda s, t, h: {"MessageId": "ok"})
+        return response, await tracker.drain(timeout=1)
+
+    response, spooled = asyncio.run(run())
+    assert response == {"MessageId": "ok"}
+    assert spooled == 0
+
+
+def test_failed_replay_stays_spooled(tmp_path):
+    """Test a spooled email that fails again is kept for the next start"""
+    tracker = DeliveryTracker(str(tmp_path))
+    tracker.spool(dict(MESSAGE, id="abc"))
+
+    def failing_send(subject, body_text, body_html):
+        raise RuntimeError("SES unavailable")
+
+    assert asyncio.run(tracker.replay(failing_send)) == 0
+    assert os.listdir(tmp_path) == ["abc.json"]
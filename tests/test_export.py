@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+Unit tests for the columnar webhook export
+"""
+
+import io
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from export_webhooks import (Dictionary, export, fill_latency, load, profit_distribution,
+                             signals_per_pair_hour)
+from replay_webhooks import iter_jsonl_events
+
+START = datetime(2025, 3, 1, 10, 0, 0)
+
+
+def sample_events() -> list:
+    """
+    Two trades on BTC, one on ETH, plus webhooks without pair or timestamp
+    """
+    at = lambda minutes: START + timedelta(minutes=minutes)  # noqa: E731
+    return [
+        (at(0), {"type": "entry", "pair": "BTC/USDT", "trade_id": "1", "open_rate": "50000", "amount": "0.1"}),
+        (at(1), {"type": "entry_fill", "pair": "BTC/USDT", "trade_id": "1"}),
+        (at(2), {"type": "entry", "pair": "ETH/USDT", "trade_id": "2"}),
+        (at(5), {"type": "entry_fill", "pair": "ETH/USDT", "trade_id": "2"}),
+        (at(30), {"type": "entry", "pair": "BTC/USDT", "trade_id": "3"}),
+        (at(65), {"type": "exit_fill", "pair": "BTC/USDT", "trade_id": "1", "profit_ratio": "0.02"}),
+        (at(70), {"type": "exit_fill", "pair": "ETH/USDT", "trade_id": "2", "profit_ratio": "-0.01"}),
+        (at(75), {"type": "exit_fill", "pair": "BTC/USDT", "trade_id": "4", "profit_ratio": "None"}),
+        (at(80), {"type": "status", "status": "running"}),
+        (None, {"type": "entry", "pair": "SOL/USDT", "trade_id": "5"}),
+    ]
+
+
+def test_dictionary_codes_in_order_of_appearance():
+    """Test strings get dense codes and missing values -1"""
+    dictionary = Dictionary()
+    assert [dictionary.code(v) for v in ("BTC/USDT", "ETH/USDT", "BTC/USDT", None, "")] == [0, 1, 0, -1, -1]
+    assert dictionary.values == ["BTC/USDT", "ETH/USDT"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+def test_npy_export_round_trip(tmp_path, chunk_size):
+    """Test the .npy columns are valid arrays whatever the chunking"""
+    path = str(tmp_path / "history")
+    assert export(sample_events(), path, chunk_size=chunk_size) == 10
+
+    data = load(path)
+    columns, dictionaries = data["columns"], data["dictionaries"]
+    assert dictionaries["pair"] == ["BTC/USDT", "ETH/USDT", "SOL/USDT"]
+    assert dictionaries["type"] == ["entry", "entry_fill", "exit_fill", "status"]
+    assert columns["ts"].dtype == np.dtype("datetime64[ms]") and len(columns["ts"]) == 10
+    assert columns["ts"][0] == np.datetime64(START, "ms")
+    assert np.isnat(columns["ts"][9])
+    assert columns["pair"].tolist() == [0, 0, 1, 1, 0, 0, 1, 0, -1, 2]
+    assert columns["trade_id"].tolist() == [1, 1, 2, 2, 3, 1, 2, 4, -1, 5]
+    assert columns["open_rate"][0] == 50000.0
+    assert np.isnan(columns["profit_ratio"][7])
+
+
+def test_empty_export(tmp_path):
+    """Test an empty source still produces loadable columns"""
+    path = str(tmp_path / "history")
+    assert export([], path) == 0
+    data = load(path)
+    assert len(data["columns"]["pair"]) == 0
+    assert signals_per_pair_hour(data)["counts"].shape == (0, 0)
+    assert profit_distribution(data) == {"count": 0}
+    assert fill_latency(data)["count"] == 0
+
+
+def test_aware_timestamps_stored_in_utc(tmp_path):
+    """Test JSONL envelopes with an offset are normalized to UTC"""
+    line = json.dumps({"ts": "2025-03-01T12:00:00+02:00", "payload": {"type": "entry"}})
+    path = str(tmp_path / "history")
+    export(iter_jsonl_events(io.StringIO(line)), path)
+    assert load(path)["columns"]["ts"][0] == np.datetime64("2025-03-01T10:00:00", "ms")
+
+
+def test_signals_per_pair_hour(tmp_path):
+    """Test webhooks are counted per pair and hour bucket"""
+    path = str(tmp_path / "history")
+    export(sample_events(), path)
+    signals = signals_per_pair_hour(load(path))
+    assert signals["hours"].tolist() == [datetime(2025, 3, 1, 10), datetime(2025, 3, 1, 11)]
+    # SOL has no timestamp and the status webhook no pair
+    assert signals["counts"].tolist() == [[3, 2], [2, 1], [0, 0]]
+
+
+def test_profit_distribution(tmp_path):
+    """Test exit_fill profit statistics skip missing ratios"""
+    path = str(tmp_path / "history")
+    export(sample_events(), path)
+    profit = profit_distribution(load(path))
+    assert profit["count"] == 2
+    assert profit["mean"] == pytest.approx(0.005)
+    assert profit["win_rate"] == 0.5
+    assert profit["quantiles"][0] == pytest.approx(-0.01)
+    assert profit["quantiles"][100] == pytest.approx(0.02)
+    assert profit["per_pair"] == {"BTC/USDT": (1, pytest.approx(0.02)), "ETH/USDT": (1, pytest.approx(-0.01))}
+    assert profit["histogram"][0].sum() == 2
+
+
+def test_fill_latency_uses_first_entry_and_fill(tmp_path):
+    """Test entry -> entry_fill latency per trade, with repeated entries and unfilled trades"""
+    events = sample_events() + [
+        # An adjust-trade entry after the fill must not shorten the latency
+        (START + timedelta(minutes=3), {"type": "entry", "pair": "BTC/USDT", "trade_id": "1"}),
+        # Same trade id on another pair is another bot's trade
+        (START + timedelta(minutes=1), {"type": "entry_fill", "pair": "SOL/USDT", "trade_id": "3"}),
+    ]
+    path = str(tmp_path / "history")
+    export(events, path)
+    latency = fill_latency(load(path))
+    assert latency["count"] == 2
+    assert latency["unfilled"] == 1
+    assert latency["quantiles"][100] == pytest.approx(180.0)
+    assert latency["mean"] == pytest.approx(120.0)
+
+
+def test_parquet_matches_npy(tmp_path):
+    """Test both formats load to the same columns and summaries"""
+    pytest.importorskip("pyarrow")
+    npy_path, parquet_path = str(tmp_path / "history"), str(tmp_path / "history.parquet")
+    export(sample_events(), npy_path, chunk_size=4)
+    export(sample_events(), parquet_path, fmt="parquet", chunk_size=4)
+
+    npy, parquet = load(npy_path), load(parquet_path)
+    for name in ("ts", "trade_id", "profit_ratio"):
+        np.testing.assert_array_equal(np.asarray(npy["columns"][name]), parquet["columns"][name])
+    assert signals_per_pair_hour(npy)["counts"].sum() == signals_per_pair_hour(parquet)["counts"].sum()
+    assert fill_latency(npy) == fill_latency(parquet)
+    assert profit_distribution(npy)["per_pair"] == profit_distribution(parquet)["per_pair"]
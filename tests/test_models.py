@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Unit tests for the typed webhook payload models
+"""
+
+import pytest
+from datetime import datetime
+from pydantic import ValidationError
+
+from models import (
+    parse_payload, format_value, ExitFillPayload, WebhookPayload,
+)
+
+
+def test_stringified_numbers_are_coerced():
+    """Test that Freqtrade's stringified values become typed fields"""
+    event = parse_payload({
+        "type": "exit_fill",
+        "trade_id": "42",
+        "pair": "BTC/USDT",
+        "amount": "0.00123",
+        "profit_ratio": "-0.0125",
+        "open_date": "2025-03-20 10:15:00.123456+00:00",
+    })
+
+    assert isinstance(event, ExitFillPayload)
+    assert event.trade_id == 42
+    assert event.amount == pytest.approx(0.00123)
+    assert event.profit_ratio == pytest.approx(-0.0125)
+    assert isinstance(event.open_date, datetime)
+
+
+def test_placeholder_none_becomes_missing():
+    """Test that "None"/empty placeholders are treated as missing"""
+    event = parse_payload({"type": "entry", "limit": "None", "leverage": ""})
+    assert event.limit is None
+    assert event.leverage is None
+
+
+def test_malformed_number_rejected():
+    """Test that non-numeric values in numeric fields fail validation"""
+    with pytest.raises(ValidationError):
+        parse_payload({"type": "exit", "profit_ratio": "lots"})
+
+
+def test_unhashable_type_rejected():
+    """Test that a non-string type fails validation instead of crashing the lookup"""
+    with pytest.raises(ValidationError):
+        parse_payload({"type": ["entry"]})
+
+
+def test_numbers_accepted_in_string_fields():
+    """Test that custom templates may put numbers in string fields"""
+    event = parse_payload({"type": "entry", "enter_tag": 5, "exchange": 1.5})
+    assert event.enter_tag == "5"
+    assert event.exchange == "1.5"
+
+
+def test_unknown_type_keeps_extra_fields():
+    """Test that unknown webhook types fall back to the generic model"""
+    event = parse_payload({"type": "custom", "reason": "timeout"})
+    assert type(event) is WebhookPayload
+    assert event.model_dump()["reason"] == "timeout"
+
+
+def test_format_value():
+    """Test display formatting of typed values"""
+    assert format_value(0.00001) == "0.00001"
+    assert format_value(50000.0) == "50000"
+    assert format_value("BTC/USDT") == "BTC/USDT"
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Unit tests for the webhook replay tool
+"""
+
+import asyncio
+import io
+import json
+import time
+from collections import Counter
+from datetime import datetime
+
+import httpx
+
+from replay_webhooks import iter_events, iter_jsonl_events, iter_log_events, percentile, replay
+
+
+def log_entry(asctime: str, payload: dict) -> str:
+    return f"{asctime} - freqtrade-notifier - INFO - LOG_ONLY_WEBHOOK: {json.dumps(payload, indent=2)}\n"
+
+
+def test_log_entries_are_parsed_across_lines():
+    """Test multi-line LOG_ONLY_WEBHOOK entries are extracted from interleaved logs"""
+    entry = {"type": "entry", "pair": "BTC/USDT", "nested": {"amount": 0.1}}
+    exit_fill = {"type": "exit_fill", "pair": "ETH/USDT"}
+    log = (
+        "2025-03-01 10:00:00,000 - freqtrade-notifier - INFO - Starting Freqtrade Email Notifier\n"
+        + log_entry("2025-03-01 10:00:01,250", entry)
+        + "2025-03-01 10:00:02,000 - freqtrade-notifier - ERROR - Error processing webhook: boom\n"
+        + "Traceback (most recent call last):\n  File \"app.py\", line 1\n}\n"
+        + log_entry("2025-03-01 10:00:05,500", exit_fill)
+    )
+    events = list(iter_log_events(io.StringIO(log)))
+    assert events == [
+        (datetime(2025, 3, 1, 10, 0, 1, 250000), entry),
+        (datetime(2025, 3, 1, 10, 0, 5, 500000), exit_fill),
+    ]
+
+
+def test_log_entry_yielded_before_next_record():
+    """Test an entry is yielded as soon as its JSON closes (streaming, not look-ahead)"""
+    lines = iter(log_entry("2025-03-01 10:00:01,000", {"type": "entry"}).splitlines(keepends=True))
+    consumed = []
+
+    def tracked():
+        for line in lines:
+            consumed.append(line)
+            yield line
+
+    events = iter_log_events(tracked())
+    assert next(events)[1] == {"type": "entry"}
+    assert consumed[-1] == "}\n"
+
+
+def test_truncated_log_entry_counted_as_malformed():
+    """Test an entry cut off by rotation is skipped and counted"""
+    truncated = log_entry("2025-03-01 10:00:01,000", {"type": "entry", "pair": "BTC/USDT"}).splitlines(True)[:2]
+    errors = Counter()
+    log = "".join(truncated) + log_entry("2025-03-01 10:00:02,000", {"type": "exit"})
+    events = list(iter_log_events(io.StringIO(log), errors))
+    assert [payload["type"] for _, payload in events] == ["exit"]
+    assert errors["malformed"] == 1
+
+
+def test_jsonl_payloads_and_envelopes():
+    """Test JSONL lines may be bare payloads or timestamped envelopes"""
+    errors = Counter()
+    jsonl = "\n".join([
+        json.dumps({"type": "entry", "pair": "BTC/USDT"}),
+        json.dumps({"ts": "2025-03-01T10:00:00", "payload": {"type": "exit"}}),
+        "not json",
+        "",
+    ])
+    events = list(iter_jsonl_events(io.StringIO(jsonl), errors))
+    assert events == [
+        (None, {"type": "entry", "pair": "BTC/USDT"}),
+        (datetime(2025, 3, 1, 10), {"type": "exit"}),
+    ]
+    assert errors["malformed"] == 1
+
+
+def test_mixed_naive_and_aware_timestamps_replay(tmp_path):
+    """Test a log source and a JSONL source with UTC offsets can be paced together"""
+    log = tmp_path / "app.log"
+    log.write_text(log_entry("2025-03-01 10:00:00,000", {"type": "entry", "trade_id": 0}))
+    jsonl = tmp_path / "trades.jsonl"
+    jsonl.write_text(json.dumps({"ts": "2025-03-01T12:00:01+02:00", "payload": {"type": "exit", "trade_id": 1}}))
+
+    events = list(iter_events([str(log), str(jsonl)]))
+    assert [timestamp for timestamp, _ in events] == [datetime(2025, 3, 1, 10), datetime(2025, 3, 1, 10, 0, 1)]
+
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={"status": "success"}))
+    stats = asyncio.run(replay(events, "http://notifier/webhook", speed=100, transport=transport))
+    assert stats["sent"] == 2 and stats["statuses"][200] == 2
+
+
+def test_percentile_nearest_rank():
+    """Test nearest-rank percentiles"""
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile(values, 100) == 100.0
+    assert percentile([], 50) == 0.0
+
+
+def test_replay_time_warp_and_concurrency():
+    """Test paced replay follows the warped schedule and max speed bounds concurrency"""
+    in_flight, peak, received = 0, 0, []
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        received.append(json.loads(request.content)["trade_id"])
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json={"status": "success"})
+
+    transport = httpx.MockTransport(handler)
+    base = datetime(2025, 3, 1, 10)
+    # 2 seconds of original time at 20x -> ~0.1 s
+    events = [(base.replace(second=s), {"type": "entry", "trade_id": s}) for s in (0, 1, 2)]
+    start = time.perf_counter()
+    stats = asyncio.run(replay(events, "http://notifier/webhook", speed=20, transport=transport))
+    assert 0.09 <= time.perf_counter() - start < 1.0
+    assert stats["sent"] == 3 and stats["statuses"][200] == 3
+    assert received == [0, 1, 2]
+
+    events = [(base, {"type": "entry", "trade_id": i}) for i in range(40)]
+    stats = asyncio.run(replay(events, "http://notifier/webhook", max_speed=True, concurrency=4,
+                               transport=transport))
+    assert stats["sent"] == 40
+    assert peak == 4
+    assert stats["latency_ms"]["p50"] >= 10
+
+
+def test_sources_read_up_to_size_at_open(tmp_path):
+    """Test entries appended during a replay (e.g. by the log-only endpoint) are not replayed"""
+    log = tmp_path / "app.log"
+    log.write_text(log_entry("2025-03-01 10:00:01,000", {"type": "entry"}))
+    events = iter_events([str(log)])
+    assert next(events)[1] == {"type": "entry"}
+    with open(log, "a") as f:
+        f.write(log_entry("2025-03-01 10:00:02,000", {"type": "exit"}))
+    assert list(events) == []
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Unit tests for the asyncio SES client
+"""
+
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials, RefreshableCredentials
+
+from ses_async import AsyncSESClient, SESError, SigV4Signer
+
+CREDENTIALS = Credentials("AKIDEXAMPLE", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY", "session-token")
+URL = "https://email.us-east-1.amazonaws.com/"
+EMAIL = {
+    "Source": "test@example.com",
+    "Destination": {"ToAddresses": ["recipient@example.com"]},
+    "Message": {
+        "Subject": {"Data": "Freqtrade Alert - entry", "Charset": "UTF-8"},
+        "Body": {
+            "Text": {"Data": "Pair: BTC/USDT", "Charset": "UTF-8"},
+            "Html": {"Data": "<p>Pair: BTC/USDT</p>", "Charset": "UTF-8"},
+        },
+    },
+}
+
+
+def test_signature_matches_botocore():
+    """Test our SigV4 signature is identical to botocore's"""
+    now = datetime(2025, 3, 20, 12, 0, 0, tzinfo=timezone.utc)
+    body = b"Action=SendEmail&Version=2010-12-01&Source=test%40example.com"
+
+    headers = SigV4Signer("us-east-1").sign(
+        URL, body, CREDENTIALS.access_key, CREDENTIALS.secret_key, CREDENTIALS.token, now=now
+    )
+
+    request = AWSRequest(method="POST", url=URL, data=body, headers={
+        "Content-Type": "application/x-www-form-urlencoded; charset=utf-8",
+    })
+    with patch("botocore.auth.datetime") as mock_datetime:
+        mock_datetime.datetime.utcnow.return_value = now.replace(tzinfo=None)
+        mock_datetime.datetime.now.return_value = now
+        SigV4Auth(CREDENTIALS, "ses", "us-east-1").add_auth(request)
+
+    assert headers["authorization"] == request.headers["Authorization"]
+    assert headers["x-amz-security-token"] == "session-token"
+
+
+def make_client(handler, **kwargs):
+    return AsyncSESClient("us-east-1", credentials=CREDENTIALS, transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_send_email_posts_query_api_form():
+    """Test boto3 style arguments are sent as SES query parameters"""
+    seen = {}
+
+    def handler(request):
+        seen.update({key: values[0] for key, values in parse_qs(request.content.decode()).items()})
+        return httpx.Response(200, text=(
+            "<SendEmailResponse><SendEmailResult><MessageId>abc-123</MessageId></SendEmailResult>"
+            "<ResponseMetadata><RequestId>req-1</RequestId></ResponseMetadata></SendEmailResponse>"
+        ))
+
+    response = asyncio.run(make_client(handler).send_email(**EMAIL))
+
+    assert response["MessageId"] == "abc-123"
+    assert seen["Action"] == "SendEmail"
+    assert seen["Destination.ToAddresses.member.1"] == "recipient@example.com"
+    assert seen["Message.Body.Html.Data"] == "<p>Pair: BTC/USDT</p>"
+
+
+def test_send_email_error_is_raised():
+    """Test SES error responses raise SESError without retrying client errors"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, text=(
+            "<ErrorResponse><Error><Code>MessageRejected</Code>"
+            "<Message>Email address is not verified.</Message></Error></ErrorResponse>"
+        ))
+
+    with pytest.raises(SESError, match="MessageRejected"):
+        asyncio.run(make_client(handler).send_email(**EMAIL))
+    assert len(calls) == 1
+
+
+def test_throttling_is_retried():
+    """Test throttled requests are retried"""
+    responses = [
+        httpx.Response(400, text="<Error><Code>Throttling</Code><Message>Rate exceeded</Message></Error>"),
+        httpx.Response(200, text="<MessageId>after-retry</MessageId>"),
+    ]
+
+    response = asyncio.run(make_client(lambda request: responses.pop(0)).send_email(**EMAIL))
+    assert response["MessageId"] == "after-retry"
+
+
+def test_refreshable_credentials_fetched_off_the_loop():
+    """Test role credentials are refreshed in a worker thread and cached between refreshes"""
+    fetches, expires_in = [], [3600]
+
+    def refresh():
+        fetches.append(threading.current_thread())
+        expiry = datetime.now(timezone.utc) + timedelta(seconds=expires_in[0])
+        return {"access_key": "AKIDROLE", "secret_key": "secret", "token": f"token-{len(fetches)}",
+                "expiry_time": expiry.isoformat()}
+
+    credentials = RefreshableCredentials.create_from_metadata(refresh(), refresh, "iam-role")
+    tokens = []
+
+    def handler(request):
+        tokens.append(request.headers["x-amz-security-token"])
+        return httpx.Response(200, text="<MessageId>m</MessageId>")
+
+    client = AsyncSESClient("us-east-1", credentials=credentials, transport=httpx.MockTransport(handler))
+
+    async def send_twice():
+        await client.send_email(**EMAIL)
+        await client.send_email(**EMAIL)
+
+    asyncio.run(send_twice())
+    assert len(fetches) == 1 and tokens == ["token-1", "token-1"]
+
+    # Within botocore's refresh window the next send fetches new credentials in a thread
+    credentials._expiry_time = datetime.now(timezone.utc) + timedelta(seconds=60)
+    asyncio.run(send_twice())
+    assert len(fetches) == 2 and fetches[1] is not threading.main_thread()
+    assert tokens[2:] == ["token-2", "token-2"]
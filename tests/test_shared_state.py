@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Unit tests for the cross-process shared state
+"""
+
+import pytest
+from datetime import datetime
+
+from shared_state import LocalOnce, LocalSendRate, SharedState, SharedPnlSummary, SharedDeferredQueue, event_fingerprint
+from summary import PnlSummary
+
+DAY = datetime(2025, 3, 20, 12, 0)
+
+
+@pytest.fixture
+def state(tmp_path):
+    return SharedState(str(tmp_path / "state.db"), dedup_ttl=300)
+
+
+def test_local_once_expires_after_ttl():
+    """Test the single-process claim_once grants a key once per TTL"""
+    once = LocalOnce(ttl=300)
+    assert once.claim_once("pnl:a", now=1000.0)
+    assert not once.claim_once("pnl:a", now=1299.0)
+    assert once.claim_once("pnl:b", now=1299.0)
+    assert once.claim_once("pnl:a", now=1300.0)
+    assert list(once.claimed) == ["pnl:b", "pnl:a"]
+
+
+def test_local_rate_limit():
+    """Test the single-process token bucket allows a one second burst, then spaces sends"""
+    limit = LocalSendRate(max_send_rate=2)
+    assert limit.reserve_send(now=100.0) == 0
+    assert limit.reserve_send(now=100.0) == 0
+    assert limit.reserve_send(now=100.0) == pytest.approx(0.5)
+    assert limit.reserve_send(now=101.5) == 0
+    assert LocalSendRate().reserve_send() == 0
+
+
+def test_event_claimed_exactly_once(state, tmp_path):
+    """Test a second worker cannot claim an event that is in flight or sent"""
+    other_worker = SharedState(str(tmp_path / "state.db"))
+    event_id = event_fingerprint({"type": "entry", "pair": "BTC/USDT"})
+
+    assert state.claim(event_id) == (True, None)
+    assert other_worker.claim(event_id) == (False, None)
+
+    state.complete(event_id, "msg-1")
+    assert other_worker.claim(event_id) == (False, "msg-1")
+
+
+def test_released_event_can_be_retried(state):
+    """Test a failed delivery releases its claim"""
+    event_id = event_fingerprint({"type": "status", "status": "running"})
+    state.claim(event_id)
+    state.release(event_id)
+    assert state.claim(event_id) == (True, None)
+
+
+def test_fingerprint_ignores_key_order():
+    """Test identical payloads hash the same regardless of key order"""
+    assert event_fingerprint({"a": 1, "b": 2}) == event_fingerprint({"b": 2, "a": 1})
+
+
+def test_shared_rate_limit(tmp_path):
+    """Test the token bucket makes callers wait once the burst is used up"""
+    state = SharedState(str(tmp_path / "state.db"), max_send_rate=2)
+    assert state.reserve_send() == 0
+    assert state.reserve_send() == 0
+    assert state.reserve_send() > 0
+
+
+def test_shared_summary_matches_in_memory(state):
+    """Test the SQL aggregates match the in-memory accumulators"""
+    shared = SharedPnlSummary(state)
+    local = PnlSummary()
+    for ratio in (0.02, -0.05, 0.01, -0.01):
+        shared.record("BTC/USDT", "Rsi", ratio, DAY)
+        local.record("BTC/USDT", "Rsi", ratio, DAY)
+
+    expected = local.report("daily", DAY)["pairs"][0]
+    actual = shared.report("daily", DAY)["pairs"][0]
+    for field in ("count", "total_profit_ratio", "win_rate", "max_drawdown"):
+        assert actual[field] == pytest.approx(expected[field])
+
+
+def test_shared_deferred_queue_released_once(state, tmp_path):
+    """Test a deferred message pushed by one worker is released by exactly one worker"""
+    other_worker = SharedDeferredQueue(SharedState(str(tmp_path / "state.db")))
+    queue = SharedDeferredQueue(state)
+    queue.push({"type": "status", "n": 1}, 20.0)
+    queue.push({"type": "status", "n": 0}, 10.0)
+
+    assert len(other_worker) == 2
+    assert other_worker.next_release() == 10.0
+    assert [r["webhook"]["n"] for r in other_worker.pop_due(30.0, limit=1)] == [0]
+    assert [r["webhook"]["n"] for r in queue.pop_due(30.0, limit=10)] == [1]
+    assert other_worker.pop_due(30.0, limit=10) == []
+
+
+def test_shared_deferred_queue_coalesces_across_workers(state, tmp_path):
+    """Test events for the same key pushed by different workers collapse into one pending record"""
+    other_worker = SharedDeferredQueue(SharedState(str(tmp_path / "state.db")))
+    queue = SharedDeferredQueue(state)
+    first = queue.push({"type": "status", "pair": "BTC/USDT", "n": 1}, 10.0, key="status|BTC/USDT")
+    latest = other_worker.push({"type": "status", "pair": "BTC/USDT", "n": 2}, 50.0, key="status|BTC/USDT")
+
+    assert latest["id"] == first["id"] and latest["coalesced"] == 1
+    assert other_worker.coalesced == 1
+    [record] = queue.pop_due(10.0, limit=10)
+    assert record["webhook"]["n"] == 2
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Unit tests for the incremental PnL summaries
+"""
+
+import pytest
+from datetime import datetime
+
+from summary import PnlSummary, completed_period, render_report, parse_schedule, next_run
+
+DAY = datetime(2025, 3, 20, 12, 0)
+
+
+def test_aggregates_per_pair_and_strategy():
+    """Test count, mean, win rate and drawdown accumulate per key"""
+    summary = PnlSummary()
+    summary.record("BTC/USDT", "Rsi", 0.02, DAY)
+    summary.record("BTC/USDT", "Rsi", -0.03, DAY)
+    summary.record("ETH/USDT", "Macd", 0.01, DAY)
+
+    report = summary.report("daily", DAY)
+    assert report["total"]["count"] == 3
+    assert report["total"]["total_profit_ratio"] == pytest.approx(0.0)
+
+    btc = next(row for row in report["pairs"] if row["key"] == "BTC/USDT")
+    assert btc["count"] == 2
+    assert btc["mean_profit_ratio"] == pytest.approx(-0.005)
+    assert btc["win_rate"] == pytest.approx(0.5)
+    assert btc["max_drawdown"] == pytest.approx(0.03)
+    assert report["worst_pair"]["key"] == "BTC/USDT"
+    assert [row["key"] for row in report["strategies"]] == ["Macd", "Rsi"]
+
+
+def test_daily_period_rolls_over():
+    """Test a new day starts from empty aggregates while the week keeps them"""
+    summary = PnlSummary()
+    summary.record("BTC/USDT", "Rsi", 0.02, DAY)
+    next_day = datetime(2025, 3, 21, 9, 0)
+    summary.record("ETH/USDT", "Rsi", 0.01, next_day)
+
+    assert summary.report("daily", next_day)["total"]["count"] == 1
+    assert summary.report("weekly", next_day)["total"]["count"] == 2
+    # The completed day can still be reported after the rollover
+    assert summary.report("daily", DAY)["total"]["count"] == 1
+
+
+def test_run_reports_completed_period():
+    """Test a run just after midnight reports the day and week that just ended"""
+    midnight = datetime(2025, 3, 24, 0, 0)
+    assert completed_period("daily", midnight).date() == datetime(2025, 3, 23).date()
+    assert completed_period("weekly", midnight).isocalendar()[1] == DAY.isocalendar()[1]
+
+
+def test_snapshot_survives_restart(tmp_path):
+    """Test aggregates are restored from the snapshot file"""
+    path = str(tmp_path / "pnl.json")
+    summary = PnlSummary(path)
+    summary.record("BTC/USDT", "Rsi", 0.02, DAY)
+    summary.record("BTC/USDT", "Rsi", 0.01, datetime(2025, 3, 21, 9, 0))
+    # Recording only marks the summary dirty; the snapshot is written in batches
+    assert summary.dirty and not (tmp_path / "pnl.json").exists()
+    summary.save()
+    assert not summary.dirty
+
+    restored = PnlSummary(path)
+    assert restored.report("daily", DAY)["pairs"][0]["count"] == 1
+    assert restored.report("weekly", DAY)["pairs"][0]["count"] == 2
+
+
+def test_render_report_headline():
+    """Test the summary subject contains the headline numbers"""
+    summary = PnlSummary()
+    summary.record("BTC/USDT", "Rsi", 0.03, DAY)
+    summary.record("XRP/USDT", "Rsi", -0.01, DAY)
+
+    subject, body_text, body_html = render_report(summary.report("daily", DAY))
+    assert "2 trades, +2.00%, worst pair XRP/USDT" in subject
+    assert "BTC/USDT" in body_text
+    assert "<li>" in body_html
+
+
+def test_next_run():
+    """Test the next due summary is picked from daily and weekly times"""
+    schedule = parse_schedule("23:55", "sun 23:58")
+    assert next_run(schedule, DAY) == (datetime(2025, 3, 20, 23, 55), "daily")
+    sunday = datetime(2025, 3, 23, 23, 56)
+    assert next_run(schedule, sunday) == (datetime(2025, 3, 23, 23, 58), "weekly")
+
+
+@pytest.mark.parametrize("daily, weekly", [("24:00", ""), ("25:70", ""), ("", "sun 23:60")])
+def test_schedule_rejects_invalid_times(daily, weekly):
+    """Test out-of-range times fail at startup instead of in the scheduler"""
+    with pytest.raises(ValueError):
+        parse_schedule(daily, weekly)